@@ -0,0 +1,85 @@
+from django.contrib import admin
+from django.db.models import BooleanField, ExpressionWrapper, Q
+from django.http import Http404, HttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import path, reverse
+from django.utils.html import format_html, format_html_join
+
+from .models import RequestProfile
+
+# Поле модели с выгрузкой: имя файла и тип содержимого
+DOWNLOADS = {
+    'stats': ('profile_{}.prof', 'application/octet-stream'),
+    'stacks': ('profile_{}.folded', 'text/plain; charset=utf-8'),
+}
+
+
+@admin.register(RequestProfile)
+class RequestProfileAdmin(admin.ModelAdmin):
+    list_display = (
+        'created_at', 'method', 'path', 'mode', 'status_code', 'duration',
+        'user', 'downloads'
+    )
+    list_filter = ('mode', 'method')
+    list_select_related = ('user',)
+    search_fields = ('path',)
+    fields = (
+        'created_at', 'user', 'method', 'path', 'mode', 'status_code',
+        'duration', 'downloads', 'summary'
+    )
+    readonly_fields = fields
+
+    def get_queryset(self, request):
+        # Профили целиком нужны только для выгрузки, в списке хватает
+        # признаков их наличия
+        return super().get_queryset(request).defer(
+            'stats', 'stacks'
+        ).annotate(
+            has_stats=ExpressionWrapper(
+                Q(stats__isnull=False), output_field=BooleanField()
+            ),
+            has_stacks=ExpressionWrapper(
+                ~Q(stacks=''), output_field=BooleanField()
+            ),
+        )
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def get_urls(self):
+        return [
+            path(
+                '<int:pk>/download/<str:kind>/',
+                self.admin_site.admin_view(self.download),
+                name='api_requestprofile_download'
+            ),
+        ] + super().get_urls()
+
+    def download(self, request, pk, kind):
+        if kind not in DOWNLOADS or not self.has_view_permission(request):
+            raise Http404
+        file_name, content_type = DOWNLOADS[kind]
+        profile = get_object_or_404(RequestProfile, pk=pk)
+        content = getattr(profile, kind)
+        if not content:
+            raise Http404
+        response = HttpResponse(content, content_type=content_type)
+        response['Content-Disposition'] = (
+            f'attachment; filename="{file_name.format(pk)}"'
+        )
+        return response
+
+    def downloads(self, obj):
+        return format_html_join(' ', '<a href="{}">{}</a>', (
+            (
+                reverse('admin:api_requestprofile_download',
+                        args=[obj.pk, kind]),
+                kind
+            )
+            for kind in DOWNLOADS
+            if getattr(obj, f'has_{kind}')
+        )) or format_html('—')
+    downloads.short_description = 'Скачать'
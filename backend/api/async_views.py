@@ -0,0 +1,49 @@
+"""Асинхронные версии самых нагруженных представлений для работы под ASGI.
+
+В Django 3.2 нет асинхронного ORM, поэтому запросы к базе выполняются в
+пуле потоков через sync_to_async(thread_sensitive=False). Синхронные
+представления под ASGI Django запускает в одном общем потоке, а здесь
+медленный запрос занимает только свой поток и не задерживает остальные.
+Соединения с базой в этих потоках открываются и закрываются так же, как
+в обычном цикле запроса.
+"""
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+
+from .views import IngredientViewSet, RecipeViewSet
+
+
+def run_in_worker(func, *args, **kwargs):
+    close_old_connections()
+    try:
+        result = func(*args, **kwargs)
+        if hasattr(result, 'render'):
+            result.render()
+        return result
+    finally:
+        close_old_connections()
+
+
+def as_async_view(view):
+    """Запускает синхронное представление в отдельном потоке пула."""
+
+    @wraps(view)
+    async def async_view(request, *args, **kwargs):
+        return await sync_to_async(run_in_worker, thread_sensitive=False)(
+            view, request, *args, **kwargs
+        )
+
+    return async_view
+
+
+recipe_list = as_async_view(
+    RecipeViewSet.as_view({'get': 'list', 'post': 'create'})
+)
+recipe_detail = as_async_view(RecipeViewSet.as_view({
+    'get': 'retrieve', 'patch': 'partial_update', 'delete': 'destroy'
+}))
+ingredient_list = as_async_view(
+    IngredientViewSet.as_view({'get': 'list', 'post': 'create'})
+)
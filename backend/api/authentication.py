@@ -0,0 +1,210 @@
+import copy
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import router
+from django.db.models import DEFERRED
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings
+
+User = get_user_model()
+
+CACHE_KEY_PREFIX = 'auth:token:'
+USER_CACHE_KEY_PREFIX = 'auth:user:'
+# Поля пользователя, которые кладутся в JWT и восстанавливаются из него
+# без обращения к базе
+JWT_USER_CLAIMS = ('username', 'email', 'is_staff', 'is_superuser')
+JWT_PASSWORD_CLAIM = 'password_fingerprint'
+# Поля пользователя в общем кэше: только нужные для проверки прав. Хеш
+# пароля и личные данные туда не попадают
+CACHED_USER_FIELDS = ('id', 'username', 'is_active', 'is_staff',
+                      'is_superuser')
+
+
+class LocalCache:
+    """Небольшой LRU-кэш в памяти процесса с ограниченным временем жизни.
+
+    Сбрасывается только в текущем процессе, поэтому время жизни записей
+    должно быть коротким: другие процессы узнают об инвалидации не позже,
+    чем истечет запись.
+    """
+
+    def __init__(self, max_size, timeout):
+        self.max_size = max_size
+        self.timeout = timeout
+        self.data = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            item = self.data.get(key)
+            if item is None:
+                return None
+            expires, value = item
+            if expires < time.monotonic():
+                del self.data[key]
+                return None
+            self.data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        if self.max_size <= 0:
+            return
+        with self.lock:
+            self.data[key] = (time.monotonic() + self.timeout, value)
+            self.data.move_to_end(key)
+            while len(self.data) > self.max_size:
+                self.data.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.data.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
+
+
+local_cache = LocalCache(
+    settings.TOKEN_LOCAL_CACHE_SIZE, settings.TOKEN_LOCAL_CACHE_TIMEOUT
+)
+
+
+def get_cache_key(key):
+    # Сам токен не попадает в общий кэш
+    return CACHE_KEY_PREFIX + hashlib.sha256(key.encode()).hexdigest()
+
+
+def get_user_cache_key(user_id):
+    return f'{USER_CACHE_KEY_PREFIX}{user_id}'
+
+
+def invalidate_tokens(*keys):
+    cache_keys = [get_cache_key(key) for key in keys]
+    for cache_key in cache_keys:
+        local_cache.delete(cache_key)
+    cache.delete_many(cache_keys)
+
+
+def invalidate_users(*user_ids):
+    """Сбрасывает закэшированных пользователей без запроса токенов к базе."""
+    cache_keys = [get_user_cache_key(user_id) for user_id in user_ids]
+    for cache_key in cache_keys:
+        local_cache.delete(cache_key)
+    cache.delete_many(cache_keys)
+
+
+def get_cached(cache_key):
+    value = local_cache.get(cache_key)
+    if value is None:
+        value = cache.get(cache_key)
+        if value is not None:
+            local_cache.set(cache_key, value)
+    return value
+
+
+def build_user(values):
+    """Пользователь из части полей, остальные поля отложены и догружаются
+    одним запросом при первом обращении.
+    """
+    fields = User._meta.concrete_fields
+    return User.from_db(
+        router.db_for_read(User),
+        [field.attname for field in fields],
+        [values.get(field.attname, DEFERRED) for field in fields]
+    )
+
+
+def get_cached_user(user_id):
+    cache_key = get_user_cache_key(user_id)
+    user = local_cache.get(cache_key)
+    if user is None:
+        values = cache.get(cache_key)
+        if values is not None:
+            user = build_user(values)
+            local_cache.set(cache_key, user)
+    return user
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Аутентификация по токену с кэшированием пользователя.
+
+    Токен отображается в id пользователя, а сам пользователь хранится под
+    своим id: так его запись можно сбросить, не выбирая токены из базы.
+    Обе записи ищутся сначала в памяти процесса, затем в кэше Django и
+    только потом в базе. В памяти процесса лежит весь объект, а в кэше
+    Django только CACHED_USER_FIELDS. Записи сбрасываются сигналами при
+    выходе, любом изменении пользователя, включая счетчики, и его
+    удалении.
+    """
+
+    def authenticate_credentials(self, key):
+        cache_key = get_cache_key(key)
+        user_id = get_cached(cache_key)
+        user = None
+        if user_id is not None:
+            user = get_cached_user(user_id)
+        if user is None:
+            user, _ = super().authenticate_credentials(key)
+            user_cache_key = get_user_cache_key(user.pk)
+            cache.set_many(
+                {
+                    cache_key: user.pk,
+                    user_cache_key: {
+                        field: getattr(user, field)
+                        for field in CACHED_USER_FIELDS
+                    },
+                },
+                settings.TOKEN_CACHE_TIMEOUT
+            )
+            local_cache.set(cache_key, user.pk)
+            local_cache.set(user_cache_key, user)
+        # Объект из памяти процесса общий для потоков, а представления
+        # могут менять request.user, поэтому каждому запросу нужна копия
+        user = copy.copy(user)
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed(
+                'Пользователь неактивен или удален.'
+            )
+        return user, Token(key=key, user=user)
+
+
+def get_password_fingerprint(user):
+    """Отпечаток хеша пароля: после смены пароля refresh-токен не примут."""
+    return hashlib.sha256(user.password.encode()).hexdigest()[:16]
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    """Аутентификация по JWT без запроса к базе.
+
+    Пользователь собирается из утверждений access-токена, остальные поля
+    модели отложены и догружаются одним запросом при первом обращении.
+    Токены без этих утверждений обрабатываются как обычно, через базу.
+    При выключенном JWT_AUTH_ENABLED запрос передается следующему классу.
+    """
+
+    def authenticate(self, request):
+        if not settings.JWT_AUTH_ENABLED:
+            return None
+        return super().authenticate(request)
+
+    def get_user(self, validated_token):
+        claims = {
+            field: validated_token.get(field) for field in JWT_USER_CLAIMS
+        }
+        if None in claims.values():
+            return super().get_user(validated_token)
+        try:
+            claims['id'] = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            return super().get_user(validated_token)
+        claims['is_active'] = True
+        return build_user(claims)
@@ -0,0 +1,124 @@
+"""Общие помощники для нагрузочных команд управления."""
+import statistics
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from itertools import cycle
+
+import requests
+
+
+@dataclass
+class LoadResult:
+    latencies: list = field(default_factory=list)
+    errors: int = 0
+    elapsed: float = 0
+
+    @property
+    def total(self):
+        return len(self.latencies) + self.errors
+
+    @property
+    def rps(self):
+        return self.total / self.elapsed if self.elapsed else 0
+
+    def percentile(self, percent):
+        if not self.latencies:
+            return 0
+        latencies = sorted(self.latencies)
+        index = min(len(latencies) - 1, int(len(latencies) * percent / 100))
+        return latencies[index]
+
+    def as_dict(self):
+        return {
+            'requests': self.total,
+            'errors': self.errors,
+            'rps': round(self.rps, 1),
+            **{
+                f'p{percent}_ms': round(self.percentile(percent) * 1000, 1)
+                for percent in (50, 95, 99)
+            },
+        }
+
+    @classmethod
+    def combine(cls, results):
+        results = list(results)
+        return cls(
+            latencies=[
+                latency for result in results for latency in result.latencies
+            ],
+            errors=sum(result.errors for result in results),
+            elapsed=max((result.elapsed for result in results), default=0)
+        )
+
+    def summary(self):
+        mean = statistics.mean(self.latencies) if self.latencies else 0
+        return (
+            f'{self.total} запросов, {self.errors} ошибок, '
+            f'{self.rps:.1f} запросов/с, '
+            f'среднее {mean * 1000:.1f} мс, '
+            f'p50 {self.percentile(50) * 1000:.1f} мс, '
+            f'p95 {self.percentile(95) * 1000:.1f} мс, '
+            f'p99 {self.percentile(99) * 1000:.1f} мс'
+        )
+
+
+def run_requests(next_request, concurrency, headers=None):
+    """Выполняет запросы из next_request в concurrency потоках.
+
+    next_request возвращает (имя, метод, адрес, заголовки) или None, когда
+    запросы закончились. Результаты собираются отдельно по именам, ошибкой
+    считается исключение или ответ с кодом 400 и выше.
+    """
+    results = defaultdict(LoadResult)
+    lock = threading.Lock()
+
+    def worker():
+        session = requests.Session()
+        session.headers.update(headers or {})
+        while True:
+            with lock:
+                request = next_request()
+            if request is None:
+                return
+            name, method, url, request_headers = request
+            start = time.perf_counter()
+            try:
+                response = session.request(
+                    method, url, headers=request_headers
+                )
+                failed = response.status_code >= 400
+            except requests.RequestException:
+                failed = True
+            latency = time.perf_counter() - start
+            with lock:
+                if failed:
+                    results[name].errors += 1
+                else:
+                    results[name].latencies.append(latency)
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    for result in results.values():
+        result.elapsed = elapsed
+    return dict(results)
+
+
+def run_load(urls, concurrency, total, headers=None):
+    """Отправляет total GET-запросов по кругу по urls."""
+    urls = cycle(urls)
+    remaining = iter(range(total))
+
+    def next_request():
+        if next(remaining, None) is None:
+            return None
+        return 'all', 'GET', next(urls), None
+
+    results = run_requests(next_request, concurrency, headers)
+    return results.get('all', LoadResult())
@@ -0,0 +1,52 @@
+"""Кэш готовых ответов API вместе с их сжатыми вариантами.
+
+Ключ включает версию модели, которую сигналы меняют при любом изменении ее
+объектов, поэтому устаревшие ответы просто перестают находиться и
+вытесняются по времени жизни.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+
+from .compression import compress_all
+
+KEY_PREFIX = 'response:'
+
+
+def get_version_key(model):
+    return f'{KEY_PREFIX}{model._meta.label_lower}:version'
+
+
+def invalidate_responses(model):
+    cache.set(get_version_key(model), time.time_ns(), None)
+
+
+def get_response_key(model, request):
+    version = cache.get_or_set(get_version_key(model), time.time_ns, None)
+    path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return f'{KEY_PREFIX}{model._meta.label_lower}:{version}:{path}'
+
+
+def get_cached_response(key):
+    entry = cache.get(key)
+    if entry is None:
+        return None
+    response = HttpResponse(
+        entry['content'], content_type=entry['content_type']
+    )
+    response.compressed_content = entry['compressed']
+    return response
+
+
+def cache_response(key, response):
+    """Сохраняет отрендеренный ответ и возвращает его сжатые варианты."""
+    compressed = compress_all(response.content)
+    cache.set(key, {
+        'content': response.content,
+        'content_type': response['Content-Type'],
+        'compressed': compressed,
+    }, settings.RESPONSE_CACHE_TIMEOUT)
+    return compressed
@@ -0,0 +1,99 @@
+"""Сжатие ответов gzip и, если установлен пакет brotli, brotli."""
+import zlib
+
+from django.conf import settings
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+GZIP = 'gzip'
+BROTLI = 'br'
+# В порядке предпочтения
+ENCODINGS = (BROTLI, GZIP) if brotli is not None else (GZIP,)
+COMPRESSIBLE_TYPES = (
+    'text/', 'application/json', 'application/javascript',
+    'application/xml', 'image/svg+xml',
+)
+# Окно zlib с заголовком и контрольной суммой gzip
+GZIP_WBITS = 31
+
+
+def choose_encoding(accept_encoding):
+    """Лучшее из ENCODINGS, которое принимает клиент, или None."""
+    accepted = {}
+    for item in accept_encoding.split(','):
+        coding, *params = item.split(';')
+        quality = 1.0
+        for param in params:
+            name, _, value = param.strip().partition('=')
+            if name == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[coding.strip().lower()] = quality
+    for encoding in ENCODINGS:
+        if accepted.get(encoding, accepted.get('*', 0)) > 0:
+            return encoding
+    return None
+
+
+def is_compressible(content_type):
+    return content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+def get_compressor(encoding):
+    if encoding == BROTLI:
+        return brotli.Compressor(quality=settings.COMPRESSION_BROTLI_QUALITY)
+    return zlib.compressobj(
+        settings.COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, GZIP_WBITS
+    )
+
+
+def compress(content, encoding):
+    if encoding == BROTLI:
+        return brotli.compress(
+            content, quality=settings.COMPRESSION_BROTLI_QUALITY
+        )
+    compressor = get_compressor(encoding)
+    return compressor.compress(content) + compressor.flush()
+
+
+def compress_all(content):
+    """Сжатые варианты content для всех поддерживаемых кодировок."""
+    if len(content) < settings.COMPRESSION_MIN_SIZE:
+        return {}
+    return {encoding: compress(content, encoding) for encoding in ENCODINGS}
+
+
+def compress_stream(chunks, encoding):
+    """Сжимает поток по частям.
+
+    Сброс буфера компрессора дописывает в вывод границу блока, поэтому
+    сбрасывать после каждой мелкой части (строки списка покупок) нельзя:
+    сжатый поток вышел бы больше исходного. Сжатое отправляется клиенту,
+    когда накопится COMPRESSION_STREAM_FLUSH_SIZE байт исходного потока,
+    и в конце.
+    """
+    compressor = get_compressor(encoding)
+    if encoding == BROTLI:
+        process, flush, finish = (
+            compressor.process, compressor.flush, compressor.finish
+        )
+    else:
+        process, finish = compressor.compress, compressor.flush
+
+        def flush():
+            return compressor.flush(zlib.Z_SYNC_FLUSH)
+    pending = 0
+    for chunk in chunks:
+        data = process(chunk)
+        pending += len(chunk)
+        if pending >= settings.COMPRESSION_STREAM_FLUSH_SIZE:
+            data += flush()
+            pending = 0
+        if data:
+            yield data
+    yield finish()
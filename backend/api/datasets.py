@@ -0,0 +1,229 @@
+import csv
+import json
+import random
+from collections import defaultdict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+
+from .caching import invalidate_responses
+from .importers import RecipeImporter
+from recipe.models import (FeedEntry, Ingredient, Recipe, RecipeFavorite,
+                           RecipeIngredient, RecipeShoppingCart, RecipeTag,
+                           ShoppingListItem, Tag)
+from user.models import Follow
+
+User = get_user_model()
+
+INGREDIENTS_CSV = settings.BASE_DIR.parent / 'data' / 'ingredients.csv'
+TAGS_FIXTURE = settings.BASE_DIR / 'data' / 'recipes.json'
+IMAGE = 'img/recipes/generated.png'
+# Парето с alpha около 1.16 дает распределение 80/20: немногие авторы и
+# рецепты собирают большую часть подписок и избранного
+PARETO_ALPHA = 1.16
+
+
+def pareto_weights(count, rng):
+    return [rng.paretovariate(PARETO_ALPHA) for _ in range(count)]
+
+
+def weighted_sample(population, weights, count, rng):
+    """До count разных элементов с вероятностью, пропорциональной весу."""
+    count = min(count, len(population))
+    chosen = set()
+    for _ in range(3):
+        if len(chosen) >= count:
+            break
+        chosen.update(rng.choices(population, weights, k=count * 2))
+    return list(chosen)[:count]
+
+
+class DatasetGenerator:
+    """Синтетические пользователи, рецепты, подписки, избранное и корзины.
+
+    Популярность авторов и рецептов распределена по Парето, число подписок,
+    избранного и покупок у пользователя - экспоненциально вокруг среднего.
+    Строки пишутся через bulk_create, а счетчики, списки покупок и ленты
+    пересчитываются одним проходом в конце.
+    """
+
+    def __init__(self, users, recipes, follows=10, favorites=20, cart=3,
+                 authors_ratio=0.2, password=None, batch_size=1000,
+                 seed=None):
+        self.users = users
+        self.recipes = recipes
+        self.follows = follows
+        self.favorites = favorites
+        self.cart = cart
+        self.authors_ratio = authors_ratio
+        self.password = password
+        self.batch_size = batch_size
+        self.rng = random.Random(seed)
+        self.stats = {}
+
+    def run(self) -> dict:
+        with transaction.atomic():
+            tags = self.load_tags()
+            ingredients = self.load_ingredients()
+            user_ids = self.create_users()
+            author_ids = self.rng.sample(
+                user_ids, max(1, int(len(user_ids) * self.authors_ratio))
+            )
+            recipes = self.create_recipes(author_ids, tags, ingredients)
+            follows = self.create_follows(user_ids, author_ids)
+            self.create_relations(RecipeFavorite, user_ids, recipes,
+                                  self.favorites)
+            self.create_relations(RecipeShoppingCart, user_ids, recipes,
+                                  self.cart)
+            User.objects.recount()
+            self.stats[str(ShoppingListItem._meta.verbose_name_plural)] = (
+                ShoppingListItem.objects.rebuild()
+            )
+            self.create_feeds(follows, recipes)
+        return self.stats
+
+    def count(self, mean):
+        return round(self.rng.expovariate(1 / mean)) if mean else 0
+
+    def save(self, model, objects):
+        """bulk_create с первичными ключами и в SQLite."""
+        last_id = model.objects.order_by('-pk').values_list(
+            'pk', flat=True
+        ).first() or 0
+        model.objects.bulk_create(objects, batch_size=self.batch_size)
+        if objects and objects[0].pk is None:
+            ids = model.objects.filter(pk__gt=last_id).order_by(
+                'pk'
+            ).values_list('pk', flat=True)
+            for obj, pk in zip(objects, ids.iterator()):
+                obj.pk = pk
+        self.stats[str(model._meta.verbose_name_plural)] = len(objects)
+        return objects
+
+    def load_tags(self) -> list:
+        with open(TAGS_FIXTURE, encoding='utf-8') as file:
+            fixture = json.load(file)
+        Tag.objects.bulk_create(
+            [
+                Tag(**item['fields'])
+                for item in fixture if item['model'] == 'recipe.tag'
+            ],
+            ignore_conflicts=True
+        )
+        # bulk_create не отправляет сигналы, сбрасывающие кэш ответов
+        invalidate_responses(Tag)
+        return list(Tag.objects.values_list('id', flat=True))
+
+    def load_ingredients(self) -> list:
+        if not Ingredient.objects.exists():
+            with open(INGREDIENTS_CSV, encoding='utf-8') as file:
+                Ingredient.objects.bulk_create(
+                    (
+                        Ingredient(name=name, measurement_unit=unit)
+                        for name, unit in csv.reader(file)
+                    ),
+                    batch_size=self.batch_size
+                )
+            invalidate_responses(Ingredient)
+        return list(Ingredient.objects.values_list('id', flat=True))
+
+    def create_users(self) -> list:
+        start = (User.objects.order_by('-pk').values_list(
+            'pk', flat=True
+        ).first() or 0) + 1
+        # Пароль хешируется один раз: Argon2 на каждого пользователя
+        # растянул бы генерацию на минуты
+        password = make_password(self.password)
+        users = [
+            User(
+                username=f'user_{number}', email=f'user_{number}@load.test',
+                first_name='Имя', last_name='Фамилия', password=password
+            )
+            for number in range(start, start + self.users)
+        ]
+        return [user.pk for user in self.save(User, users)]
+
+    def create_recipes(self, author_ids, tags, ingredients) -> list:
+        author_weights = pareto_weights(len(author_ids), self.rng)
+        authors = self.rng.choices(author_ids, author_weights, k=self.recipes)
+        short_links = RecipeImporter.generate_short_links(self.recipes)
+        recipes = self.save(Recipe, [
+            Recipe(
+                author_id=author_id, name=f'Рецепт {short_link}',
+                text='Сгенерированный рецепт', image=IMAGE,
+                cooking_time=self.rng.randint(5, 180), short_link=short_link
+            )
+            for author_id, short_link in zip(authors, short_links)
+        ])
+        recipe_tags = []
+        recipe_ingredients = []
+        for recipe in recipes:
+            recipe_tags.extend(
+                RecipeTag(recipe_id=recipe.pk, tag_id=tag_id)
+                for tag_id in self.rng.sample(
+                    tags, min(len(tags), self.rng.randint(1, 3))
+                )
+            )
+            recipe_ingredients.extend(
+                RecipeIngredient(
+                    recipe_id=recipe.pk, ingredient_id=ingredient_id,
+                    amount=self.rng.randint(1, 500)
+                )
+                for ingredient_id in self.rng.sample(
+                    ingredients, min(len(ingredients), self.rng.randint(3, 12))
+                )
+            )
+        self.save(RecipeTag, recipe_tags)
+        self.save(RecipeIngredient, recipe_ingredients)
+        return recipes
+
+    def create_follows(self, user_ids, author_ids) -> list:
+        weights = pareto_weights(len(author_ids), self.rng)
+        follows = []
+        for user_id in user_ids:
+            follows.extend(
+                Follow(follower_id=user_id, following_id=author_id)
+                for author_id in weighted_sample(
+                    author_ids, weights, self.count(self.follows), self.rng
+                )
+                if author_id != user_id
+            )
+        return self.save(Follow, follows)
+
+    def create_relations(self, model, user_ids, recipes, mean):
+        recipe_ids = [recipe.pk for recipe in recipes]
+        weights = pareto_weights(len(recipe_ids), self.rng)
+        self.save(model, [
+            model(user_id=user_id, recipe_id=recipe_id)
+            for user_id in user_ids
+            for recipe_id in weighted_sample(
+                recipe_ids, weights, self.count(mean), self.rng
+            )
+        ])
+
+    def create_feeds(self, follows, recipes):
+        recipes_by_author = defaultdict(list)
+        for recipe in recipes:
+            recipes_by_author[recipe.author_id].append(recipe)
+        popular = set(User.objects.filter(
+            pk__in=recipes_by_author,
+            followers_count__gt=settings.FEED_FANOUT_MAX_FOLLOWERS
+        ).values_list('pk', flat=True))
+        FeedEntry.objects.bulk_create(
+            (
+                FeedEntry(
+                    user_id=follow.follower_id, recipe_id=recipe.pk,
+                    created_at=recipe.created_at
+                )
+                for follow in follows
+                if follow.following_id not in popular
+                for recipe in recipes_by_author[follow.following_id]
+            ),
+            batch_size=self.batch_size, ignore_conflicts=True
+        )
+        FeedEntry.objects.trim()
+        self.stats[str(FeedEntry._meta.verbose_name_plural)] = (
+            FeedEntry.objects.count()
+        )
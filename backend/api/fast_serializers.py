@@ -0,0 +1,153 @@
+"""Быстрая сериализация ответов на чтение.
+
+FastSerializer берет поля, источники и вложенность у обычного сериализатора
+DRF и один раз на запрос собирает для каждого поля функцию доступа: цепочку
+атрибутов, преобразование типа, вложенный сериализатор или метод
+SerializerMethodField. Строка ответа собирается одним проходом по этим
+функциям без get_attribute и to_representation каждого поля. Плоские
+сериализаторы над QuerySet читают строки через values() без создания
+объектов моделей.
+
+Вывод совпадает с DRF: поля, для которых нет быстрого пути (изображения,
+связанные поля, сериализаторы с собственным to_representation), проходят
+через методы самого поля.
+"""
+from operator import attrgetter
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Manager, QuerySet
+from rest_framework import serializers
+from rest_framework.relations import PKOnlyObject
+
+# Поля, у которых to_representation сводится к приведению типа
+CONVERTERS = {
+    serializers.IntegerField: int,
+    serializers.CharField: str,
+    serializers.EmailField: str,
+    serializers.SlugField: str,
+}
+
+
+def is_plain(serializer) -> bool:
+    return (
+        type(serializer).to_representation
+        is serializers.Serializer.to_representation
+    )
+
+
+def get_instance(instance):
+    return instance
+
+
+def compile_serializer(serializer):
+    """Функция, строящая словарь ответа serializer по объекту."""
+    if not is_plain(serializer):
+        return serializer.to_representation
+    accessors = tuple(
+        (field.field_name, compile_field(field))
+        for field in serializer._readable_fields
+    )
+
+    def to_representation(instance):
+        return {name: accessor(instance) for name, accessor in accessors}
+    return to_representation
+
+
+def compile_field(field):
+    if isinstance(field, serializers.SerializerMethodField):
+        return getattr(field.parent, field.method_name)
+    if isinstance(field, serializers.ListSerializer) and is_plain(field.child):
+        convert_item = compile_serializer(field.child)
+
+        def convert(value):
+            if isinstance(value, Manager):
+                value = value.all()
+            return [convert_item(item) for item in value]
+    elif isinstance(field, serializers.Serializer):
+        convert = compile_serializer(field)
+    elif type(field) in CONVERTERS:
+        convert = CONVERTERS[type(field)]
+    else:
+        return compile_drf_field(field)
+    get = (
+        attrgetter('.'.join(field.source_attrs)) if field.source_attrs
+        else get_instance
+    )
+
+    def accessor(instance):
+        value = get(instance)
+        return None if value is None else convert(value)
+    return accessor
+
+
+def compile_drf_field(field):
+    """Поле без быстрого пути: тот же порядок вызовов, что в DRF."""
+    def accessor(instance):
+        attribute = field.get_attribute(instance)
+        if isinstance(attribute, PKOnlyObject):
+            check_for_none = attribute.pk
+        else:
+            check_for_none = attribute
+        if check_for_none is None:
+            return None
+        return field.to_representation(attribute)
+    return accessor
+
+
+def compile_values(serializer, model):
+    """Поля для чтения через values() или None, если так нельзя.
+
+    Подходят сериализаторы, все поля которых - простые поля самой модели.
+    """
+    if not is_plain(serializer):
+        return None
+    fields = []
+    for field in serializer._readable_fields:
+        if type(field) not in CONVERTERS or len(field.source_attrs) != 1:
+            return None
+        try:
+            model_field = model._meta.get_field(field.source)
+        except FieldDoesNotExist:
+            return None
+        if not model_field.concrete or model_field.is_relation:
+            return None
+        fields.append(
+            (field.field_name, model_field.attname, CONVERTERS[type(field)])
+        )
+    return fields
+
+
+class FastSerializer:
+    """Сериализатор только для чтения с выводом serializer_class.
+
+    Принимает те же instance, many и context и отдает результат в data.
+    """
+
+    def __init__(self, serializer_class, instance=None, many=False,
+                 context=None):
+        self.serializer = serializer_class(context=context or {})
+        self.instance = instance
+        self.many = many
+
+    @property
+    def data(self):
+        if not self.many:
+            return compile_serializer(self.serializer)(self.instance)
+        instance = self.instance
+        if isinstance(instance, QuerySet):
+            fields = compile_values(self.serializer, instance.model)
+            if fields is not None:
+                return [
+                    {
+                        name: None if row[source] is None
+                        else convert(row[source])
+                        for name, source, convert in fields
+                    }
+                    for row in instance.prefetch_related(None).values(
+                        *dict.fromkeys(source for _, source, _ in fields)
+                    )
+                ]
+        elif isinstance(instance, Manager):
+            instance = instance.all()
+        to_representation = compile_serializer(self.serializer)
+        return [to_representation(item) for item in instance]
@@ -1,10 +1,10 @@
 from django.contrib.auth import get_user_model
-from django.db.models import Case, IntegerField, When
+from django.db.models import Case, Exists, IntegerField, OuterRef, When
 from django_filters import FilterSet
 from django_filters import rest_framework as filters
 from rest_framework.filters import SearchFilter
 
-from recipe.models import Recipe, Tag
+from recipe.models import Recipe, RecipeFavorite, RecipeShoppingCart, Tag
 
 User = get_user_model()
 
@@ -16,30 +16,48 @@ class RecipeFilter(FilterSet):
         queryset=Tag.objects.all(),
         conjoined=False
     )
-    is_favorited = filters.BooleanFilter(
-        field_name='is_favorited_for_user',
-    )
-    is_in_shopping_cart = filters.BooleanFilter(
-        field_name='is_in_shopping_cart_for_user',
-    )
+    is_favorited = filters.BooleanFilter(method='filter_relation')
+    is_in_shopping_cart = filters.BooleanFilter(method='filter_relation')
+
+    relation_models = {
+        'is_favorited': RecipeFavorite,
+        'is_in_shopping_cart': RecipeShoppingCart,
+    }
 
     class Meta:
         model = Recipe
         fields = ['author', 'tags', 'is_favorited', 'is_in_shopping_cart']
 
+    def filter_relation(self, queryset, name, value):
+        user = self.request.user
+        if not user.is_authenticated:
+            return queryset.none() if value else queryset
+        # Подзапрос вместо списка id: избранное и корзина могут быть
+        # большими, а id не нужно передавать в запрос
+        exists = Exists(self.relation_models[name].objects.filter(
+            user=user, recipe=OuterRef('pk')
+        ))
+        return queryset.filter(exists if value else ~exists)
+
+
+def search_by_name(queryset, search_value):
+    """Ингредиенты с подстрокой в названии, сначала начинающиеся с нее."""
+    if search_value:
+        queryset = queryset.annotate(
+            starts_with=Case(
+                When(name__istartswith=search_value, then=1),
+                default=0,
+                output_field=IntegerField(),
+            )
+        ).filter(name__icontains=search_value)
+        queryset = queryset.order_by('-starts_with', 'name')
+    return queryset
+
 
 class IngredientFilter(SearchFilter):
     search_param = 'name'
 
     def filter_queryset(self, request, queryset, view):
-        search_value = request.query_params.get(self.search_param, '')
-        if search_value:
-            queryset = queryset.annotate(
-                starts_with=Case(
-                    When(name__istartswith=search_value, then=1),
-                    default=0,
-                    output_field=IntegerField(),
-                )
-            ).filter(name__icontains=search_value)
-            queryset = queryset.order_by('-starts_with', 'name')
-        return queryset
+        return search_by_name(
+            queryset, request.query_params.get(self.search_param, '')
+        )
@@ -0,0 +1,127 @@
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+VARIANTS_DIR = 'variants'
+IMAGE_FORMATS = {
+    'webp': ('WEBP', 'webp'),
+    'jpeg': ('JPEG', 'jpg'),
+}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.IMAGE_PROCESSING_WORKERS,
+                thread_name_prefix='image-variants'
+            )
+    return _executor
+
+
+def get_variant_name(name, variant, image_format):
+    directory, filename = os.path.split(name)
+    stem = os.path.splitext(filename)[0]
+    extension = IMAGE_FORMATS[image_format][1]
+    return os.path.join(
+        directory, VARIANTS_DIR, f'{stem}_{variant}.{extension}'
+    )
+
+
+def get_variant_names(name):
+    for variant in settings.IMAGE_VARIANTS:
+        for image_format in IMAGE_FORMATS:
+            yield get_variant_name(name, variant, image_format)
+
+
+def get_image_variants(image, request=None):
+    """Возвращает ссылки на уменьшенные копии изображения.
+
+    Ссылки строятся по имени исходного файла без обращения к хранилищу,
+    поэтому пока копии генерируются, клиент должен использовать оригинал.
+    """
+    if not image:
+        return None
+    variants = {}
+    for variant in settings.IMAGE_VARIANTS:
+        urls = {}
+        for image_format in IMAGE_FORMATS:
+            url = default_storage.url(
+                get_variant_name(image.name, variant, image_format)
+            )
+            if request is not None:
+                url = request.build_absolute_uri(url)
+            urls[image_format] = url
+        variants[variant] = urls
+    return variants
+
+
+def prepare_image(image, image_format):
+    if image_format == 'jpeg' and image.mode != 'RGB':
+        rgba = image.convert('RGBA')
+        background = Image.new('RGB', rgba.size, (255, 255, 255))
+        background.paste(rgba, mask=rgba.getchannel('A'))
+        return background
+    if image.mode not in ('RGB', 'RGBA'):
+        return image.convert('RGBA')
+    return image
+
+
+def generate_image_variants(name):
+    with default_storage.open(name) as source:
+        original = ImageOps.exif_transpose(Image.open(source))
+        original.load()
+    for variant, size in settings.IMAGE_VARIANTS.items():
+        resized = original.copy()
+        resized.thumbnail((size, size), Image.LANCZOS)
+        for image_format, (pil_format, _) in IMAGE_FORMATS.items():
+            buffer = BytesIO()
+            prepare_image(resized, image_format).save(
+                buffer, pil_format, quality=settings.IMAGE_VARIANT_QUALITY
+            )
+            variant_name = get_variant_name(name, variant, image_format)
+            if default_storage.exists(variant_name):
+                default_storage.delete(variant_name)
+            default_storage.save(variant_name, ContentFile(buffer.getvalue()))
+
+
+def process_image(name):
+    try:
+        generate_image_variants(name)
+    except Exception:
+        logger.exception('Не удалось обработать изображение %s', name)
+
+
+def schedule_image_variants(image):
+    """Ставит генерацию копий в очередь после фиксации транзакции."""
+    if not image:
+        return
+    name = image.name
+
+    def submit():
+        if settings.IMAGE_PROCESSING_ASYNC:
+            get_executor().submit(process_image, name)
+        else:
+            process_image(name)
+
+    transaction.on_commit(submit)
+
+
+def delete_image_variants(name):
+    for variant_name in get_variant_names(name):
+        if default_storage.exists(variant_name):
+            default_storage.delete(variant_name)
@@ -0,0 +1,206 @@
+import json
+from collections import Counter
+from itertools import islice
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import DatabaseError, transaction
+from rest_framework.exceptions import ValidationError
+
+from .images import schedule_image_variants
+from .serializers import RecipeImportSerializer
+from recipe.models import (FeedEntry, Ingredient, Recipe, RecipeIngredient,
+                           RecipeTag, Tag)
+from recipe.utils import generate_short_link
+
+User = get_user_model()
+
+
+class RecipeImporter:
+    """Пакетный импорт рецептов из NDJSON.
+
+    Каждая строка - отдельный рецепт. Строки проверяются пачками по
+    справочникам тегов и ингредиентов, загруженным один раз на импорт,
+    а рецепты пачки и их связи сохраняются через bulk_create. Ошибки
+    собираются по номерам строк и не прерывают импорт остальных строк.
+    """
+
+    def __init__(self, author, batch_size=None):
+        self.author = author
+        self.batch_size = batch_size or settings.RECIPE_IMPORT_BATCH_SIZE
+        self.tag_slugs = dict(Tag.objects.values_list('slug', 'id'))
+        self.tag_ids = set(self.tag_slugs.values())
+        self.ingredient_names = dict(
+            Ingredient.objects.values_list('name', 'id')
+        )
+        self.ingredient_ids = set(self.ingredient_names.values())
+        self.seen_names = set()
+        self.created = 0
+        self.errors = []
+
+    def run(self, lines) -> dict:
+        numbered_lines = enumerate(lines, start=1)
+        while True:
+            batch = list(islice(numbered_lines, self.batch_size))
+            if not batch:
+                break
+            self.import_batch(batch)
+        return {'created': self.created, 'errors': self.errors}
+
+    def add_error(self, line_number, errors):
+        self.errors.append({'line': line_number, 'errors': errors})
+
+    def resolve_tag(self, value: str) -> int:
+        if value.isdigit() and int(value) in self.tag_ids:
+            return int(value)
+        if value in self.tag_slugs:
+            return self.tag_slugs[value]
+        raise ValidationError({'tags': f'Тег {value} не найден'})
+
+    def resolve_ingredient(self, item: dict) -> int:
+        if 'id' in item:
+            if item['id'] in self.ingredient_ids:
+                return item['id']
+            raise ValidationError(
+                {'ingredients': f'Ингредиент {item["id"]} не найден'}
+            )
+        if item['name'] in self.ingredient_names:
+            return self.ingredient_names[item['name']]
+        raise ValidationError(
+            {'ingredients': f'Ингредиент {item["name"]} не найден'}
+        )
+
+    def validate_line(self, line: str) -> dict:
+        try:
+            data = json.loads(line)
+        except ValueError:
+            raise ValidationError('Некорректный JSON')
+        serializer = RecipeImportSerializer(data=data)
+        serializer.is_valid(raise_exception=True)
+        recipe = serializer.validated_data
+        if recipe['name'] in self.seen_names:
+            raise ValidationError(
+                {'name': 'Рецепт с таким названием уже существует'}
+            )
+        recipe['tags'] = {self.resolve_tag(tag) for tag in recipe['tags']}
+        amounts = {}
+        for item in recipe['ingredients']:
+            ingredient_id = self.resolve_ingredient(item)
+            if ingredient_id in amounts:
+                raise ValidationError(
+                    {'ingredients': 'Ингредиенты не должны повторяться'}
+                )
+            amounts[ingredient_id] = item['amount']
+        recipe['ingredients'] = amounts
+        return recipe
+
+    def get_authors(self, recipes: list) -> dict:
+        author_ids = {
+            recipe['author'] for _, recipe in recipes if 'author' in recipe
+        }
+        return {
+            author.id: author
+            for author in User.objects.filter(id__in=author_ids)
+        }
+
+    @staticmethod
+    def generate_short_links(count: int) -> list:
+        short_links = set()
+        for _ in range(10):
+            while len(short_links) < count:
+                short_links.add(generate_short_link())
+            taken = set(Recipe.objects.filter(
+                short_link__in=short_links
+            ).values_list('short_link', flat=True))
+            if not taken:
+                return list(short_links)
+            short_links -= taken
+        raise ValidationError(
+            'Не удалось сгенерировать уникальную короткую ссылку.'
+        )
+
+    def import_batch(self, batch: list):
+        recipes = []
+        for line_number, line in batch:
+            if not line.strip():
+                continue
+            try:
+                recipes.append((line_number, self.validate_line(line)))
+            except ValidationError as error:
+                self.add_error(line_number, error.detail)
+                continue
+            self.seen_names.add(recipes[-1][1]['name'])
+        existing_names = set(Recipe.objects.filter(
+            name__in=[recipe['name'] for _, recipe in recipes]
+        ).values_list('name', flat=True))
+        authors = self.get_authors(recipes)
+        valid_recipes = []
+        for line_number, recipe in recipes:
+            if recipe['name'] in existing_names:
+                self.add_error(line_number, {
+                    'name': ['Рецепт с таким названием уже существует']
+                })
+            elif recipe.get('author', self.author.id) not in (
+                    authors.keys() | {self.author.id}):
+                self.add_error(line_number, {
+                    'author': ['Пользователь не найден']
+                })
+            else:
+                valid_recipes.append((line_number, recipe))
+        if not valid_recipes:
+            return
+        try:
+            with transaction.atomic():
+                self.save_batch(valid_recipes, authors)
+        except (DatabaseError, ValidationError) as error:
+            for line_number, _ in valid_recipes:
+                self.add_error(line_number, [str(error)])
+            return
+        self.created += len(valid_recipes)
+
+    def save_batch(self, recipes: list, authors: dict):
+        short_links = self.generate_short_links(len(recipes))
+        objects = [
+            Recipe(
+                author=authors.get(recipe.get('author'), self.author),
+                name=recipe['name'],
+                text=recipe['text'],
+                cooking_time=recipe['cooking_time'],
+                image=recipe.get('image'),
+                short_link=short_link,
+            )
+            for (_, recipe), short_link in zip(recipes, short_links)
+        ]
+        Recipe.objects.bulk_create(objects)
+        if any(recipe.pk is None for recipe in objects):
+            # SQLite не возвращает первичные ключи из bulk_create
+            ids = dict(Recipe.objects.filter(
+                short_link__in=short_links
+            ).values_list('short_link', 'id'))
+            for recipe in objects:
+                recipe.pk = ids[recipe.short_link]
+        recipe_tags = []
+        recipe_ingredients = []
+        for recipe, (_, data) in zip(objects, recipes):
+            recipe_tags.extend(
+                RecipeTag(recipe_id=recipe.pk, tag_id=tag_id)
+                for tag_id in data['tags']
+            )
+            recipe_ingredients.extend(
+                RecipeIngredient(
+                    recipe_id=recipe.pk, ingredient_id=ingredient_id,
+                    amount=amount
+                )
+                for ingredient_id, amount in data['ingredients'].items()
+            )
+        RecipeTag.objects.bulk_create(recipe_tags)
+        RecipeIngredient.objects.bulk_create(recipe_ingredients)
+        for author_id, count in Counter(
+                recipe.author_id for recipe in objects).items():
+            User.objects.change_counter(author_id, 'recipes_count', count)
+        FeedEntry.objects.fan_out_many(objects)
+        for recipe in objects:
+            # bulk_create не вызывает сериализатор рецепта, поэтому копии
+            # изображений ставятся в очередь здесь, после фиксации пачки
+            schedule_image_variants(recipe.image)
+        return objects
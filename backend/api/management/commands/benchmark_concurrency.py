@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.benchmarks import run_load
+
+DEFAULT_PATHS = ('/api/recipes/', '/api/ingredients/?name=а')
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пропускную способность запущенных серверов при '
+        'одновременных запросах, например:\n'
+        'gunicorn -w 4 -b :8000 foodgram_backend.wsgi и\n'
+        'gunicorn -w 4 -k uvicorn.workers.UvicornWorker -b :8001 '
+        'foodgram_backend.asgi'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--target', action='append', required=True,
+            help='Имя и адрес сервера: wsgi=http://localhost:8000'
+        )
+        parser.add_argument(
+            '--path', action='append',
+            help='Путь запроса, можно указать несколько раз'
+        )
+        parser.add_argument('--concurrency', type=int, default=50)
+        parser.add_argument('--requests', type=int, default=1000)
+        parser.add_argument(
+            '--token', help='Токен для заголовка Authorization'
+        )
+
+    def handle(self, *args, **options):
+        headers = {}
+        if options['token']:
+            headers['Authorization'] = f'Token {options["token"]}'
+        paths = options['path'] or DEFAULT_PATHS
+        for target in options['target']:
+            name, sep, base_url = target.partition('=')
+            if not sep:
+                raise CommandError(f'Ожидается имя=адрес, получено {target}')
+            result = run_load(
+                [base_url.rstrip('/') + path for path in paths],
+                options['concurrency'], options['requests'], headers
+            )
+            self.stdout.write(f'{name}: {result.summary()}')
@@ -0,0 +1,62 @@
+import io
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory
+
+from api.parsers import FastJSONParser, orjson
+from api.renderers import FastJSONRenderer
+from api.views import RecipeViewSet
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает скорость JSONRenderer и JSONParser со стандартным '
+            'json и с orjson на странице списка рецептов')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit', type=int, default=50,
+            help='Число рецептов на странице'
+        )
+        parser.add_argument('--iterations', type=int, default=200)
+
+    def get_payload(self, limit):
+        request = APIRequestFactory().get('/api/recipes/', {'limit': limit})
+        response = RecipeViewSet.as_view({'get': 'list'})(request)
+        if not response.data['results']:
+            raise CommandError(
+                'В базе нет рецептов, сначала выполните generate_dataset'
+            )
+        return response.data
+
+    def measure(self, func, iterations):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            func()
+        return (time.perf_counter() - start) / iterations * 1000
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            self.stderr.write('orjson не установлен, сравнивается json с json')
+        iterations = options['iterations']
+        data = self.get_payload(options['limit'])
+        content = JSONRenderer().render(data)
+        self.stdout.write(
+            f'Рецептов: {len(data["results"])}, размер ответа: '
+            f'{len(content)} байт'
+        )
+        for name, default, fast in (
+            ('render', lambda: JSONRenderer().render(data),
+             lambda: FastJSONRenderer().render(data)),
+            ('parse', lambda: JSONParser().parse(io.BytesIO(content)),
+             lambda: FastJSONParser().parse(io.BytesIO(content))),
+        ):
+            default_time = self.measure(default, iterations)
+            fast_time = self.measure(fast, iterations)
+            self.stdout.write(
+                f'{name}: json {default_time:.3f} мс, '
+                f'orjson {fast_time:.3f} мс, '
+                f'быстрее в {default_time / fast_time:.1f} раза'
+            )
@@ -0,0 +1,52 @@
+import time
+
+from django.contrib.auth import authenticate, get_user_model
+from django.contrib.auth.hashers import get_hashers
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+User = get_user_model()
+
+PASSWORD = 'benchmark-password-123'
+
+
+class Command(BaseCommand):
+    help = ('Измеряет число проверок пароля и входов в секунду '
+            'на один воркер для каждого настроенного хешера')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument(
+            '--login', action='store_true',
+            help='Дополнительно измерить вход через authenticate()'
+        )
+
+    def measure(self, func, iterations):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            func()
+        return iterations / (time.perf_counter() - start)
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        for hasher in get_hashers():
+            encoded = hasher.encode(PASSWORD, hasher.salt())
+            rate = self.measure(
+                lambda: hasher.verify(PASSWORD, encoded), iterations
+            )
+            self.stdout.write(f'{hasher.algorithm}: {rate:.1f} проверок/с')
+        if options['login']:
+            self.benchmark_login(iterations)
+
+    def benchmark_login(self, iterations):
+        with transaction.atomic():
+            user = User.objects.create_user(
+                email='benchmark@benchmark.ru', username='benchmark',
+                password=PASSWORD
+            )
+            rate = self.measure(
+                lambda: authenticate(email=user.email, password=PASSWORD),
+                iterations
+            )
+            transaction.set_rollback(True)
+        self.stdout.write(f'authenticate(): {rate:.1f} входов/с')
@@ -0,0 +1,74 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from rest_framework.throttling import ScopedRateThrottle
+
+from api import throttling
+
+SCOPE = 'benchmark'
+
+
+class View:
+    throttle_scope = SCOPE
+
+
+class Throttle(throttling.TokenBucketThrottle):
+
+    def __init__(self, rate):
+        super().__init__()
+        self.rate = rate
+
+    def get_rate(self, scope):
+        return throttling.parse_rate(self.rate)
+
+
+class Command(BaseCommand):
+    help = ('Измеряет накладные расходы TokenBucketThrottle на запрос: '
+            'пропуск с обращением к кэшу, отказ из памяти процесса и, для '
+            'сравнения, ScopedRateThrottle из DRF')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20000)
+
+    def measure(self, get_throttle, request, iterations):
+        cache.delete_many([
+            f'{throttling.CACHE_KEY_PREFIX}{SCOPE}:ip:127.0.0.1',
+            f'throttle_{SCOPE}_127.0.0.1',
+        ])
+        throttling.blocked.clear()
+        view = View()
+        allowed = 0
+        start = time.perf_counter()
+        for _ in range(iterations):
+            allowed += get_throttle().allow_request(request, view)
+        elapsed = time.perf_counter() - start
+        return elapsed / iterations * 10 ** 6, allowed
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        request = Request(APIRequestFactory().get('/api/recipes/'))
+        request.user = AnonymousUser()
+        unlimited = f'{iterations * 10}/s'
+
+        class DRFThrottle(ScopedRateThrottle):
+            THROTTLE_RATES = {SCOPE: unlimited}
+
+        self.stdout.write(
+            f'Кэш: {settings.CACHES["default"]["BACKEND"]}, '
+            f'запросов: {iterations}'
+        )
+        for name, get_throttle in (
+            ('корзина, пропуск', lambda: Throttle(unlimited)),
+            ('корзина, отказ', lambda: Throttle('1/d')),
+            ('ScopedRateThrottle DRF', DRFThrottle),
+        ):
+            duration, allowed = self.measure(get_throttle, request, iterations)
+            self.stdout.write(
+                f'{name}: {duration:.1f} мкс на запрос, '
+                f'пропущено {allowed} из {iterations}'
+            )
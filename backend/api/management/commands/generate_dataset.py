@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand
+
+from api.datasets import DatasetGenerator
+
+
+class Command(BaseCommand):
+    help = ('Создает пользователей, рецепты, подписки, избранное и корзины '
+            'для нагрузочного тестирования')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--recipes', type=int, default=5000)
+        parser.add_argument(
+            '--follows', type=float, default=10,
+            help='Среднее число подписок пользователя'
+        )
+        parser.add_argument(
+            '--favorites', type=float, default=20,
+            help='Среднее число рецептов в избранном пользователя'
+        )
+        parser.add_argument(
+            '--cart', type=float, default=3,
+            help='Среднее число рецептов в корзине пользователя'
+        )
+        parser.add_argument(
+            '--authors-ratio', type=float, default=0.2,
+            help='Доля пользователей, публикующих рецепты'
+        )
+        parser.add_argument(
+            '--password',
+            help='Пароль пользователей, по умолчанию вход по паролю закрыт'
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--seed', type=int, default=None,
+            help='Зерно генератора для воспроизводимого набора данных'
+        )
+
+    def handle(self, *args, **options):
+        stats = DatasetGenerator(
+            options['users'], options['recipes'],
+            follows=options['follows'], favorites=options['favorites'],
+            cart=options['cart'], authors_ratio=options['authors_ratio'],
+            password=options['password'], batch_size=options['batch_size'],
+            seed=options['seed']
+        ).run()
+        for name, count in stats.items():
+            self.stdout.write(f'{name}: {count}')
@@ -0,0 +1,25 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from api.images import process_image
+from recipe.models import Recipe
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Генерирует уменьшенные копии изображений рецептов и аватаров'
+
+    def handle(self, *args, **options):
+        names = list(
+            Recipe.objects.exclude(image='').exclude(
+                image__isnull=True
+            ).values_list('image', flat=True)
+        ) + list(
+            User.objects.exclude(avatar='').exclude(
+                avatar__isnull=True
+            ).values_list('avatar', flat=True)
+        )
+        for name in names:
+            process_image(name)
+        self.stdout.write(f'Обработано изображений: {len(names)}')
@@ -0,0 +1,34 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from api.importers import RecipeImporter
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Импортирует рецепты из файла NDJSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Путь к файлу NDJSON')
+        parser.add_argument(
+            '--author', required=True,
+            help='Email автора рецептов, у которых автор не указан'
+        )
+        parser.add_argument('--batch-size', type=int, default=None)
+
+    def handle(self, *args, **options):
+        try:
+            author = User.objects.get(email=options['author'])
+        except User.DoesNotExist:
+            raise CommandError(
+                f'Пользователь {options["author"]} не найден'
+            )
+        importer = RecipeImporter(author, batch_size=options['batch_size'])
+        with open(options['path'], encoding='utf-8') as file:
+            report = importer.run(file)
+        for error in report['errors']:
+            self.stderr.write(json.dumps(error, ensure_ascii=False))
+        self.stdout.write(f'Импортировано рецептов: {report["created"]}')
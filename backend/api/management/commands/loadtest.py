@@ -0,0 +1,178 @@
+import json
+import random
+from urllib.parse import urlencode
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.authtoken.models import Token
+
+from api.benchmarks import LoadResult, run_requests
+from recipe.models import Ingredient, Recipe, Tag
+
+User = get_user_model()
+
+SAMPLE_SIZE = 1000
+
+# Имя, вес, нужен ли токен, метод и функция, строящая путь по данным
+SCENARIOS = (
+    ('recipes', 30, False, 'GET', lambda data, rng: '/api/recipes/'),
+    ('recipes page', 10, True, 'GET', lambda data, rng: (
+        '/api/recipes/?' + urlencode({
+            'limit': 6, 'page': rng.randint(1, data['pages'])
+        })
+    )),
+    ('recipes by tag', 5, False, 'GET', lambda data, rng: (
+        '/api/recipes/?tags=' + rng.choice(data['tags'])
+    )),
+    ('recipes favorited', 3, True, 'GET',
+     lambda data, rng: '/api/recipes/?is_favorited=1'),
+    ('recipe', 20, True, 'GET', lambda data, rng: (
+        f'/api/recipes/{rng.choice(data["recipes"])}/'
+    )),
+    ('recipe link', 2, False, 'GET', lambda data, rng: (
+        f'/api/recipes/{rng.choice(data["recipes"])}/get-link/'
+    )),
+    ('feed', 3, True, 'GET', lambda data, rng: '/api/recipes/feed/'),
+    ('ingredients search', 10, False, 'GET', lambda data, rng: (
+        '/api/ingredients/?' + urlencode({
+            'name': rng.choice(data['ingredients'])
+        })
+    )),
+    ('tags', 5, False, 'GET', lambda data, rng: '/api/tags/'),
+    ('users', 2, True, 'GET', lambda data, rng: '/api/users/'),
+    ('user', 2, True, 'GET', lambda data, rng: (
+        f'/api/users/{rng.choice(data["users"])}/'
+    )),
+    ('me', 3, True, 'GET', lambda data, rng: '/api/users/me/'),
+    ('subscriptions', 3, True, 'GET', lambda data, rng: (
+        '/api/users/subscriptions/?recipes_limit=3'
+    )),
+    ('shopping cart', 2, True, 'GET',
+     lambda data, rng: '/api/recipes/download_shopping_cart/'),
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагружает запущенный сервер взвешенной смесью запросов к API и '
+        'выводит пропускную способность и перцентили времени ответа по '
+        'каждому эндпоинту. Данные берутся из той же базы, что у сервера, '
+        'например созданные командой generate_dataset.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://localhost:8000')
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--concurrency', type=int, default=20)
+        parser.add_argument(
+            '--users', type=int, default=50,
+            help='Сколько пользователей с токенами отправляют запросы'
+        )
+        parser.add_argument(
+            '--scenario', action='append',
+            help='Запустить только указанные сценарии'
+        )
+        parser.add_argument('--seed', type=int, default=None)
+        parser.add_argument(
+            '--output', help='Сохранить результаты в JSON как базовые'
+        )
+        parser.add_argument(
+            '--baseline', help='Сравнить с ранее сохраненными результатами'
+        )
+
+    def get_scenarios(self, names):
+        if not names:
+            return SCENARIOS
+        unknown = set(names) - {scenario[0] for scenario in SCENARIOS}
+        if unknown:
+            raise CommandError(f'Неизвестные сценарии: {", ".join(unknown)}')
+        return [scenario for scenario in SCENARIOS if scenario[0] in names]
+
+    @staticmethod
+    def get_data(users_count):
+        recipes = list(Recipe.objects.order_by('?').values_list(
+            'id', flat=True
+        )[:SAMPLE_SIZE])
+        users = list(User.objects.filter(is_active=True).order_by(
+            '?'
+        ).values_list('id', flat=True)[:SAMPLE_SIZE])
+        if not recipes or not users:
+            raise CommandError(
+                'В базе нет рецептов или пользователей, '
+                'сначала выполните generate_dataset'
+            )
+        tokens = [
+            Token.objects.get_or_create(user_id=user_id)[0].key
+            for user_id in users[:users_count]
+        ]
+        return {
+            'recipes': recipes,
+            'users': users,
+            'tokens': tokens,
+            'pages': max(1, Recipe.objects.count() // 6),
+            'tags': list(Tag.objects.values_list('slug', flat=True)) or [''],
+            'ingredients': list({
+                name[:3] for name in Ingredient.objects.order_by(
+                    '?'
+                ).values_list('name', flat=True)[:SAMPLE_SIZE]
+            }) or [''],
+        }
+
+    def handle(self, *args, **options):
+        scenarios = self.get_scenarios(options['scenario'])
+        data = self.get_data(options['users'])
+        rng = random.Random(options['seed'])
+        base_url = options['url'].rstrip('/')
+        weights = [scenario[1] for scenario in scenarios]
+        remaining = iter(range(options['requests']))
+
+        def next_request():
+            if next(remaining, None) is None:
+                return None
+            name, _, auth, method, get_path = rng.choices(
+                scenarios, weights
+            )[0]
+            headers = None
+            if auth:
+                headers = {
+                    'Authorization': f'Token {rng.choice(data["tokens"])}'
+                }
+            return name, method, base_url + get_path(data, rng), headers
+
+        results = run_requests(next_request, options['concurrency'])
+        report = {
+            name: results[name].as_dict()
+            for name, *_ in scenarios if name in results
+        }
+        report['total'] = LoadResult.combine(results.values()).as_dict()
+        baseline = {}
+        if options['baseline']:
+            with open(options['baseline'], encoding='utf-8') as file:
+                baseline = json.load(file)
+        self.print_report(report, baseline)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(report, file, ensure_ascii=False, indent=2)
+
+    @staticmethod
+    def format_change(value, old):
+        if not old:
+            return ''
+        return f' ({(value - old) / old * 100:+.0f}%)'
+
+    def print_report(self, report, baseline):
+        self.stdout.write(
+            f'{"эндпоинт":<20}{"запросы":>9}{"ошибки":>8}{"rps":>16}'
+            f'{"p50, мс":>18}{"p95, мс":>18}{"p99, мс":>18}'
+        )
+        for name, row in report.items():
+            old = baseline.get(name, {})
+            columns = [
+                f'{row[key]}{self.format_change(row[key], old.get(key))}'
+                for key in ('rps', 'p50_ms', 'p95_ms', 'p99_ms')
+            ]
+            self.stdout.write(
+                f'{name:<20}{row["requests"]:>9}{row["errors"]:>8}'
+                f'{columns[0]:>16}{columns[1]:>18}{columns[2]:>18}'
+                f'{columns[3]:>18}'
+            )
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from recipe.models import ShoppingListItem
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает списки покупок пользователей по их корзинам'
+
+    def handle(self, *args, **options):
+        count = ShoppingListItem.objects.rebuild()
+        self.stdout.write(f'Записей в списках покупок: {count}')
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from recipe.models import FeedEntry
+
+
+class Command(BaseCommand):
+    help = 'Обрезает ленты подписок до FEED_MAX_ENTRIES записей'
+
+    def handle(self, *args, **options):
+        FeedEntry.objects.trim()
+        self.stdout.write(f'Записей в лентах: {FeedEntry.objects.count()}')
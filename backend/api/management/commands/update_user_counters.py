@@ -0,0 +1,26 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from api.authentication import invalidate_users
+
+User = get_user_model()
+
+BATCH_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счетчики подписчиков, подписок и рецептов'
+
+    def handle(self, *args, **options):
+        count = User.objects.recount()
+        # Пересчет идет через update(), минуя сигналы, поэтому кэш
+        # аутентификации сбрасывается для всех пользователей
+        user_ids = User.objects.values_list('pk', flat=True).iterator()
+        batch = []
+        for user_id in user_ids:
+            batch.append(user_id)
+            if len(batch) == BATCH_SIZE:
+                invalidate_users(*batch)
+                batch = []
+        invalidate_users(*batch)
+        self.stdout.write(f'Обновлено пользователей: {count}')
@@ -0,0 +1,312 @@
+import time
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils.cache import patch_vary_headers
+from rest_framework.exceptions import APIException
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.request import Request
+from rest_framework.serializers import BaseSerializer
+from rest_framework.settings import api_settings
+
+from .compression import (choose_encoding, compress, compress_stream,
+                          is_compressible)
+from .fast_serializers import FastSerializer
+from .models import RequestProfile
+from .profiling import CPROFILE, SAMPLE, profile_call
+from foodgram_backend import metrics
+
+PIN_KEY_PREFIX = 'db:pin:'
+PROFILE_HEADER = 'HTTP_X_PROFILE'
+PROFILE_PARAM = '_profile'
+PROFILE_COUNT_KEY_PREFIX = 'profiling:count:'
+
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+request_duration = metrics.histogram(
+    'api_request_duration_seconds', 'Время обработки запроса к API',
+    SECONDS_BUCKETS
+)
+request_queries = metrics.histogram(
+    'api_request_queries', 'Количество SQL-запросов на запрос к API',
+    QUERY_BUCKETS
+)
+request_sql_time = metrics.histogram(
+    'api_request_sql_seconds', 'Время SQL-запросов на запрос к API',
+    SECONDS_BUCKETS
+)
+request_serializer_time = metrics.histogram(
+    'api_request_serializer_seconds',
+    'Время сериализации ответа, включая запросы к базе из сериализаторов',
+    SECONDS_BUCKETS
+)
+response_size = metrics.histogram(
+    'api_response_size_bytes', 'Размер тела ответа API', SIZE_BUCKETS
+)
+
+request_stats = ContextVar('request_stats', default=None)
+
+
+def get_pin_key(user):
+    return f'{PIN_KEY_PREFIX}{user.pk}'
+
+
+def is_pinned(user):
+    return user.is_authenticated and bool(cache.get(get_pin_key(user)))
+
+
+class ReplicaPinMiddleware:
+    """Закрепляет пользователя за основной базой после записи.
+
+    Реплики отстают от основной базы, поэтому в течение
+    DB_REPLICA_PIN_SECONDS после изменяющего запроса чтения этого
+    пользователя не уходят на реплики и он видит свои изменения.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        user = getattr(request, 'user', None)
+        if (settings.DB_REPLICAS and request.method not in SAFE_METHODS
+                and user is not None and user.is_authenticated):
+            cache.set(get_pin_key(user), True, settings.DB_REPLICA_PIN_SECONDS)
+        return response
+
+
+class RequestStats:
+    __slots__ = ('view', 'action', 'queries', 'sql_time', 'serializer_time',
+                 'serializer_depth')
+
+    def __init__(self):
+        self.view = self.action = None
+        self.queries = self.serializer_depth = 0
+        self.sql_time = self.serializer_time = 0
+
+
+def record_query(execute, sql, params, many, context):
+    stats = request_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.queries += 1
+        stats.sql_time += time.perf_counter() - start
+
+
+def instrument_connection(connection):
+    # Соединения привязаны к потоку, а асинхронные представления работают
+    # в потоках пула, поэтому обертка ставится на каждое соединение, а
+    # статистика запроса берется из контекста
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def instrument_serializers():
+    """Оборачивает data сериализаторов для учета времени сериализации.
+
+    Вызывается при запуске только с включенным REQUEST_METRICS_ENABLED,
+    повторный вызов ничего не меняет.
+    """
+    for serializer_class in (BaseSerializer, FastSerializer):
+        get_data = serializer_class.data.fget
+        if not hasattr(get_data, '__wrapped__'):
+            serializer_class.data = property(timed_serializer_data(get_data))
+
+
+def timed_serializer_data(get_data):
+
+    @wraps(get_data)
+    def data(serializer):
+        stats = request_stats.get()
+        # Учитывается только внешний сериализатор, вложенные входят в него
+        if stats is None or stats.serializer_depth:
+            return get_data(serializer)
+        stats.serializer_depth += 1
+        start = time.perf_counter()
+        try:
+            return get_data(serializer)
+        finally:
+            stats.serializer_time += time.perf_counter() - start
+            stats.serializer_depth -= 1
+    return data
+
+
+class RequestMetricsMiddleware:
+    """Собирает по представлениям и действиям DRF время ответа, число и
+    время SQL-запросов, время сериализации и размер ответа.
+    """
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = RequestStats()
+        token = request_stats.set(stats)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            request_stats.reset(token)
+        if stats.view is not None:
+            labels = {'view': stats.view, 'action': stats.action}
+            request_duration.observe(time.perf_counter() - start, **labels)
+            request_queries.observe(stats.queries, **labels)
+            request_sql_time.observe(stats.sql_time, **labels)
+            request_serializer_time.observe(stats.serializer_time, **labels)
+            if not response.streaming:
+                response_size.observe(len(response.content), **labels)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view_class = getattr(view_func, 'cls', None)
+        stats = request_stats.get()
+        if view_class is None or stats is None:
+            return
+        method = request.method.lower()
+        stats.view = view_class.__name__
+        stats.action = (getattr(view_func, 'actions', None) or {}).get(
+            method, method
+        )
+
+
+def get_profile_mode(request):
+    mode = request.META.get(PROFILE_HEADER) or request.GET.get(PROFILE_PARAM)
+    if not mode:
+        return None
+    return CPROFILE if mode == CPROFILE else SAMPLE
+
+
+def get_profiling_user(request):
+    """Пользователь из сессии или из токена API.
+
+    Токены DRF проверяет уже в представлении, поэтому здесь аутентификаторы
+    API вызываются напрямую, не меняя request.user.
+    """
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return user
+    api_request = Request(request)
+    for authentication_class in api_settings.DEFAULT_AUTHENTICATION_CLASSES:
+        try:
+            result = authentication_class().authenticate(api_request)
+        except APIException:
+            return None
+        if result is not None:
+            return result[0]
+    return None
+
+
+def acquire_profiling_slot():
+    key = f'{PROFILE_COUNT_KEY_PREFIX}{int(time.time() // 3600)}'
+    cache.add(key, 0, 3600)
+    try:
+        count = cache.incr(key)
+    except ValueError:
+        count = 1
+    return count <= settings.PROFILING_MAX_PER_HOUR
+
+
+class ProfilingMiddleware:
+    """Профилирует запросы суперпользователей по заголовку X-Profile или
+    параметру _profile.
+
+    Значение cprofile включает cProfile, любое другое - семплирующий
+    профайлер. Профили сохраняются в RequestProfile и скачиваются из
+    админки, номер профиля возвращается в заголовке X-Profile-Id. Число
+    профилей ограничено PROFILING_MAX_PER_HOUR в час на все процессы,
+    хранятся последние PROFILING_MAX_STORED.
+    """
+
+    def __init__(self, get_response):
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        mode = get_profile_mode(request)
+        if mode is None:
+            return self.get_response(request)
+        user = get_profiling_user(request)
+        if user is None or not user.is_superuser:
+            return self.get_response(request)
+        if not acquire_profiling_slot():
+            response = self.get_response(request)
+            response['X-Profile'] = 'rate-limited'
+            return response
+        start = time.perf_counter()
+        response, profile_data = profile_call(
+            mode, settings.PROFILING_SAMPLE_INTERVAL,
+            self.get_response, request
+        )
+        profile = RequestProfile.objects.create(
+            user_id=user.pk, method=request.method,
+            path=request.get_full_path()[:2048], mode=mode,
+            status_code=response.status_code,
+            duration=(time.perf_counter() - start) * 1000, **profile_data
+        )
+        RequestProfile.objects.filter(pk__in=list(
+            RequestProfile.objects.order_by('-pk').values_list(
+                'pk', flat=True
+            )[settings.PROFILING_MAX_STORED:]
+        )).delete()
+        response['X-Profile-Id'] = profile.pk
+        return response
+
+
+class CompressionMiddleware:
+    """Сжимает ответы gzip или brotli по заголовку Accept-Encoding.
+
+    Ответы короче COMPRESSION_MIN_SIZE и несжимаемые типы содержимого
+    отдаются как есть, потоковые ответы сжимаются по частям. Если у ответа
+    есть готовые сжатые варианты в compressed_content, например из кэша
+    ответов, они отдаются без повторного сжатия.
+    """
+
+    def __init__(self, get_response):
+        if not settings.COMPRESSION_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if (response.has_header('Content-Encoding')
+                or not is_compressible(response.get('Content-Type', ''))
+                or (not response.streaming and len(response.content)
+                    < settings.COMPRESSION_MIN_SIZE)):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = choose_encoding(
+            request.META.get('HTTP_ACCEPT_ENCODING', '')
+        )
+        if encoding is None:
+            return response
+        if response.streaming:
+            response.streaming_content = compress_stream(
+                response.streaming_content, encoding
+            )
+            del response['Content-Length']
+        else:
+            compressed = getattr(response, 'compressed_content', {}).get(
+                encoding
+            ) or compress(response.content, encoding)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response['Content-Length'] = str(len(compressed))
+        # Сжатое тело отличается побайтно, строгий ETag становится слабым
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = encoding
+        return response
@@ -1,5 +1,14 @@
+from django.conf import settings
+from django.db import transaction
+from django.utils.functional import cached_property
 from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
 
+from .caching import cache_response, get_cached_response, get_response_key
+from .fast_serializers import FastSerializer
+from .middleware import is_pinned
+from .relations import get_user_relations
+from foodgram_backend.db.router import replica_reads
 from recipe.models import Recipe
 
 
@@ -25,18 +34,115 @@ class SerializerFavoriteShoppingCartMixin(serializers.ModelSerializer):
         model = Recipe
         fields = ('id',)
 
+    @cached_property
+    def recipe(self):
+        # validate() и create() работают с одним рецептом, загружаем его
+        # один раз
+        return self.context.get('view').get_object()
+
     def get_context_data(self):
         request = self.context.get('request')
-        recipe = self.context.get('view').get_object()
-        return request, recipe
+        return request, self.recipe
 
     def create(self, validated_data):
         request, recipe = self.get_context_data()
-        self.model.objects.get_or_create(user=request.user, recipe=recipe)
+        # Повторное добавление уже отклонено в validate() по связям
+        # пользователя, отдельная проверка get_or_create не нужна
+        with transaction.atomic():
+            self.model.objects.create(user=request.user, recipe=recipe)
+        get_user_relations(request).add(self.model, recipe.pk)
         return recipe
 
     def delete(self, instance):
         request = self.context.get('request')
         obj = self.model.objects.get(user=request.user, recipe=instance)
         obj.delete()
+        get_user_relations(request).discard(self.model, instance.pk)
         return instance
+
+
+class ReplicaReadMixin:
+    """Отправляет чтения безопасных запросов представления на реплики.
+
+    replica_actions ограничивает действия viewset, для которых это
+    допустимо; None означает все безопасные запросы.
+    """
+    replica_actions = None
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if (settings.DB_REPLICAS and request.method in SAFE_METHODS
+                and (self.replica_actions is None
+                     or getattr(self, 'action', None) in self.replica_actions)
+                and not is_pinned(request.user)):
+            self.replica_token = replica_reads.set(True)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        token = getattr(self, 'replica_token', None)
+        if token is not None:
+            replica_reads.reset(token)
+            self.replica_token = None
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+class FastReadMixin:
+    """Отдает ответы действий fast_actions через FastSerializer.
+
+    Вывод совпадает с сериализатором из get_serializer_class, запись и
+    остальные действия идут через DRF как обычно.
+    """
+    fast_actions = ('list', 'retrieve')
+
+    def get_serializer(self, *args, **kwargs):
+        if ('data' in kwargs or self.request.method not in SAFE_METHODS
+                or getattr(self, 'action', None) not in self.fast_actions):
+            return super().get_serializer(*args, **kwargs)
+        return self.get_read_serializer(
+            self.get_serializer_class(), *args, **kwargs
+        )
+
+    def get_read_serializer(self, serializer_class, *args, **kwargs):
+        kwargs.setdefault('context', self.get_serializer_context())
+        if not settings.FAST_SERIALIZERS:
+            return serializer_class(*args, **kwargs)
+        return FastSerializer(serializer_class, *args, **kwargs)
+
+
+class ResponseCacheMixin:
+    """Кэширует JSON-ответы действий cache_actions вместе со сжатыми
+    вариантами.
+
+    Подходит для ответов, которые не зависят от пользователя. Кэш модели
+    queryset сбрасывается сигналами при изменении ее объектов.
+    """
+    cache_actions = ('list', 'retrieve')
+    response_cache_key = None
+
+    def list(self, request, *args, **kwargs):
+        return self.get_cached(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_cached(super().retrieve, request, *args, **kwargs)
+
+    def get_cached(self, handler, request, *args, **kwargs):
+        if (not settings.RESPONSE_CACHE_TIMEOUT
+                or self.action not in self.cache_actions
+                or request.accepted_renderer.format != 'json'):
+            return handler(request, *args, **kwargs)
+        key = get_response_key(self.queryset.model, request)
+        response = get_cached_response(key)
+        if response is None:
+            response = handler(request, *args, **kwargs)
+            self.response_cache_key = key
+        return response
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(
+            request, response, *args, **kwargs
+        )
+        if self.response_cache_key and response.status_code == 200:
+            response.render()
+            response.compressed_content = cache_response(
+                self.response_cache_key, response
+            )
+        return response
@@ -0,0 +1,43 @@
+from django.contrib.auth import get_user_model
+from django.db import models
+
+from .profiling import CPROFILE, SAMPLE
+
+User = get_user_model()
+
+
+class RequestProfile(models.Model):
+    MODES = (
+        (SAMPLE, 'Семплирование'),
+        (CPROFILE, 'cProfile'),
+    )
+
+    user = models.ForeignKey(
+        User, on_delete=models.SET_NULL, null=True,
+        verbose_name='Пользователь'
+    )
+    method = models.CharField(max_length=10, verbose_name='Метод')
+    path = models.CharField(max_length=2048, verbose_name='Путь')
+    mode = models.CharField(
+        max_length=10, choices=MODES, verbose_name='Профайлер'
+    )
+    status_code = models.PositiveSmallIntegerField(
+        verbose_name='Код ответа'
+    )
+    duration = models.FloatField(verbose_name='Длительность, мс')
+    summary = models.TextField(verbose_name='Сводка')
+    stats = models.BinaryField(
+        null=True, blank=True, verbose_name='Статистика pstats'
+    )
+    stacks = models.TextField(blank=True, verbose_name='Свернутые стеки')
+    created_at = models.DateTimeField(
+        auto_now_add=True, verbose_name='Дата создания'
+    )
+
+    class Meta:
+        verbose_name = 'Профиль запроса'
+        verbose_name_plural = 'Профили запросов'
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f'{self.method} {self.path}'
@@ -1,6 +1,11 @@
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import CursorPagination, PageNumberPagination
 
 
 class CustomPageNumberPagination(PageNumberPagination):
     page_size_query_param = 'limit'
     page_query_param = 'page'
+
+
+class FeedCursorPagination(CursorPagination):
+    page_size_query_param = 'limit'
+    ordering = '-created_at'
@@ -0,0 +1,98 @@
+"""Профилирование отдельных запросов.
+
+Семплирующий профайлер раз в interval секунд снимает стек потока запроса
+и считает одинаковые стеки. Результат - строки в свернутом формате
+"функция;функция;... число", который понимают flamegraph.pl, speedscope
+и inferno. Детерминированный режим запускает cProfile и сохраняет его
+статистику в формате pstats. Оба режима видят только поток, в котором
+выполняется запрос, поэтому работа асинхронных представлений в пуле
+потоков в профиль не попадает.
+"""
+import cProfile
+import io
+import marshal
+import pstats
+import sys
+import threading
+from collections import Counter
+
+SAMPLE = 'sample'
+CPROFILE = 'cprofile'
+SUMMARY_ROWS = 40
+
+
+class SamplingProfiler:
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.thread_id = threading.get_ident()
+        self.stacks = Counter()
+        self.stopped = threading.Event()
+        self.sampler = threading.Thread(target=self.sample, daemon=True)
+
+    def __enter__(self):
+        self.sampler.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stopped.set()
+        self.sampler.join()
+
+    def sample(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[get_stack(frame)] += 1
+
+    def get_folded(self):
+        return '\n'.join(
+            f'{stack} {count}' for stack, count in self.stacks.most_common()
+        )
+
+    def get_summary(self):
+        total = sum(self.stacks.values())
+        leaves = Counter()
+        for stack, count in self.stacks.items():
+            leaves[stack.rsplit(';', 1)[-1]] += count
+        lines = [f'Снимков стека: {total}, интервал {self.interval} с', '']
+        lines.extend(
+            f'{count / total:7.1%}  {frame}'
+            for frame, count in leaves.most_common(SUMMARY_ROWS)
+        )
+        return '\n'.join(lines)
+
+
+def get_stack(frame):
+    frames = []
+    while frame is not None:
+        code = frame.f_code
+        frames.append(
+            f'{code.co_name} ({code.co_filename}:{code.co_firstlineno})'
+        )
+        frame = frame.f_back
+    return ';'.join(reversed(frames))
+
+
+def profile_call(mode, interval, func, *args):
+    """Вызывает func под профайлером.
+
+    Возвращает результат func и словарь с полями summary, stats и stacks
+    для модели RequestProfile.
+    """
+    if mode == SAMPLE:
+        with SamplingProfiler(interval) as profiler:
+            result = func(*args)
+        return result, {
+            'summary': profiler.get_summary(),
+            'stacks': profiler.get_folded(),
+        }
+    profiler = cProfile.Profile()
+    result = profiler.runcall(func, *args)
+    stream = io.StringIO()
+    stats = pstats.Stats(profiler, stream=stream)
+    stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(SUMMARY_ROWS)
+    return result, {
+        'summary': stream.getvalue(),
+        # Формат файла pstats, который пишет Stats.dump_stats
+        'stats': marshal.dumps(stats.stats),
+    }
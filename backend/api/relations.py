@@ -0,0 +1,82 @@
+from recipe.models import RecipeFavorite, RecipeShoppingCart
+from user.models import Follow
+
+ATTRIBUTE_NAME = '_user_relations'
+
+
+def get_target_field(model):
+    return 'following_id' if model is Follow else 'recipe_id'
+
+
+class UserRelations:
+    """Связи текущего пользователя в пределах одного запроса.
+
+    Множества идентификаторов подписок, избранного и корзины загружаются
+    лениво одним запросом к базе на множество и дальше проверяются в
+    памяти. Они нужны сериализаторам, проверяющим флаги у каждого объекта
+    ответа; одиночная проверка в contains не загружает множество целиком.
+    Для анонимного пользователя все множества пустые.
+    """
+
+    def __init__(self, user):
+        self.user = user
+        self.ids = {}
+
+    def get_queryset(self, model):
+        if model is Follow:
+            return Follow.objects.filter(follower=self.user)
+        return model.objects.filter(user=self.user)
+
+    def get_ids(self, model) -> set:
+        if model not in self.ids:
+            if not self.user.is_authenticated:
+                self.ids[model] = set()
+            else:
+                self.ids[model] = set(self.get_queryset(model).values_list(
+                    get_target_field(model), flat=True
+                ))
+        return self.ids[model]
+
+    def contains(self, model, pk) -> bool:
+        """Есть ли одна связь: по уже загруженному множеству или запросом
+        одной строки.
+        """
+        if model in self.ids:
+            return pk in self.ids[model]
+        if not self.user.is_authenticated:
+            return False
+        return self.get_queryset(model).filter(
+            **{get_target_field(model): pk}
+        ).exists()
+
+    def add(self, model, pk):
+        if model in self.ids:
+            self.ids[model].add(pk)
+
+    def discard(self, model, pk):
+        if model in self.ids:
+            self.ids[model].discard(pk)
+
+    def is_following(self, user) -> bool:
+        return user.pk in self.get_ids(Follow)
+
+    def is_favorited(self, recipe) -> bool:
+        return recipe.pk in self.get_ids(RecipeFavorite)
+
+    def is_in_shopping_cart(self, recipe) -> bool:
+        return recipe.pk in self.get_ids(RecipeShoppingCart)
+
+
+def get_user_relations(request) -> UserRelations:
+    """Возвращает связи пользователя, закрепленные за запросом.
+
+    Объект хранится на исходном HttpRequest и пересоздается, если за время
+    запроса сменился пользователь.
+    """
+    user = request.user
+    http_request = getattr(request, '_request', request)
+    relations = getattr(http_request, ATTRIBUTE_NAME, None)
+    if relations is None or relations.user.pk != user.pk:
+        relations = UserRelations(user)
+        setattr(http_request, ATTRIBUTE_NAME, relations)
+    return relations
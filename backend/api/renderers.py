@@ -0,0 +1,196 @@
+import abc
+import csv
+import json
+from io import BytesIO
+
+from django.conf import settings
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+    from reportlab.pdfgen import canvas
+except ImportError:
+    canvas = None
+
+SHOPPING_LIST_TITLE = 'Список покупок:'
+SHOPPING_LIST_HEADER = ('Ингредиент', 'Количество', 'Единица измерения')
+
+# Как и JSONRenderer, экранируем разделители строк и абзацев, чтобы ответ
+# оставался корректным JavaScript
+LINE_SEPARATORS = (
+    ('\u2028'.encode(), b'\\u2028'),
+    ('\u2029'.encode(), b'\\u2029'),
+)
+
+
+def fast_dumps(data) -> bytes:
+    """Компактный JSON в UTF-8 через orjson.
+
+    Типы, которых orjson не знает (Decimal, ленивые строки переводов,
+    QuerySet, timedelta), преобразуются так же, как в JSONRenderer.
+    """
+    content = orjson.dumps(
+        data, default=JSONEncoder().default,
+        option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+    )
+    if b'\xe2\x80' in content:
+        for separator, escaped in LINE_SEPARATORS:
+            content = content.replace(separator, escaped)
+    return content
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer на orjson, если библиотека установлена.
+
+    orjson умеет только компактный вывод в UTF-8, поэтому запросы с
+    отступами, как у BrowsableAPIRenderer, и настройки UNICODE_JSON,
+    COMPACT_JSON и STRICT_JSON, отличные от значений по умолчанию,
+    обрабатывает стандартный json. NaN и бесконечности orjson записывает
+    как null, а не выдает ошибку.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (orjson is None or self.ensure_ascii or not self.compact
+                or not self.strict or self.get_indent(
+                    accepted_media_type, renderer_context or {}
+                ) is not None):
+            return super().render(
+                data, accepted_media_type, renderer_context
+            )
+        if data is None:
+            return b''
+        return fast_dumps(data)
+
+
+class ShoppingListRenderer(BaseRenderer, abc.ABC):
+    """Базовый рендерер списка покупок.
+
+    Сам список отдается по частям через stream(), а render() нужен только
+    для ответов с ошибками, которые DRF отдает выбранным рендерером.
+    """
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, dict):
+            data = data.get('detail', data)
+        return str(data).encode(self.charset)
+
+    def stream(self, rows):
+        for chunk in self.iter_chunks(rows):
+            yield chunk.encode(self.charset)
+
+    @abc.abstractmethod
+    def iter_chunks(self, rows):
+        """Части документа по строкам (id, название, единица, количество)."""
+
+
+class ShoppingListTextRenderer(ShoppingListRenderer):
+    media_type = 'text/plain'
+    format = 'txt'
+
+    def iter_chunks(self, rows):
+        yield SHOPPING_LIST_TITLE + '\n'
+        for _, name, measurement_unit, amount in rows:
+            yield f'\n• {name} — {amount} {measurement_unit}'
+
+
+class Echo:
+
+    @staticmethod
+    def write(value):
+        return value
+
+
+class ShoppingListCSVRenderer(ShoppingListRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+    def iter_chunks(self, rows):
+        writer = csv.writer(Echo())
+        yield writer.writerow(SHOPPING_LIST_HEADER)
+        for _, name, measurement_unit, amount in rows:
+            yield writer.writerow((name, amount, measurement_unit))
+
+
+class ShoppingListJSONRenderer(FastJSONRenderer):
+    format = 'json'
+
+    @staticmethod
+    def dumps(item) -> bytes:
+        if orjson is not None:
+            return fast_dumps(item)
+        return json.dumps(item, ensure_ascii=False).encode('utf-8')
+
+    def stream(self, rows):
+        yield b'['
+        separator = b''
+        for ingredient_id, name, measurement_unit, amount in rows:
+            yield separator + self.dumps({
+                'id': ingredient_id,
+                'name': name,
+                'measurement_unit': measurement_unit,
+                'amount': amount
+            })
+            separator = b','
+        yield b']'
+
+
+class ShoppingListPDFRenderer(ShoppingListRenderer):
+    media_type = 'application/pdf'
+    format = 'pdf'
+    font_name = 'ShoppingListFont'
+    font_size = 12
+    margin = 50
+
+    def register_font(self):
+        if self.font_name not in pdfmetrics.getRegisteredFontNames():
+            pdfmetrics.registerFont(
+                TTFont(self.font_name, settings.SHOPPING_LIST_PDF_FONT)
+            )
+
+    def stream(self, rows):
+        # Документ уже собран в байтах, кодировать нечего
+        return self.iter_chunks(rows)
+
+    def iter_chunks(self, rows):
+        # Формат PDF требует таблицу смещений в конце файла, поэтому
+        # документ собирается целиком. Его размер ограничен числом
+        # различных ингредиентов, а не числом рецептов в корзине.
+        self.register_font()
+        buffer = BytesIO()
+        pdf = canvas.Canvas(buffer, pagesize=A4)
+        width, height = A4
+        line_height = self.font_size * 1.5
+        pdf.setFont(self.font_name, self.font_size)
+        y = height - self.margin
+        pdf.drawString(self.margin, y, SHOPPING_LIST_TITLE)
+        y -= line_height * 2
+        for _, name, measurement_unit, amount in rows:
+            if y < self.margin:
+                pdf.showPage()
+                pdf.setFont(self.font_name, self.font_size)
+                y = height - self.margin
+            pdf.drawString(
+                self.margin, y, f'• {name} — {amount} {measurement_unit}'
+            )
+            y -= line_height
+        pdf.save()
+        buffer.seek(0)
+        yield from iter(lambda: buffer.read(8192), b'')
+
+
+SHOPPING_LIST_RENDERERS = [
+    ShoppingListTextRenderer,
+    ShoppingListCSVRenderer,
+    ShoppingListJSONRenderer,
+]
+if canvas is not None:
+    SHOPPING_LIST_RENDERERS.append(ShoppingListPDFRenderer)
@@ -1,9 +1,21 @@
+import json
+
 from django.db import transaction
+from django.db.models import prefetch_related_objects
 from django.contrib.auth import get_user_model
-from rest_framework import serializers
-from drf_extra_fields.fields import Base64ImageField
-
-from .validation import (validate_recipes_limit, validate_ingredient_data,
+from django.http import QueryDict
+from django.utils.functional import cached_property
+from rest_framework import exceptions, serializers
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .authentication import (JWT_PASSWORD_CLAIM, JWT_USER_CLAIMS,
+                             get_password_fingerprint)
+from .fields import BulkPrimaryKeyRelatedField, UploadImageField
+from .images import get_image_variants, schedule_image_variants
+from .relations import get_user_relations
+from .validation import (validate_recipes_limit, validate_ingredients_data,
                          validate_tags_and_ingredients, validate_subscribe,
                          validate_username_field, validate_email_field,
                          validate_object_existence)
@@ -11,28 +23,32 @@ from .mixins import (ToRepresentationMixin, SerializerMetaMixin,
                      SerializerFavoriteShoppingCartMixin)
 from user.models import Follow
 from recipe.models import (Ingredient, Recipe, RecipeIngredient, Tag,
-                           RecipeFavorite, RecipeShoppingCart)
+                           RecipeFavorite, RecipeShoppingCart,
+                           ShoppingListItem)
 
 User = get_user_model()
 
 
 class UserDetailSerializer(serializers.ModelSerializer):
     is_subscribed = serializers.SerializerMethodField()
+    avatar_variants = serializers.SerializerMethodField()
 
     class Meta:
         model = User
         fields = (
             'email', 'id', 'username', 'first_name',
-            'last_name', 'is_subscribed', 'avatar'
+            'last_name', 'is_subscribed', 'avatar', 'avatar_variants',
+            'followers_count', 'following_count', 'recipes_count'
         )
 
+    def get_avatar_variants(self, obj: User) -> dict:
+        return get_image_variants(obj.avatar, self.context.get('request'))
+
     def get_is_subscribed(self, obj: User) -> bool:
         request = self.context.get('request')
-        follower = request.user
-        if request and follower.is_authenticated:
-            follow = Follow.objects.filter(follower=follower, following=obj)
-            return follow.exists()
-        return False
+        if request is None:
+            return False
+        return get_user_relations(request).is_following(obj)
 
 
 class UserShortDetailSerializer(serializers.ModelSerializer):
@@ -65,7 +81,6 @@ class UserCreateSerializer(ToRepresentationMixin):
 class UserFollowDetailSerializer(serializers.ModelSerializer):
     recipes = serializers.SerializerMethodField()
     is_subscribed = serializers.BooleanField(default=True)
-    recipes_count = serializers.SerializerMethodField()
 
     class Meta:
         model = User
@@ -74,13 +89,6 @@ class UserFollowDetailSerializer(serializers.ModelSerializer):
             'is_subscribed', 'recipes', 'recipes_count', 'avatar'
         )
 
-    @staticmethod
-    def get_recipes_count(obj: User) -> int:
-        recipes_count = obj.recipes_count
-        if recipes_count:
-            return recipes_count
-        return getattr(obj, 'recipes_count', 0)
-
     def get_recipes(self, obj: User) -> list:
         request = self.context.get('request')
         recipes_limit = validate_recipes_limit(request)
@@ -100,12 +108,15 @@ class UserFollowCreateSerializer(ToRepresentationMixin):
         model = User
         fields = ('id',)
 
+    @cached_property
+    def following(self) -> User:
+        # validate() и create() работают с одним автором, загружаем его
+        # один раз
+        return self.context.get('view').get_object()
+
     def get_follower_and_following_user(self) -> tuple:
         request = self.context.get('request')
-        view = self.context.get('view')
-        follower = request.user
-        following = view.get_object()
-        return follower, following
+        return request.user, self.following
 
     def validate(self, attrs: dict) -> dict:
         request = self.context.get('request')
@@ -114,25 +125,70 @@ class UserFollowCreateSerializer(ToRepresentationMixin):
         return attrs
 
     def create(self, validated_data: dict) -> User:
+        request = self.context.get('request')
         follower, following = self.get_follower_and_following_user()
-        Follow.objects.create(follower=follower, following=following)
+        with transaction.atomic():
+            Follow.objects.create(follower=follower, following=following)
+        get_user_relations(request).add(Follow, following.pk)
         return following
 
     def delete(self, following) -> User:
         request = self.context.get('request')
         follower = request.user
         follow = Follow.objects.filter(follower=follower, following=following)
-        follow.delete()
+        with transaction.atomic():
+            follow.delete()
+        get_user_relations(request).discard(Follow, following.pk)
         return following
 
 
 class UserAvatarSerializer(serializers.ModelSerializer):
-    avatar = Base64ImageField(required=True)
+    avatar = UploadImageField(required=True)
 
     class Meta:
         model = User
         fields = ('avatar',)
 
+    def update(self, instance: User, validated_data: dict) -> User:
+        instance = super().update(instance, validated_data)
+        schedule_image_variants(instance.avatar)
+        return instance
+
+
+class JWTObtainSerializer(TokenObtainPairSerializer):
+
+    @classmethod
+    def get_token(cls, user: User) -> RefreshToken:
+        token = super().get_token(user)
+        for field in JWT_USER_CLAIMS:
+            token[field] = getattr(user, field)
+        token[JWT_PASSWORD_CLAIM] = get_password_fingerprint(user)
+        return token
+
+
+class JWTRefreshSerializer(serializers.Serializer):
+    """Выдает новую пару токенов, отзывая предыдущий refresh-токен.
+
+    Единственное место JWT-режима, где читается база: пользователь должен
+    быть активен и не менять пароль с момента выдачи токена.
+    """
+    refresh = serializers.CharField()
+    access = serializers.CharField(read_only=True)
+
+    def validate(self, attrs: dict) -> dict:
+        refresh = RefreshToken(attrs['refresh'])
+        user = User.objects.filter(
+            pk=refresh.get(api_settings.USER_ID_CLAIM), is_active=True
+        ).first()
+        if user is None or refresh.get(
+                JWT_PASSWORD_CLAIM) != get_password_fingerprint(user):
+            raise exceptions.AuthenticationFailed(
+                'Пользователь неактивен или сменил пароль.'
+            )
+        refresh.blacklist()
+        token = JWTObtainSerializer.get_token(user)
+        return {'refresh': str(token), 'access': str(token.access_token)}
+
 
 class TagSerializer(serializers.ModelSerializer):
     class Meta:
@@ -177,21 +233,30 @@ class RecipeDetailSerializer(serializers.ModelSerializer):
     )
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
+    image_variants = serializers.SerializerMethodField()
 
     class Meta:
         model = Recipe
         fields = (
             'id', 'tags', 'author', 'ingredients', 'is_favorited',
-            'is_in_shopping_cart', 'name', 'image', 'text', 'cooking_time'
+            'is_in_shopping_cart', 'name', 'image', 'image_variants',
+            'text', 'cooking_time'
         )
 
-    @staticmethod
-    def get_is_favorited(obj: Recipe) -> bool:
-        return bool(getattr(obj, 'is_favorited_for_user', []))
+    def get_image_variants(self, obj: Recipe) -> dict:
+        return get_image_variants(obj.image, self.context.get('request'))
 
-    @staticmethod
-    def get_is_in_shopping_cart(obj: Recipe) -> bool:
-        return bool(getattr(obj, 'is_in_shopping_cart_for_user', []))
+    def get_is_favorited(self, obj: Recipe) -> bool:
+        request = self.context.get('request')
+        if request is None:
+            return False
+        return get_user_relations(request).is_favorited(obj)
+
+    def get_is_in_shopping_cart(self, obj: Recipe) -> bool:
+        request = self.context.get('request')
+        if request is None:
+            return False
+        return get_user_relations(request).is_in_shopping_cart(obj)
 
 
 class RecipeShortDetailSerializer(
@@ -203,14 +268,14 @@ class RecipeShortDetailSerializer(
 
 class RecipeCreateSerializer(ToRepresentationMixin):
     # Вынес to_representations в отдельный миксин
-    tags = serializers.PrimaryKeyRelatedField(
+    tags = BulkPrimaryKeyRelatedField(
         queryset=Tag.objects.all(), many=True, required=True
     )
     ingredients = RecipeIngredientCreateSerializer(
         source='recipe_ingredients',
         many=True
     )
-    image = Base64ImageField()
+    image = UploadImageField()
     read_serializer = RecipeDetailSerializer
 
     class Meta:
@@ -221,6 +286,32 @@ class RecipeCreateSerializer(ToRepresentationMixin):
         )
         read_only_fields = ('author',)
 
+    @staticmethod
+    def parse_form_data(data: QueryDict) -> dict:
+        # В multipart/form-data вложенные ингредиенты передаются строкой
+        # JSON, а теги - повторяющимся полем или строкой JSON
+        parsed = data.dict()
+        tags = data.getlist('tags')
+        if len(tags) == 1 and tags[0].startswith('['):
+            tags = tags[0]
+        for field, value in (('tags', tags),
+                             ('ingredients', data.get('ingredients'))):
+            if isinstance(value, str):
+                try:
+                    value = json.loads(value)
+                except ValueError:
+                    raise serializers.ValidationError(
+                        {field: 'Некорректный JSON'}
+                    )
+            if value is not None and field in data:
+                parsed[field] = value
+        return parsed
+
+    def to_internal_value(self, data):
+        if isinstance(data, QueryDict):
+            data = self.parse_form_data(data)
+        return super().to_internal_value(data)
+
     @staticmethod
     def get_ingredient_data(item_data: dict) -> tuple:
         ing_id = item_data.get('ingredient', {}).get('id')
@@ -232,9 +323,9 @@ class RecipeCreateSerializer(ToRepresentationMixin):
         ingredients = data.get('recipe_ingredients', [])
         tags = data.get('tags', [])
         validate_tags_and_ingredients(request, ingredients, tags)
-        for item in ingredients:
-            ing_id, amount = self.get_ingredient_data(item)
-            validate_ingredient_data(ing_id, amount)
+        validate_ingredients_data(
+            [self.get_ingredient_data(item) for item in ingredients]
+        )
         return data
 
     @staticmethod
@@ -262,12 +353,19 @@ class RecipeCreateSerializer(ToRepresentationMixin):
             )
         RecipeIngredient.objects.bulk_create(recipe_ingredients)
         instance.save()
+        # Ответ строится по новым тегам и ингредиентам, загруженным разом,
+        # а не по одному запросу на каждый ингредиент
+        instance._prefetched_objects_cache = {}
+        prefetch_related_objects(
+            [instance], 'tags', 'recipe_ingredients__ingredient'
+        )
         return instance
 
     def create(self, validated_data: dict) -> Recipe:
         with transaction.atomic():
             ingredients_data, tags_data = self.pop_items(validated_data)
             recipe = Recipe.objects.create(**validated_data)
+            schedule_image_variants(recipe.image)
             return self.set_ingredients_tags(
                 ingredients_data, tags_data, instance=recipe
             )
@@ -276,10 +374,22 @@ class RecipeCreateSerializer(ToRepresentationMixin):
         with transaction.atomic():
             ingredients_data, tags_data = self.pop_items(validated_data)
             super().update(instance, validated_data)
+            if 'image' in validated_data:
+                schedule_image_variants(instance.image)
+            old_amounts = ShoppingListItem.objects.get_recipe_amounts(
+                instance.id
+            )
             instance.recipe_ingredients.all().delete()
-            return self.set_ingredients_tags(
+            instance = self.set_ingredients_tags(
                 ingredients_data, tags_data, instance=instance
             )
+            new_amounts = dict(
+                self.get_ingredient_data(item) for item in ingredients_data
+            )
+            ShoppingListItem.objects.update_recipe(
+                instance.id, old_amounts, new_amounts
+            )
+            return instance
 
 
 class RecipeFavoriteDetailSerializer(
@@ -299,7 +409,7 @@ class RecipeFavoriteCreateSerializer(
     def validate(self, attrs):
         request, recipe = self.get_context_data()
         validate_object_existence(
-            self.model, request.user, recipe, request.method,
+            self.model, request, recipe,
             exists_message='Рецепт уже добавлен в избранное',
             not_exists_message='Рецепт уже удален из избранного'
         )
@@ -323,8 +433,48 @@ class RecipeShoppingCartCreateSerializer(
     def validate(self, attrs):
         request, recipe = self.get_context_data()
         validate_object_existence(
-            self.model, request.user, recipe, request.method,
+            self.model, request, recipe,
             exists_message='Рецепт уже добавлен в список покупок',
             not_exists_message='Рецепт уже удален из списка покупок'
         )
         return attrs
+
+
+class ShoppingListItemSerializer(serializers.ModelSerializer):
+    id = serializers.IntegerField(source='ingredient.id')
+    name = serializers.CharField(source='ingredient.name')
+    measurement_unit = serializers.CharField(
+        source='ingredient.measurement_unit'
+    )
+    amount = serializers.IntegerField(source='total_amount')
+
+    class Meta:
+        model = ShoppingListItem
+        fields = ('id', 'name', 'measurement_unit', 'amount')
+
+
+class RecipeIngredientImportSerializer(serializers.Serializer):
+    id = serializers.IntegerField(required=False)
+    name = serializers.CharField(required=False)
+    amount = serializers.IntegerField(min_value=1, max_value=32767)
+
+    def validate(self, attrs: dict) -> dict:
+        if 'id' not in attrs and 'name' not in attrs:
+            raise serializers.ValidationError(
+                'Укажите id или название ингредиента'
+            )
+        return attrs
+
+
+class RecipeImportSerializer(serializers.Serializer):
+    name = serializers.CharField(max_length=256)
+    text = serializers.CharField()
+    cooking_time = serializers.IntegerField(min_value=1, max_value=32767)
+    image = UploadImageField(required=False, allow_null=True)
+    author = serializers.IntegerField(required=False)
+    tags = serializers.ListField(
+        child=serializers.CharField(), allow_empty=False
+    )
+    ingredients = serializers.ListField(
+        child=RecipeIngredientImportSerializer(), allow_empty=False
+    )
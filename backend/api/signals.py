@@ -0,0 +1,115 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django_cleanup.signals import cleanup_post_delete
+from rest_framework.authtoken.models import Token
+
+from .authentication import invalidate_tokens, invalidate_users
+from .caching import invalidate_responses
+from .images import delete_image_variants
+from .middleware import instrument_connection
+from recipe.models import (FeedEntry, Ingredient, Recipe,
+                           RecipeShoppingCart, ShoppingListItem, Tag)
+from user.models import Follow
+
+User = get_user_model()
+
+
+def change_counter(instance, relation, field, delta):
+    descriptor = getattr(type(instance), relation)
+    user_id = getattr(instance, descriptor.field.attname)
+    User.objects.change_counter(user_id, field, delta)
+    # update() не вызывает post_save, поэтому кэш аутентификации
+    # сбрасывается здесь, иначе /users/me/ отдаст старые счетчики
+    invalidate_users(user_id)
+    # Держим в согласии уже загруженный объект пользователя, например
+    # request.user, который затем попадет в ответ
+    if descriptor.is_cached(instance):
+        user = getattr(instance, relation)
+        if field not in user.get_deferred_fields():
+            setattr(user, field, max(getattr(user, field) + delta, 0))
+
+
+@receiver(connection_created)
+def add_query_metrics(sender, connection, **kwargs):
+    instrument_connection(connection)
+
+
+@receiver(cleanup_post_delete)
+def delete_variants_with_original(sender, file_name, **kwargs):
+    if file_name:
+        delete_image_variants(file_name)
+
+
+@receiver(post_save, sender=RecipeShoppingCart)
+def add_recipe_to_shopping_list(sender, instance, created, **kwargs):
+    if created:
+        ShoppingListItem.objects.add_recipe(
+            instance.user_id, instance.recipe_id
+        )
+
+
+@receiver(pre_delete, sender=RecipeShoppingCart)
+def remove_recipe_from_shopping_list(sender, instance, **kwargs):
+    # pre_delete вызывается до удаления ингредиентов рецепта, в том числе
+    # при каскадном удалении самого рецепта
+    ShoppingListItem.objects.remove_recipe(
+        instance.user_id, instance.recipe_id
+    )
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_created(sender, instance, created, **kwargs):
+    if created:
+        change_counter(instance, 'author', 'recipes_count', 1)
+        FeedEntry.objects.fan_out(instance)
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    change_counter(instance, 'author', 'recipes_count', -1)
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, **kwargs):
+    if created:
+        change_counter(instance, 'following', 'followers_count', 1)
+        change_counter(instance, 'follower', 'following_count', 1)
+        FeedEntry.objects.add_author(
+            instance.follower_id, instance.following_id
+        )
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    change_counter(instance, 'following', 'followers_count', -1)
+    change_counter(instance, 'follower', 'following_count', -1)
+    FeedEntry.objects.remove_author(
+        instance.follower_id, instance.following_id
+    )
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    invalidate_tokens(instance.key)
+
+
+@receiver(post_save, sender=User)
+def user_changed(sender, instance, created, update_fields=None, **kwargs):
+    # Вход обновляет только last_login, кэш от этого не устаревает
+    if created or update_fields == frozenset({'last_login'}):
+        return
+    invalidate_users(instance.pk)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def reference_changed(sender, **kwargs):
+    # Повтор после фиксации транзакции не дает параллельному запросу
+    # закэшировать еще не измененные данные под новой версией
+    invalidate_responses(sender)
+    transaction.on_commit(lambda: invalidate_responses(sender))
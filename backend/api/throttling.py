@@ -0,0 +1,127 @@
+"""Ограничение частоты запросов к тяжелым эндпоинтам.
+
+Корзина токенов хранится как одно число - момент в микросекундах, когда
+она снова станет полной (алгоритм GCRA). Каждый запрос сдвигает этот
+момент на period / rate атомарным cache.incr, запрос проходит, пока
+сдвиг не больше period, то есть пока в корзине остается токен, а отказ
+возвращает сдвиг через cache.decr. Так параллельные запросы одного
+клиента не читают одно и то же состояние. Атомарность обеспечивают
+memcached, Redis и LocMemCache; в кэше на базе данных incr не атомарен.
+Состояние лежит в общем кэше Django, а ключи, которым уже отказано,
+запоминаются в памяти процесса до момента Retry-After: повторные запросы
+такого клиента отклоняются без обращения к кэшу.
+"""
+import time
+
+from django.core.cache import cache
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+CACHE_KEY_PREFIX = 'throttle:'
+LOCAL_MAX_SIZE = 10000
+MICROSECONDS = 10 ** 6
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+# Ключ корзины и момент, до которого ей отказано, в памяти процесса
+blocked = {}
+
+
+def parse_rate(rate):
+    """'30/min' -> (30, 60). None отключает ограничение."""
+    if rate is None:
+        return None
+    count, period = rate.split('/')
+    return int(count), PERIODS[period[0]]
+
+
+def remember_blocked(key, until, now):
+    if len(blocked) >= LOCAL_MAX_SIZE:
+        for stale in [item for item, value in blocked.items() if value <= now]:
+            blocked.pop(stale, None)
+        if len(blocked) >= LOCAL_MAX_SIZE:
+            blocked.clear()
+    blocked[key] = until
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """Корзина токенов на пользователя, а для анонимов - на IP-адрес.
+
+    Область берется из throttle_scopes представления по действию или из
+    throttle_scope, частота - из DEFAULT_THROTTLE_RATES. Представления без
+    области не ограничиваются.
+    """
+    timer = time.time
+
+    def __init__(self):
+        self.retry_after = None
+
+    def get_scope(self, view):
+        scopes = getattr(view, 'throttle_scopes', {})
+        return scopes.get(
+            getattr(view, 'action', None),
+            getattr(view, 'throttle_scope', None)
+        )
+
+    def get_rate(self, scope):
+        return parse_rate(api_settings.DEFAULT_THROTTLE_RATES.get(scope))
+
+    def get_cache_key(self, request, scope):
+        if request.user and request.user.is_authenticated:
+            ident = f'user:{request.user.pk}'
+        else:
+            ident = f'ip:{self.get_ident(request)}'
+        return f'{CACHE_KEY_PREFIX}{scope}:{ident}'
+
+    def allow_request(self, request, view):
+        scope = self.get_scope(view)
+        if scope is None:
+            return True
+        rate = self.get_rate(scope)
+        if rate is None:
+            return True
+        key = self.get_cache_key(request, scope)
+        now = self.timer()
+        until = blocked.get(key)
+        if until is not None:
+            if until > now:
+                self.retry_after = until - now
+                return False
+            blocked.pop(key, None)
+        until = self.take_token(key, now, *rate)
+        if until is None:
+            return True
+        remember_blocked(key, until, now)
+        self.retry_after = until - now
+        return False
+
+    def take_token(self, key, now, count, period):
+        """Берет токен из корзины.
+
+        Возвращает None или момент, когда в корзине появится токен.
+        """
+        now = int(now * MICROSECONDS)
+        interval = max(period * MICROSECONDS // count, 1)
+        # Ключ живет дольше сохраненного момента, продлеваясь при
+        # каждом пропуске, иначе он истек бы раньше наполнения корзины
+        timeout = period + 1
+        period *= MICROSECONDS
+        try:
+            full_at = cache.incr(key, interval)
+        except ValueError:
+            if cache.add(key, now + interval, timeout):
+                return None
+            full_at = cache.incr(key, interval)
+        if full_at - interval < now:
+            # Корзина успела наполниться, отсчет начинается заново.
+            # Параллельный запрос может перезаписать здесь чужой сдвиг,
+            # но только у полной корзины
+            cache.set(key, now + interval, timeout)
+            return None
+        if full_at - now > period:
+            cache.decr(key, interval)
+            return (full_at - period) / MICROSECONDS
+        cache.touch(key, timeout)
+        return None
+
+    def wait(self):
+        return self.retry_after
@@ -1,6 +1,8 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 
+from . import async_views
 from .views import (FollowListView, FollowView, IngredientViewSet,
                     RecipeViewSet, TagViewSet, CustomUserViewSet)
 
@@ -16,3 +18,15 @@ urlpatterns = [
          name='subscriptions'),
     path('users/<int:pk>/subscribe/', FollowView.as_view(), name='subscribe')
 ] + router.urls
+
+if settings.JWT_AUTH_ENABLED:
+    urlpatterns.insert(1, path('auth/', include('djoser.urls.jwt')))
+
+if settings.ASYNC_VIEWS:
+    urlpatterns = [
+        path('recipes/', async_views.recipe_list, name='recipe-list'),
+        path('recipes/<int:pk>/', async_views.recipe_detail,
+             name='recipe-detail'),
+        path('ingredients/', async_views.ingredient_list,
+             name='ingredient-list'),
+    ] + urlpatterns
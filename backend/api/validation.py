@@ -1,9 +1,11 @@
 import re
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from rest_framework import exceptions
 from rest_framework import serializers
 
+from .relations import get_user_relations
 from recipe.models import Ingredient
 from user.models import Follow
 
@@ -32,31 +34,32 @@ def validate_email_field(value):
 def validate_subscribe(request, following):
     if following == request.user:
         raise exceptions.ValidationError('Нельзя подписаться на себя')
+    relations = get_user_relations(request)
     if request.method == 'POST':
-        validate_already_following(request.user, following)
+        validate_already_following(relations, following)
     elif request.method == 'DELETE':
-        validate_not_following(request.user, following)
+        validate_not_following(relations, following)
 
 
-def validate_already_following(follower, following):
-    if Follow.objects.filter(follower=follower, following=following).exists():
+def validate_already_following(relations, following):
+    if relations.contains(Follow, following.pk):
         raise exceptions.ValidationError(
             'Вы уже подписаны на данного пользователя'
         )
 
 
-def validate_not_following(follower, following):
-    if not Follow.objects.filter(follower=follower,
-                                 following=following).exists():
+def validate_not_following(relations, following):
+    if not relations.contains(Follow, following.pk):
         raise exceptions.ValidationError(
             'Вы уже отписались от данного пользователя'
         )
 
 
 def validate_object_existence(
-        model, user, recipe, method, exists_message, not_exists_message
+        model, request, recipe, exists_message, not_exists_message
 ):
-    obj_exists = model.objects.filter(user=user, recipe=recipe).exists()
+    obj_exists = get_user_relations(request).contains(model, recipe.pk)
+    method = request.method
 
     if method == 'POST' and obj_exists:
         raise exceptions.ValidationError(exists_message)
@@ -78,18 +81,35 @@ def validate_recipes_limit(request):
     return None
 
 
-def validate_ingredient_data(ing_id, amount):
-    if not ing_id or not amount:
-        raise exceptions.ValidationError('Поле c ингредиентами не заполнено')
-    if amount < 1:
-        raise exceptions.ValidationError(
-            'Количество ингредиента должно быть больше нуля'
-        )
-    try:
-        Ingredient.objects.get(id=ing_id)
-    except Ingredient.DoesNotExist:
+def validate_ingredients_data(ingredients_data):
+    """Проверяет пары (id, количество) и наличие ингредиентов одним
+    запросом.
+    """
+    for ing_id, amount in ingredients_data:
+        if not ing_id or not amount:
+            raise exceptions.ValidationError(
+                'Поле c ингредиентами не заполнено'
+            )
+        if amount < 1:
+            raise exceptions.ValidationError(
+                'Количество ингредиента должно быть больше нуля'
+            )
+    ids = {ing_id for ing_id, _ in ingredients_data}
+    if ids and Ingredient.objects.filter(id__in=ids).count() != len(ids):
         raise exceptions.NotFound('Ингредиент не найден')
-    return ing_id, amount
+    return ingredients_data
+
+
+def validate_image_pixels(image):
+    # Django уже открыл файл и прочитал только заголовок изображения,
+    # поэтому размер известен до полного декодирования пикселей
+    width, height = image.image.size
+    if width * height > settings.IMAGE_MAX_PIXELS:
+        raise serializers.ValidationError(
+            'Слишком большое изображение. Максимальное количество '
+            f'пикселей: {settings.IMAGE_MAX_PIXELS}'
+        )
+    return image
 
 
 def validate_tags_and_ingredients(request, ingredients, tags):
@@ -1,6 +1,5 @@
-from django.http import HttpResponse
+from django.http import StreamingHttpResponse
 from django.contrib.auth import get_user_model
-from django.db.models import Exists, OuterRef, Sum
 from rest_framework import generics, mixins, status, viewsets
 from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
@@ -9,6 +8,12 @@ from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet
 
 from .filters import IngredientFilter, RecipeFilter
+from .importers import RecipeImporter
+from .mixins import FastReadMixin, ReplicaReadMixin, ResponseCacheMixin
+from .pagination import FeedCursorPagination
+from .parsers import NDJSONParser
+from .renderers import SHOPPING_LIST_RENDERERS
+from .validation import validate_recipes_limit
 from .permissions import (IsAdminOrAuthorOrReadOnly, IsAdminOrReadOnly,
                           IsAdminOrAnonimOrReadOnly)
 from .serializers import (IngredientSerializer, RecipeDetailSerializer,
@@ -16,15 +21,18 @@ from .serializers import (IngredientSerializer, RecipeDetailSerializer,
                           RecipeCreateSerializer, UserFollowCreateSerializer,
                           UserAvatarSerializer, UserFollowDetailSerializer,
                           RecipeShoppingCartCreateSerializer,
-                          UserCreateSerializer, UserDetailSerializer)
-from recipe.models import (Ingredient, Recipe, RecipeFavorite,
-                           RecipeIngredient, RecipeShoppingCart, Tag)
+                          ShoppingListItemSerializer, UserCreateSerializer,
+                          UserDetailSerializer)
+from recipe.models import (FeedEntry, Ingredient, Recipe, RecipeFavorite,
+                           RecipeShoppingCart, ShoppingListItem, Tag)
 
 User = get_user_model()
 
 
-class CustomUserViewSet(UserViewSet):
+class CustomUserViewSet(FastReadMixin, ReplicaReadMixin, UserViewSet):
     permission_classes = [IsAdminOrAnonimOrReadOnly]
+    replica_actions = ('list',)
+    fast_actions = ('list', 'retrieve', 'me')
 
     def get_serializer_class(self):
         if self.action in ('list', 'retrieve', 'me'):
@@ -63,10 +71,20 @@ class CustomUserViewSet(UserViewSet):
 class FollowListView(generics.ListAPIView):
     serializer_class = UserFollowDetailSerializer
     permission_classes = [IsAuthenticated]
+    throttle_scope = 'subscriptions'
 
     def get_queryset(self):
-        user = self.request.user
-        return User.follows.get_follower(user).get_recipes(Recipe)
+        return User.follows.get_follower(self.request.user)
+
+    def paginate_queryset(self, queryset):
+        # Рецепты загружаются после пагинации: окно по рецептам
+        # считается только для авторов текущей страницы
+        page = super().paginate_queryset(queryset)
+        if page is not None:
+            User.follows.prefetch_recipes(
+                page, Recipe, validate_recipes_limit(self.request)
+            )
+        return page
 
 
 class FollowView(
@@ -76,24 +94,39 @@ class FollowView(
 ):
     permission_classes = [IsAuthenticated]
     serializer_class = UserFollowCreateSerializer
-    queryset = User.follows.get_recipes(Recipe)
+
+    def get_queryset(self):
+        queryset = User.follows.filter(pk=self.kwargs['pk'])
+        if self.request.method == 'DELETE':
+            # Ответ на отписку пустой, рецепты автора не нужны
+            return queryset
+        recipes_limit = validate_recipes_limit(self.request)
+        return queryset.get_recipes(Recipe, recipes_limit)
 
     def post(self, request, *args, **kwargs) -> Response:
         return self.create(request, *args, **kwargs)
 
     def delete(self, request, *args, **kwargs) -> Response:
-        following = self.get_object()
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        serializer.delete(following)
+        serializer.delete(serializer.following)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(FastReadMixin, ReplicaReadMixin, viewsets.ModelViewSet):
     permission_classes = [IsAdminOrAuthorOrReadOnly]
     http_method_names = ('get', 'post', 'patch', 'delete')
     filter_backends = [DjangoFilterBackend]
     filterset_class = RecipeFilter
+    throttle_scopes = {
+        'create': 'recipe_write',
+        'partial_update': 'recipe_write',
+        'download_shopping_cart': 'shopping_list',
+    }
+    relation_actions = (
+        'favorite', 'remove_favorite',
+        'shopping_cart', 'remove_from_shopping_cart',
+    )
 
     def get_serializer_class(self):
         if self.action in ('list', 'retrieve'):
@@ -102,27 +135,16 @@ class RecipeViewSet(viewsets.ModelViewSet):
             return RecipeCreateSerializer
         return super().get_serializer_class()
 
-    @staticmethod
-    def get_model(model, user):
-        return model.objects.filter(user=user, recipe=OuterRef('pk'))
-
     def get_queryset(self):
-        user = self.request.user
-        queryset = Recipe.objects.all().select_related(
+        if self.action in self.relation_actions:
+            # Краткому представлению рецепта не нужны автор, теги и
+            # ингредиенты
+            return Recipe.objects.all()
+        return Recipe.objects.all().select_related(
             'author').prefetch_related(
             'tags',
             'recipe_ingredients__ingredient',
         )
-        if user.is_authenticated:
-            queryset = queryset.annotate(
-                is_favorited_for_user=Exists(
-                    self.get_model(RecipeFavorite, user)
-                ),
-                is_in_shopping_cart_for_user=Exists(
-                    self.get_model(RecipeShoppingCart, user)
-                )
-            )
-        return queryset
 
     def create_or_update_serializer(
         self, request, instance=None, partial=False
@@ -152,10 +174,9 @@ class RecipeViewSet(viewsets.ModelViewSet):
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     def handle_delete(self, model, request) -> Response:
-        instance = self.get_object()
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        serializer.delete(instance)
+        serializer.delete(serializer.recipe)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(
@@ -180,6 +201,30 @@ class RecipeViewSet(viewsets.ModelViewSet):
     def remove_from_shopping_cart(self, request, pk=None) -> Response:
         return self.handle_delete(RecipeShoppingCart, request)
 
+    @action(
+        detail=False, methods=['get'], permission_classes=[IsAuthenticated],
+        pagination_class=FeedCursorPagination
+    )
+    def feed(self, request) -> Response:
+        """Новые рецепты авторов, на которых подписан пользователь."""
+        queryset = self.get_queryset().filter(
+            FeedEntry.objects.get_feed_filter(request.user)
+        )
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_read_serializer(
+            RecipeDetailSerializer, page, many=True
+        )
+        return self.get_paginated_response(serializer.data)
+
+    @action(
+        detail=False, methods=['post'], url_path='import',
+        permission_classes=[IsAdminOrReadOnly], parser_classes=[NDJSONParser]
+    )
+    def import_recipes(self, request) -> Response:
+        """Импортирует рецепты из NDJSON, по одному рецепту в строке."""
+        report = RecipeImporter(request.user).run(request.data)
+        return Response(report, status=status.HTTP_200_OK)
+
     @action(detail=True, methods=['get'], url_path='get-link')
     def get_link(self, request, pk) -> Response:
         recipe = self.get_object()
@@ -190,32 +235,33 @@ class RecipeViewSet(viewsets.ModelViewSet):
         )
 
     @action(
-        detail=False, methods=['get'], permission_classes=[IsAuthenticated]
+        detail=False, methods=['get'], permission_classes=[IsAuthenticated],
+        renderer_classes=SHOPPING_LIST_RENDERERS
     )
-    def download_shopping_cart(self, request) -> HttpResponse:
-        recipes_in_cart = RecipeShoppingCart.objects.filter(
-            user=request.user
-        ).values_list('recipe_id', flat=True)
-        ingredient_amounts = RecipeIngredient.objects.filter(
-            recipe_id__in=recipes_in_cart
-        ).values(
-            'ingredient__name',
-            'ingredient__measurement_unit'
-        ).annotate(
-            total_amount=Sum('amount')
+    def download_shopping_cart(self, request) -> StreamingHttpResponse:
+        """Отдает список покупок в формате из параметра ?format=."""
+        renderer = request.accepted_renderer
+        rows = ShoppingListItem.objects.get_rows(request.user).iterator()
+        response = StreamingHttpResponse(
+            renderer.stream(rows), content_type=renderer.media_type
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="shopping_list.{renderer.format}"'
         )
-        lines = ['Список покупок:\n']
-        for ingredient in ingredient_amounts:
-            name = ingredient['ingredient__name']
-            measurement_unit = ingredient['ingredient__measurement_unit']
-            amount = ingredient['total_amount']
-            line = f'• {name} — {amount} {measurement_unit}'
-            lines.append(line)
-        content = '\n'.join(lines)
-        return HttpResponse(content, content_type='text/plain')
-
-
-class TagViewSet(viewsets.ModelViewSet):
+        return response
+
+    @action(
+        detail=False, methods=['get'], permission_classes=[IsAuthenticated]
+    )
+    def shopping_cart_summary(self, request) -> Response:
+        items = ShoppingListItem.objects.get_items(request.user)
+        serializer = ShoppingListItemSerializer(items, many=True)
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+
+class TagViewSet(
+    ResponseCacheMixin, FastReadMixin, ReplicaReadMixin, viewsets.ModelViewSet
+):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     permission_classes = [IsAdminOrReadOnly]
@@ -223,7 +269,9 @@ class TagViewSet(viewsets.ModelViewSet):
     http_method_names = ('get', 'post', 'patch', 'delete')
 
 
-class IngredientViewSet(viewsets.ModelViewSet):
+class IngredientViewSet(
+    ResponseCacheMixin, FastReadMixin, ReplicaReadMixin, viewsets.ModelViewSet
+):
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     permission_classes = [IsAdminOrReadOnly]
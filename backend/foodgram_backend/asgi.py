@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'foodgram_backend.settings')
+# Под ASGI горячие пути чтения обслуживаются асинхронными представлениями
+os.environ.setdefault('ASYNC_VIEWS', 'True')
 
 application = get_asgi_application()
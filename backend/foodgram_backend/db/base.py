@@ -0,0 +1,205 @@
+"""PostgreSQL с проверкой постоянных соединений и пулом в памяти процесса.
+
+Проверка соединений повторяет CONN_HEALTH_CHECKS из Django 4.1: перед
+первым запросом в рамках HTTP-запроса постоянное соединение проверяется
+и при необходимости переоткрывается.
+
+Пул включается ключом POOL в настройках базы и полезен для потоковых и
+асинхронных воркеров: соединение берется из пула при первом запросе к
+базе и возвращается в него при закрытии, вместо реального переподключения.
+"""
+import threading
+import time
+from functools import cached_property
+
+from django.db.backends.postgresql import base
+from psycopg2 import extensions
+
+from foodgram_backend import metrics
+
+connection_setup = metrics.summary(
+    'db_connection_setup_seconds',
+    'Время открытия нового соединения с базой данных'
+)
+health_check_failures = metrics.counter(
+    'db_health_check_failures_total',
+    'Постоянные соединения, не прошедшие проверку'
+)
+pool_in_use = metrics.gauge(
+    'db_pool_connections_in_use', 'Соединения пула, занятые потоками'
+)
+pool_idle = metrics.gauge(
+    'db_pool_connections_idle', 'Свободные соединения пула'
+)
+pool_wait = metrics.summary(
+    'db_pool_wait_seconds', 'Ожидание свободного соединения пула'
+)
+pool_timeouts = metrics.counter(
+    'db_pool_timeouts_total',
+    'Запросы соединения, не дождавшиеся свободного места в пуле'
+)
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class ConnectionPool:
+
+    def __init__(self, alias, max_size, timeout, max_lifetime):
+        self.alias = alias
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.slots = threading.BoundedSemaphore(max_size)
+        self.idle = []
+        self.created_at = {}
+        self.lock = threading.Lock()
+
+    def acquire(self, create, check=None):
+        start = time.monotonic()
+        if not self.slots.acquire(timeout=self.timeout):
+            pool_timeouts.inc(alias=self.alias)
+            raise base.Database.OperationalError(
+                'Нет свободных соединений в пуле '
+                f'{self.alias} за {self.timeout} с'
+            )
+        pool_wait.observe(time.monotonic() - start, alias=self.alias)
+        try:
+            connection = self.get_idle(check)
+            if connection is None:
+                connection = create()
+                with self.lock:
+                    self.created_at[id(connection)] = time.monotonic()
+        except Exception:
+            self.slots.release()
+            raise
+        pool_in_use.inc(alias=self.alias)
+        return connection
+
+    def get_idle(self, check=None):
+        while True:
+            with self.lock:
+                if not self.idle:
+                    return None
+                connection = self.idle.pop()
+                pool_idle.set(len(self.idle), alias=self.alias)
+            if (not connection.closed and not self.is_expired(connection)
+                    and (check is None or check(connection))):
+                return connection
+            with self.lock:
+                self.forget(connection)
+
+    def is_expired(self, connection):
+        created_at = self.created_at.get(id(connection), 0)
+        return time.monotonic() - created_at > self.max_lifetime
+
+    def forget(self, connection):
+        self.created_at.pop(id(connection), None)
+        if not connection.closed:
+            connection.close()
+
+    def release(self, connection, discard=False):
+        try:
+            if not discard and not connection.closed and (
+                    connection.get_transaction_status()
+                    != extensions.TRANSACTION_STATUS_IDLE):
+                connection.rollback()
+        except base.Database.Error:
+            discard = True
+        with self.lock:
+            if discard or connection.closed:
+                self.forget(connection)
+            else:
+                self.idle.append(connection)
+            pool_idle.set(len(self.idle), alias=self.alias)
+        pool_in_use.dec(alias=self.alias)
+        self.slots.release()
+
+
+def get_pool(alias, settings_dict):
+    # Тестовый раннер меняет имя базы у того же псевдонима, поэтому пул
+    # привязан еще и к параметрам подключения
+    key = (alias, *(
+        settings_dict.get(name) for name in ('NAME', 'USER', 'HOST', 'PORT')
+    ))
+    with _pools_lock:
+        if key not in _pools:
+            options = settings_dict['POOL']
+            _pools[key] = ConnectionPool(
+                alias, options.get('MAX_SIZE', 10),
+                options.get('TIMEOUT', 5), options.get('MAX_LIFETIME', 3600)
+            )
+        return _pools[key]
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    health_check_done = False
+    health_check_failed = False
+
+    @cached_property
+    def pool(self):
+        if not self.settings_dict.get('POOL', {}).get('ENABLED'):
+            return None
+        return get_pool(self.alias, self.settings_dict)
+
+    def get_new_connection(self, conn_params):
+        pool = self.pool
+        if pool is None:
+            return self.open_connection(conn_params)
+        connection = pool.acquire(
+            lambda: self.open_connection(conn_params),
+            self.check_connection
+            if self.settings_dict.get('CONN_HEALTH_CHECKS') else None
+        )
+        self.isolation_level = connection.isolation_level
+        return connection
+
+    def check_connection(self, connection):
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+        except base.Database.Error:
+            health_check_failures.inc(alias=self.alias)
+            return False
+        return True
+
+    def open_connection(self, conn_params):
+        start = time.monotonic()
+        connection = super().get_new_connection(conn_params)
+        connection_setup.observe(time.monotonic() - start, alias=self.alias)
+        return connection
+
+    def connect(self):
+        super().connect()
+        # Новое соединение и соединение из пула уже проверены
+        self.health_check_done = True
+        self.health_check_failed = False
+
+    def _close(self):
+        pool = self.pool
+        if pool is None or self.connection is None:
+            return super()._close()
+        pool.release(
+            self.connection,
+            discard=self.errors_occurred or self.health_check_failed
+        )
+
+    def close_if_health_check_failed(self):
+        if (self.connection is None
+                or not self.settings_dict.get('CONN_HEALTH_CHECKS')
+                or self.health_check_done):
+            return
+        if not self.is_usable():
+            health_check_failures.inc(alias=self.alias)
+            self.health_check_failed = True
+            self.close()
+        self.health_check_done = True
+
+    def close_if_unusable_or_obsolete(self):
+        # Вызывается в начале и в конце каждого HTTP-запроса
+        if self.connection is not None:
+            self.health_check_done = False
+        super().close_if_unusable_or_obsolete()
+
+    def _cursor(self, name=None):
+        self.close_if_health_check_failed()
+        return super()._cursor(name)
@@ -0,0 +1,42 @@
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+
+def get_estimated_count(queryset):
+    """Число строк таблицы по статистике планировщика PostgreSQL.
+
+    None, если оценки нет: другая СУБД или таблица еще не анализировалась.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT reltuples FROM pg_class WHERE oid = %s::regclass',
+            [queryset.model._meta.db_table]
+        )
+        row = cursor.fetchone()
+    if row is None or row[0] < 0:
+        return None
+    return int(row[0])
+
+
+class EstimatedCountPaginator(Paginator):
+    """Пагинатор для больших таблиц в админке.
+
+    Для списка без фильтров COUNT(*) читал бы всю таблицу, поэтому число
+    строк берется из pg_class.reltuples, если оно не меньше
+    estimate_threshold. Отфильтрованные списки и небольшие таблицы
+    считаются точно.
+    """
+    estimate_threshold = 100000
+
+    @cached_property
+    def count(self):
+        query = getattr(self.object_list, 'query', None)
+        if query is not None and not query.where:
+            estimate = get_estimated_count(self.object_list)
+            if estimate is not None and estimate >= self.estimate_threshold:
+                return estimate
+        return super().count
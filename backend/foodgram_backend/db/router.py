@@ -0,0 +1,39 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+replica_reads = ContextVar('replica_reads', default=False)
+
+
+@contextmanager
+def read_from_replica():
+    """Направляет чтения внутри блока на реплики, если они настроены."""
+    token = replica_reads.set(True)
+    try:
+        yield
+    finally:
+        replica_reads.reset(token)
+
+
+class ReplicaRouter:
+    """Чтения в явно помеченных местах идут на случайную реплику.
+
+    Все остальное, включая запись и миграции, идет на основную базу:
+    реплики получают данные репликацией, а не от Django.
+    """
+
+    def db_for_read(self, model, **hints):
+        if settings.DB_REPLICAS and replica_reads.get():
+            return random.choice(settings.DB_REPLICAS)
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in settings.DB_REPLICAS
@@ -0,0 +1,163 @@
+"""Метрики процесса в текстовом формате Prometheus.
+
+Значения хранятся в памяти каждого процесса отдельно, поэтому при
+нескольких воркерах gunicorn каждый отдает свои метрики.
+"""
+import abc
+import bisect
+import threading
+
+_lock = threading.Lock()
+_metrics = {}
+
+
+class Metric(abc.ABC):
+    type = None
+
+    def __init__(self, name, documentation):
+        self.name = name
+        self.documentation = documentation
+        self.lock = threading.Lock()
+
+    @abc.abstractmethod
+    def samples(self):
+        """Тройки (суффикс имени, метки, значение) для render()."""
+
+    def render(self):
+        lines = [
+            f'# HELP {self.name} {self.documentation}',
+            f'# TYPE {self.name} {self.type}',
+        ]
+        for suffix, labels, value in self.samples():
+            lines.append(f'{self.name}{suffix}{format_labels(labels)} {value}')
+        return '\n'.join(lines)
+
+
+class LabeledMetric(Metric):
+
+    def __init__(self, name, documentation):
+        super().__init__(name, documentation)
+        self.values = {}
+
+    @staticmethod
+    def get_key(labels):
+        return tuple(sorted(labels.items()))
+
+
+class Counter(LabeledMetric):
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self.get_key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def samples(self):
+        with self.lock:
+            return [('', key, value) for key, value in self.values.items()]
+
+
+class Gauge(Counter):
+    type = 'gauge'
+
+    def set(self, value, **labels):
+        with self.lock:
+            self.values[self.get_key(labels)] = value
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Summary(LabeledMetric):
+    """Количество и сумма наблюдений, а также максимум с момента запуска."""
+    type = 'summary'
+
+    def observe(self, value, **labels):
+        key = self.get_key(labels)
+        with self.lock:
+            count, total, maximum = self.values.get(key, (0, 0, 0))
+            self.values[key] = (count + 1, total + value, max(maximum, value))
+
+    def samples(self):
+        samples = []
+        with self.lock:
+            for key, (count, total, maximum) in self.values.items():
+                samples.extend((
+                    ('_count', key, count),
+                    ('_sum', key, total),
+                    ('_max', key, maximum),
+                ))
+        return samples
+
+
+class Histogram(LabeledMetric):
+    type = 'histogram'
+
+    def __init__(self, name, documentation, buckets):
+        super().__init__(name, documentation)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self.get_key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            counts, count, total = self.values.get(
+                key, ([0] * len(self.buckets), 0, 0)
+            )
+            if index < len(counts):
+                counts[index] += 1
+            self.values[key] = (counts, count + 1, total + value)
+
+    def samples(self):
+        samples = []
+        with self.lock:
+            for key, (counts, count, total) in self.values.items():
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    samples.append(
+                        ('_bucket', key + (('le', bound),), cumulative)
+                    )
+                samples.extend((
+                    ('_bucket', key + (('le', '+Inf'),), count),
+                    ('_count', key, count),
+                    ('_sum', key, total),
+                ))
+        return samples
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    pairs = ','.join(f'{name}="{value}"' for name, value in labels)
+    return '{' + pairs + '}'
+
+
+def register(metric_class, name, documentation, *args):
+    """Возвращает метрику с данным именем, создавая ее при первом вызове."""
+    with _lock:
+        if name not in _metrics:
+            _metrics[name] = metric_class(name, documentation, *args)
+        return _metrics[name]
+
+
+def counter(name, documentation):
+    return register(Counter, name, documentation)
+
+
+def gauge(name, documentation):
+    return register(Gauge, name, documentation)
+
+
+def summary(name, documentation):
+    return register(Summary, name, documentation)
+
+
+def histogram(name, documentation, buckets):
+    return register(Histogram, name, documentation, buckets)
+
+
+def render():
+    with _lock:
+        metrics = list(_metrics.values())
+    return '\n'.join(metric.render() for metric in metrics) + '\n'
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/3.2/ref/settings/
 """
 import os
+from datetime import timedelta
 from pathlib import Path
 
 from dotenv import load_dotenv
@@ -31,6 +32,45 @@ DEBUG = True if os.getenv('DEBUG') == 'True' else False
 ALLOWED_HOSTS = os.getenv('ALLOWED_HOSTS').split(', ')
 
 INTERNAL_IPS = ['127.0.0.1']
+
+# Асинхронные представления включаются по умолчанию в asgi.py, под WSGI
+# они только добавили бы накладные расходы
+ASYNC_VIEWS = os.getenv('ASYNC_VIEWS', 'False') == 'True'
+
+# Адреса, которым доступен /metrics
+METRICS_ALLOWED_IPS = os.getenv('METRICS_ALLOWED_IPS', '127.0.0.1').split(', ')
+
+# Метрики запросов к API: число и время SQL-запросов, сериализация, размер
+REQUEST_METRICS_ENABLED = os.getenv(
+    'REQUEST_METRICS_ENABLED', 'True'
+) == 'True'
+
+# Профилирование запросов суперпользователей по заголовку X-Profile
+PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', 'False') == 'True'
+PROFILING_MAX_PER_HOUR = int(os.getenv('PROFILING_MAX_PER_HOUR', 30))
+PROFILING_MAX_STORED = int(os.getenv('PROFILING_MAX_STORED', 200))
+PROFILING_SAMPLE_INTERVAL = float(
+    os.getenv('PROFILING_SAMPLE_INTERVAL', 0.005)
+)
+
+# Ответы на чтение рецептов, тегов, ингредиентов и пользователей собираются
+# без to_representation каждого поля DRF
+FAST_SERIALIZERS = os.getenv('FAST_SERIALIZERS', 'True') == 'True'
+
+# Сжатие ответов: порог размера в байтах, уровни gzip и brotli и объем
+# потокового ответа, после которого сжатая часть отправляется клиенту
+COMPRESSION_ENABLED = os.getenv('COMPRESSION_ENABLED', 'True') == 'True'
+COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', 1024))
+COMPRESSION_GZIP_LEVEL = int(os.getenv('COMPRESSION_GZIP_LEVEL', 6))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv('COMPRESSION_BROTLI_QUALITY', 5))
+COMPRESSION_STREAM_FLUSH_SIZE = int(
+    os.getenv('COMPRESSION_STREAM_FLUSH_SIZE', 16384)
+)
+
+# Время жизни готовых ответов справочников тегов и ингредиентов в кэше,
+# 0 отключает кэш
+RESPONSE_CACHE_TIMEOUT = int(os.getenv('RESPONSE_CACHE_TIMEOUT', 600))
+
 # Application definition
 
 INSTALLED_APPS = [
@@ -40,30 +80,45 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
-    'debug_toolbar',
     'django_cleanup.apps.CleanupConfig',
     'django_extensions',
     'django_filters',
     'rest_framework',
     'rest_framework.authtoken',
+    'rest_framework_simplejwt.token_blacklist',
     'djoser',
     'corsheaders',
     'user.apps.UserConfig',
-    'recipe.apps.RecipeConfig'
+    'recipe.apps.RecipeConfig',
+    'api.apps.ApiConfig',
 ]
 
 MIDDLEWARE = [
+    'api.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'api.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
-    'debug_toolbar.middleware.DebugToolbarMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'api.middleware.ReplicaPinMiddleware',
+    'api.middleware.ProfilingMiddleware',
 ]
 
+# Панель отладки заметно замедляет каждый запрос, поэтому только в DEBUG
+if DEBUG:
+    INSTALLED_APPS.insert(
+        INSTALLED_APPS.index('django_cleanup.apps.CleanupConfig'),
+        'debug_toolbar'
+    )
+    MIDDLEWARE.insert(
+        MIDDLEWARE.index('django.middleware.common.CommonMiddleware') + 1,
+        'debug_toolbar.middleware.DebugToolbarMiddleware'
+    )
+
 ROOT_URLCONF = 'foodgram_backend.urls'
 
 TEMPLATES = [
@@ -87,22 +142,57 @@ WSGI_APPLICATION = 'foodgram_backend.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/3.2/ref/settings/#databases
 #
+# Соединения живут DB_CONN_MAX_AGE секунд и проверяются перед первым
+# запросом в рамках HTTP-запроса. С включенным пулом соединение
+# возвращается в пул в конце каждого запроса
+DB_POOL_ENABLED = os.getenv('DB_POOL_ENABLED', 'False') == 'True'
+DB_ENGINE = os.getenv('DB_ENGINE', 'foodgram_backend.db')
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': DB_ENGINE,
         'NAME': os.getenv('POSTGRES_DB'),
         'USER': os.getenv('POSTGRES_USER'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD'),
         'HOST': os.getenv('DB_HOST', ''),
         'PORT': os.getenv('DB_PORT', 5432),
+        'CONN_MAX_AGE': (
+            0 if DB_POOL_ENABLED else int(os.getenv('DB_CONN_MAX_AGE', 60))
+        ),
+        'CONN_HEALTH_CHECKS': (
+            os.getenv('DB_CONN_HEALTH_CHECKS', 'True') == 'True'
+        ),
+        'POOL': {
+            'ENABLED': DB_POOL_ENABLED,
+            'MAX_SIZE': int(os.getenv('DB_POOL_MAX_SIZE', 10)),
+            'TIMEOUT': float(os.getenv('DB_POOL_TIMEOUT', 5)),
+            'MAX_LIFETIME': int(os.getenv('DB_POOL_MAX_LIFETIME', 3600)),
+        },
     }
 }
-# DATABASES = {
-#     'default': {
-#         'ENGINE': 'django.db.backends.sqlite3',
-#         'NAME': BASE_DIR / 'db.sqlite3',
-#     }
-# }
+if DB_ENGINE == 'django.db.backends.sqlite3':
+    DATABASES['default'] = {
+        'ENGINE': DB_ENGINE,
+        'NAME': BASE_DIR / 'db.sqlite3',
+    }
+
+# Реплики для чтения: хосты PostgreSQL или файлы SQLite через запятую.
+# В тестах реплики указывают на тестовую основную базу
+DB_REPLICAS = []
+for number, location in enumerate(
+        filter(None, os.getenv('DB_REPLICAS', '').split(', ')), start=1):
+    alias = f'replica_{number}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'NAME' if DB_ENGINE == 'django.db.backends.sqlite3' else 'HOST': (
+            location
+        ),
+        'TEST': {'MIRROR': 'default'},
+    }
+    DB_REPLICAS.append(alias)
+DATABASE_ROUTERS = ['foodgram_backend.db.router.ReplicaRouter']
+# Сколько секунд после записи чтения пользователя идут на основную базу
+DB_REPLICA_PIN_SECONDS = int(os.getenv('DB_REPLICA_PIN_SECONDS', 10))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
@@ -122,6 +212,18 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Первый хешер используется для новых паролей, остальные только проверяют
+# старые хеши, которые пересчитываются первым хешером при входе
+PASSWORD_HASHERS = os.getenv(
+    'PASSWORD_HASHERS',
+    'user.hashers.TunedArgon2PasswordHasher, '
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher, '
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher'
+).split(', ')
+ARGON2_TIME_COST = int(os.getenv('ARGON2_TIME_COST', 2))
+ARGON2_MEMORY_COST = int(os.getenv('ARGON2_MEMORY_COST', 19456))
+ARGON2_PARALLELISM = int(os.getenv('ARGON2_PARALLELISM', 1))
+
 # Internationalization
 # https://docs.djangoproject.com/en/3.2/topics/i18n/
 
@@ -144,6 +246,24 @@ STATIC_ROOT = BASE_DIR / 'collected_static'
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = '/media/'
+
+# Файлы из multipart/form-data пишутся во временные файлы по частям,
+# а не собираются целиком в памяти процесса
+FILE_UPLOAD_HANDLERS = [
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+
+# Уменьшенные копии изображений рецептов и аватаров: имя копии и
+# максимальная сторона в пикселях
+IMAGE_VARIANTS = {
+    'thumbnail': 160,
+    'card': 480,
+    'full': 1280,
+}
+IMAGE_MAX_PIXELS = int(os.getenv('IMAGE_MAX_PIXELS', 40_000_000))
+IMAGE_VARIANT_QUALITY = int(os.getenv('IMAGE_VARIANT_QUALITY', 80))
+IMAGE_PROCESSING_ASYNC = os.getenv('IMAGE_PROCESSING_ASYNC', 'True') == 'True'
+IMAGE_PROCESSING_WORKERS = int(os.getenv('IMAGE_PROCESSING_WORKERS', 2))
 # Default primary key field type
 # https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
 
@@ -153,12 +273,78 @@ AUTH_USER_MODEL = 'user.CustomUser'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        # Пропускает запрос без проверки, пока JWT_AUTH_ENABLED выключен
+        'api.authentication.StatelessJWTAuthentication',
+        'api.authentication.CachedTokenAuthentication',
+    ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
     ],
+    'DEFAULT_PARSER_CLASSES': [
+        'api.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+    'DEFAULT_THROTTLE_CLASSES': [
+        'api.throttling.TokenBucketThrottle',
+    ],
+    # Частоты тяжелых эндпоинтов на пользователя или IP-адрес анонима
+    'DEFAULT_THROTTLE_RATES': {
+        'shopping_list': os.getenv('THROTTLE_SHOPPING_LIST', '10/min'),
+        'recipe_write': os.getenv('THROTTLE_RECIPE_WRITE', '30/min'),
+        'subscriptions': os.getenv('THROTTLE_SUBSCRIPTIONS', '60/min'),
+    },
     'DEFAULT_PAGINATION_CLASS': 'api.pagination.CustomPageNumberPagination',
     'PAGE_SIZE': 6
 }
 
+# JWT-режим: access-токен проверяется без запроса к базе, база читается
+# только при обновлении пары токенов. Токены authtoken продолжают работать
+JWT_AUTH_ENABLED = os.getenv('JWT_AUTH_ENABLED', 'False') == 'True'
+
+SIMPLE_JWT = {
+    'ACCESS_TOKEN_LIFETIME': timedelta(
+        minutes=int(os.getenv('JWT_ACCESS_TOKEN_MINUTES', 5))
+    ),
+    'REFRESH_TOKEN_LIFETIME': timedelta(
+        days=int(os.getenv('JWT_REFRESH_TOKEN_DAYS', 7))
+    ),
+    'ROTATE_REFRESH_TOKENS': True,
+    'BLACKLIST_AFTER_ROTATION': True,
+    'AUTH_HEADER_TYPES': ('Bearer',),
+    'TOKEN_OBTAIN_SERIALIZER': 'api.serializers.JWTObtainSerializer',
+    'TOKEN_REFRESH_SERIALIZER': 'api.serializers.JWTRefreshSerializer',
+}
+
+SHOPPING_LIST_PDF_FONT = os.getenv(
+    'SHOPPING_LIST_PDF_FONT',
+    '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf'
+)
+
+# Лента подписок: сколько записей хранить на пользователя и с какого
+# числа подписчиков рецепты автора не раскладываются по лентам
+FEED_MAX_ENTRIES = int(os.getenv('FEED_MAX_ENTRIES', 500))
+FEED_FANOUT_MAX_FOLLOWERS = int(os.getenv('FEED_FANOUT_MAX_FOLLOWERS', 1000))
+
+RECIPE_IMPORT_BATCH_SIZE = int(os.getenv('RECIPE_IMPORT_BATCH_SIZE', 100))
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+
+# Кэш пользователей по токенам: время жизни в общем кэше, а также размер
+# и время жизни кэша в памяти процесса, который нельзя сбросить из
+# других процессов
+TOKEN_CACHE_TIMEOUT = int(os.getenv('TOKEN_CACHE_TIMEOUT', 60))
+TOKEN_LOCAL_CACHE_SIZE = int(os.getenv('TOKEN_LOCAL_CACHE_SIZE', 1024))
+TOKEN_LOCAL_CACHE_TIMEOUT = int(os.getenv('TOKEN_LOCAL_CACHE_TIMEOUT', 5))
+
 CORS_ALLOWED_ORIGINS = [
     'http://localhost:3000',
 ]
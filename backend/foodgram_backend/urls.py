@@ -2,8 +2,11 @@ from django.contrib import admin
 from django.conf import settings
 from django.urls import include, path
 
+from .views import metrics
+
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('metrics', metrics, name='metrics'),
     path('api/', include('api.urls')),
     path('s/', include('recipe.urls')),
 ]
@@ -0,0 +1,12 @@
+from django.conf import settings
+from django.http import Http404, HttpResponse
+
+from . import metrics as metrics_registry
+
+
+def metrics(request):
+    if request.META.get('REMOTE_ADDR') not in settings.METRICS_ALLOWED_IPS:
+        raise Http404
+    return HttpResponse(
+        metrics_registry.render(), content_type='text/plain; version=0.0.4'
+    )
@@ -1,7 +1,14 @@
+from contextlib import contextmanager
+
 from django.contrib import admin
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.urls import reverse
+from django.utils.html import format_html
 
 from .models import (Ingredient, Recipe, RecipeFavorite, RecipeIngredient,
-                     RecipeShoppingCart, RecipeTag, Tag)
+                     RecipeShoppingCart, RecipeTag, ShoppingListItem, Tag)
+from foodgram_backend.db.pagination import EstimatedCountPaginator
 
 
 class RecipeTagInline(admin.TabularInline):
@@ -16,35 +23,87 @@ class RecipeIngredientInline(admin.TabularInline):
     autocomplete_fields = ['ingredient']
 
 
-class RecipeFavoriteInline(admin.TabularInline):
-    model = RecipeFavorite
-    extra = 1
-
-
-class RecipeShoppingCartInline(admin.TabularInline):
-    model = RecipeShoppingCart
-    extra = 1
+@contextmanager
+def updating_shopping_lists(recipe_ids):
+    """Переносит изменения ингредиентов рецептов в суммы корзин."""
+    old_amounts = {
+        recipe_id: ShoppingListItem.objects.get_recipe_amounts(recipe_id)
+        for recipe_id in set(recipe_ids)
+    }
+    yield
+    for recipe_id, amounts in old_amounts.items():
+        ShoppingListItem.objects.update_recipe(
+            recipe_id, amounts,
+            ShoppingListItem.objects.get_recipe_amounts(recipe_id)
+        )
+
+
+def count_by_recipe(model):
+    return Coalesce(Subquery(
+        model.objects.filter(recipe=OuterRef('pk')).order_by().values(
+            'recipe'
+        ).annotate(count=Count('pk')).values('count')
+    ), 0)
+
+
+def link_to_changelist(model, recipe, count):
+    url = reverse(
+        f'admin:{model._meta.app_label}_{model._meta.model_name}_changelist'
+    )
+    return format_html(
+        '<a href="{}?recipe__id__exact={}">{}</a>', url, recipe.pk, count
+    )
 
 
 @admin.register(Recipe)
 class RecipeAdmin(admin.ModelAdmin):
-    list_display = ('name', 'author')
-    inlines = (
-        RecipeTagInline, RecipeIngredientInline,
-        RecipeFavoriteInline, RecipeShoppingCartInline
-    )
-    search_fields = ('name', 'author__username')
+    list_display = ('name', 'author', 'favorites_count', 'shopping_cart_count')
+    list_select_related = ('author',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    # Избранное и корзины популярного рецепта - тысячи строк, поэтому
+    # вместо вставок на странице рецепта их число и ссылка на список
+    inlines = (RecipeTagInline, RecipeIngredientInline)
+    search_fields = ('name__startswith', 'author__username__startswith')
     list_filter = ('tags',)
+    raw_id_fields = ('author',)
 
-    readonly_fields = ('times_favorited',)
+    readonly_fields = ('times_favorited', 'times_in_shopping_cart')
     fields = (
-        'name', 'author', 'image', 'text', 'cooking_time', 'times_favorited'
+        'name', 'author', 'image', 'text', 'cooking_time', 'times_favorited',
+        'times_in_shopping_cart'
     )
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(
+            favorites_count=count_by_recipe(RecipeFavorite),
+            shopping_cart_count=count_by_recipe(RecipeShoppingCart),
+        )
+
+    def favorites_count(self, obj):
+        return obj.favorites_count
+    favorites_count.short_description = 'В избранном'
+    favorites_count.admin_order_field = 'favorites_count'
+
+    def shopping_cart_count(self, obj):
+        return obj.shopping_cart_count
+    shopping_cart_count.short_description = 'В корзинах'
+    shopping_cart_count.admin_order_field = 'shopping_cart_count'
+
     def times_favorited(self, obj):
-        return RecipeFavorite.objects.filter(recipe=obj).count()
+        return link_to_changelist(RecipeFavorite, obj, obj.favorites_count)
     times_favorited.short_description = 'Добавлений в избранное'
 
+    def times_in_shopping_cart(self, obj):
+        return link_to_changelist(
+            RecipeShoppingCart, obj, obj.shopping_cart_count
+        )
+    times_in_shopping_cart.short_description = 'Добавлений в корзину'
+
+    def save_related(self, request, form, formsets, change):
+        with updating_shopping_lists([form.instance.pk]):
+            super().save_related(request, form, formsets, change)
+
 
 @admin.register(Tag)
 class TagAdmin(admin.ModelAdmin):
@@ -58,19 +117,70 @@ class IngredientAdmin(admin.ModelAdmin):
     search_fields = ('name',)
 
 
+# Таблицы связей растут до миллионов строк: поиск только по началу
+# индексированных названий, счетчик из статистики и связанные объекты
+# одним запросом. Пользователей слишком много для списка или
+# автодополнения, они выбираются по id
 @admin.register(RecipeIngredient)
 class RecipeIngredientAdmin(admin.ModelAdmin):
     list_display = ('ingredient', 'recipe', 'amount')
-    search_fields = ('recipe__name', 'ingredient__name',)
+    list_select_related = ('ingredient', 'recipe')
+    search_fields = (
+        'recipe__name__startswith', 'ingredient__name__startswith'
+    )
+    autocomplete_fields = ('recipe', 'ingredient')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def save_model(self, request, obj, form, change):
+        # При смене рецепта меняются корзины и старого, и нового рецепта
+        recipe_ids = [obj.recipe_id]
+        if change and 'recipe' in form.changed_data:
+            recipe_ids.append(form.initial['recipe'])
+        with updating_shopping_lists(recipe_ids):
+            super().save_model(request, obj, form, change)
+
+    def delete_model(self, request, obj):
+        with updating_shopping_lists([obj.recipe_id]):
+            super().delete_model(request, obj)
+
+    def delete_queryset(self, request, queryset):
+        with updating_shopping_lists(
+                queryset.values_list('recipe_id', flat=True).distinct()
+        ):
+            super().delete_queryset(request, queryset)
 
 
 @admin.register(RecipeFavorite)
 class RecipeFavoriteAdmin(admin.ModelAdmin):
     list_display = ('user', 'recipe')
-    search_fields = ('user__username', 'recipe__name',)
+    list_select_related = ('user', 'recipe')
+    search_fields = ('user__username__startswith', 'recipe__name__startswith')
+    raw_id_fields = ('user',)
+    autocomplete_fields = ('recipe',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
 @admin.register(RecipeShoppingCart)
 class RecipeShoppingCartAdmin(admin.ModelAdmin):
     list_display = ('user', 'recipe')
-    search_fields = ('user__username', 'recipe__name',)
+    list_select_related = ('user', 'recipe')
+    search_fields = ('user__username__startswith', 'recipe__name__startswith')
+    raw_id_fields = ('user',)
+    autocomplete_fields = ('recipe',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+@admin.register(ShoppingListItem)
+class ShoppingListItemAdmin(admin.ModelAdmin):
+    list_display = ('user', 'ingredient', 'total_amount')
+    list_select_related = ('user', 'ingredient')
+    search_fields = (
+        'user__username__startswith', 'ingredient__name__startswith'
+    )
+    raw_id_fields = ('user',)
+    autocomplete_fields = ('ingredient',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
@@ -0,0 +1,239 @@
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db.models import (Case, Count, F, IntegerField, Q, Sum, Value,
+                              When, manager)
+from django.db.models.functions import Greatest
+
+from .utils import get_ranked_ids
+from user.models import Follow
+
+
+class ShoppingListQuerySet(manager.QuerySet):
+    def get_items(self, user):
+        return self.filter(user=user).select_related(
+            'ingredient'
+        ).order_by('ingredient__name')
+
+    def get_rows(self, user):
+        return self.get_items(user).values_list(
+            'ingredient_id',
+            'ingredient__name',
+            'ingredient__measurement_unit',
+            'total_amount'
+        )
+
+
+class ShoppingListManager(manager.Manager):
+    """Поддерживает суммы ингредиентов из корзины пользователя.
+
+    Вместо пересчета Sum('amount') по всем рецептам корзины суммы
+    изменяются на разницу при добавлении и удалении рецептов из корзины
+    и при редактировании ингредиентов рецепта.
+    """
+
+    def get_queryset(self):
+        return ShoppingListQuerySet(self.model, using=self._db)
+
+    def get_items(self, user):
+        return self.get_queryset().get_items(user)
+
+    def get_rows(self, user):
+        return self.get_queryset().get_rows(user)
+
+    def apply_deltas(self, user_ids, deltas: dict):
+        deltas = {
+            ingredient_id: delta
+            for ingredient_id, delta in deltas.items() if delta
+        }
+        if not user_ids or not deltas:
+            return
+        added = [
+            ingredient_id
+            for ingredient_id, delta in deltas.items() if delta > 0
+        ]
+        self.bulk_create(
+            [
+                self.model(user_id=user_id, ingredient_id=ingredient_id)
+                for user_id in user_ids for ingredient_id in added
+            ],
+            ignore_conflicts=True
+        )
+        items = self.filter(user_id__in=user_ids, ingredient_id__in=deltas)
+        items.update(total_amount=Greatest(
+            F('total_amount') + Case(
+                *(When(ingredient_id=ingredient_id, then=Value(delta))
+                  for ingredient_id, delta in deltas.items()),
+                default=Value(0),
+                output_field=IntegerField()
+            ),
+            Value(0)
+        ))
+        items.filter(total_amount=0).delete()
+
+    def get_recipe_amounts(self, recipe_id) -> dict:
+        from .models import RecipeIngredient
+
+        return dict(RecipeIngredient.objects.filter(
+            recipe_id=recipe_id
+        ).values_list('ingredient_id', 'amount'))
+
+    def add_recipe(self, user_id, recipe_id):
+        self.apply_deltas([user_id], self.get_recipe_amounts(recipe_id))
+
+    def remove_recipe(self, user_id, recipe_id):
+        amounts = self.get_recipe_amounts(recipe_id)
+        self.apply_deltas([user_id], {
+            ingredient_id: -amount for ingredient_id, amount in amounts.items()
+        })
+
+    def update_recipe(self, recipe_id, old_amounts: dict, new_amounts: dict):
+        from .models import RecipeShoppingCart
+
+        deltas = {
+            ingredient_id: (
+                new_amounts.get(ingredient_id, 0)
+                - old_amounts.get(ingredient_id, 0)
+            )
+            for ingredient_id in old_amounts.keys() | new_amounts.keys()
+        }
+        if not any(deltas.values()):
+            return
+        # Рецепт может лежать в корзине одного пользователя несколько раз
+        users_by_count = defaultdict(list)
+        for user_id, count in Counter(RecipeShoppingCart.objects.filter(
+                recipe_id=recipe_id
+        ).values_list('user_id', flat=True)).items():
+            users_by_count[count].append(user_id)
+        for count, user_ids in users_by_count.items():
+            self.apply_deltas(user_ids, {
+                ingredient_id: delta * count
+                for ingredient_id, delta in deltas.items()
+            })
+
+    def rebuild(self):
+        from .models import RecipeIngredient
+
+        self.all().delete()
+        totals = RecipeIngredient.objects.filter(
+            recipe__shopping_users__isnull=False
+        ).values(
+            'recipe__shopping_users__user_id', 'ingredient_id'
+        ).annotate(total=Sum('amount')).order_by().iterator()
+        return len(self.bulk_create(
+            (
+                self.model(
+                    user_id=row['recipe__shopping_users__user_id'],
+                    ingredient_id=row['ingredient_id'],
+                    total_amount=row['total']
+                )
+                for row in totals
+            ),
+            batch_size=1000
+        ))
+
+
+class FeedManager(manager.Manager):
+    """Ленты подписчиков, заполняемые при публикации рецепта.
+
+    Записи в ленты подписчиков создаются при создании рецепта, но только
+    для авторов, у которых подписчиков не больше
+    FEED_FANOUT_MAX_FOLLOWERS. Рецепты более популярных авторов
+    подмешиваются в ленту при чтении. Лента обрезается до
+    FEED_MAX_ENTRIES записей при записи в нее и командой trim_feeds, а
+    чтение ленты ничего не изменяет и может идти с реплики.
+    """
+
+    @staticmethod
+    def get_popular_author_ids(follower):
+        return Follow.objects.filter(
+            follower=follower,
+            following__followers_count__gt=settings.FEED_FANOUT_MAX_FOLLOWERS
+        ).values('following_id')
+
+    @staticmethod
+    def is_popular(author_id):
+        return Follow.following.field.related_model.objects.filter(
+            pk=author_id,
+            followers_count__gt=settings.FEED_FANOUT_MAX_FOLLOWERS
+        ).exists()
+
+    def trim(self, user_ids=None):
+        entries = self.all()
+        if user_ids is not None:
+            # Окно считается только по лентам, вышедшим за предел, а не
+            # по всем подписчикам автора
+            entries = entries.filter(user_id__in=self.filter(
+                user_id__in=user_ids
+            ).values('user_id').annotate(count=Count('pk')).filter(
+                count__gt=settings.FEED_MAX_ENTRIES
+            ).values('user_id'))
+        entries.exclude(pk__in=get_ranked_ids(
+            entries,
+            partition_by='user_id',
+            order_by=[F('created_at').desc(), F('id').desc()],
+            limit=settings.FEED_MAX_ENTRIES
+        )).delete()
+
+    def fan_out(self, recipe):
+        self.fan_out_many([recipe])
+
+    def fan_out_many(self, recipes):
+        """Раскладывает по лентам подписчиков рецепты, созданные пачкой,
+        за одно и то же число запросов.
+        """
+        author_ids = {recipe.author_id for recipe in recipes}
+        author_ids -= set(
+            Follow.following.field.related_model.objects.filter(
+                pk__in=author_ids,
+                followers_count__gt=settings.FEED_FANOUT_MAX_FOLLOWERS
+            ).values_list('pk', flat=True)
+        )
+        if not author_ids:
+            return
+        follower_ids = defaultdict(list)
+        for author_id, follower_id in Follow.objects.filter(
+                following_id__in=author_ids
+        ).values_list('following_id', 'follower_id'):
+            follower_ids[author_id].append(follower_id)
+        entries = [
+            self.model(
+                user_id=follower_id, recipe=recipe,
+                created_at=recipe.created_at
+            )
+            for recipe in recipes
+            for follower_id in follower_ids[recipe.author_id]
+        ]
+        if not entries:
+            return
+        self.bulk_create(entries, ignore_conflicts=True)
+        self.trim({entry.user_id for entry in entries})
+
+    def add_author(self, user_id, author_id):
+        from .models import Recipe
+
+        if self.is_popular(author_id):
+            return
+        recipes = Recipe.objects.filter(author_id=author_id).values_list(
+            'id', 'created_at'
+        )[:settings.FEED_MAX_ENTRIES]
+        self.bulk_create(
+            [
+                self.model(
+                    user_id=user_id, recipe_id=recipe_id,
+                    created_at=created_at
+                )
+                for recipe_id, created_at in recipes
+            ],
+            ignore_conflicts=True
+        )
+        self.trim([user_id])
+
+    def remove_author(self, user_id, author_id):
+        self.filter(user_id=user_id, recipe__author_id=author_id).delete()
+
+    def get_feed_filter(self, user):
+        return (
+            Q(pk__in=self.filter(user=user).values('recipe_id'))
+            | Q(author_id__in=self.get_popular_author_ids(user))
+        )
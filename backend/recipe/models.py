@@ -4,6 +4,7 @@ from django.db import models
 from django.urls import reverse
 from rest_framework.exceptions import ValidationError
 
+from .managers import FeedManager, ShoppingListManager
 from .utils import generate_short_link
 
 User = get_user_model()
@@ -85,6 +86,12 @@ class Recipe(models.Model):
             models.UniqueConstraint(
                 fields=('name', 'author'), name='unique_recipe_author'),
         )
+        indexes = (
+            models.Index(
+                fields=('author', '-created_at'),
+                name='recipe_author_created_idx'
+            ),
+        )
         ordering = ['-created_at']
 
     def get_absolute_url(self):
@@ -188,3 +195,56 @@ class RecipeShoppingCart(models.Model):
 
     def __str__(self):
         return f'{self.recipe.name}'
+
+
+class ShoppingListItem(models.Model):
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name='shopping_list_items',
+        verbose_name='Пользователь'
+    )
+    ingredient = models.ForeignKey(
+        Ingredient, on_delete=models.CASCADE,
+        related_name='shopping_list_items', verbose_name='Ингредиент'
+    )
+    total_amount = models.PositiveIntegerField(
+        default=0, verbose_name='Количество'
+    )
+    objects = ShoppingListManager()
+
+    class Meta:
+        verbose_name = 'Ингредиент в списке покупок'
+        verbose_name_plural = 'Ингредиенты в списке покупок'
+        constraints = (models.UniqueConstraint(
+            fields=('user', 'ingredient'), name='unique_shopping_list_item'),
+        )
+
+    def __str__(self):
+        return f'{self.ingredient.name}: {self.total_amount}'
+
+
+class FeedEntry(models.Model):
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name='feed_entries',
+        verbose_name='Подписчик'
+    )
+    recipe = models.ForeignKey(
+        Recipe, on_delete=models.CASCADE, related_name='feed_entries',
+        verbose_name='Рецепт'
+    )
+    created_at = models.DateTimeField(verbose_name='Дата создания рецепта')
+    objects = FeedManager()
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+        constraints = (models.UniqueConstraint(
+            fields=('user', 'recipe'), name='unique_feed_entry'),
+        )
+        indexes = (
+            models.Index(
+                fields=('user', '-created_at'), name='feed_user_created_idx'
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.recipe.name}'
@@ -1,7 +1,12 @@
+from django.conf import settings
 from django.urls import path
 
-from .views import redirect_to_recipe
+from .views import redirect_to_recipe, redirect_to_recipe_async
 
 urlpatterns = [
-    path('<str:short_link>/', redirect_to_recipe),
+    path(
+        '<str:short_link>/',
+        redirect_to_recipe_async if settings.ASYNC_VIEWS
+        else redirect_to_recipe
+    ),
 ]
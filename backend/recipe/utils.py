@@ -1,6 +1,10 @@
 import random
 import string
 
+from django.db.models import F, Window
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import RowNumber
+
 
 def generate_short_link():
     short_link = ''.join(random.choices(
@@ -8,3 +12,23 @@ def generate_short_link():
         k=random.randint(6, 10)
     ))
     return short_link.lower()
+
+
+def get_ranked_ids(queryset, partition_by, order_by, limit):
+    """Подзапрос с id первых limit строк каждой группы partition_by.
+
+    Django 3.2 не умеет фильтровать по оконным функциям, поэтому
+    нумерация строк через ROW_NUMBER() оборачивается в RawSQL.
+    """
+    ranked = queryset.order_by().annotate(
+        rank_in_group=Window(
+            RowNumber(), partition_by=[F(partition_by)], order_by=order_by
+        )
+    ).values('pk', 'rank_in_group')
+    sql, params = ranked.query.sql_with_params()
+    column = queryset.model._meta.pk.column
+    return RawSQL(
+        f'SELECT ranked.{column} FROM ({sql}) ranked '
+        f'WHERE ranked.rank_in_group <= %s',
+        (*params, limit)
+    )
@@ -1,3 +1,6 @@
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+from django.http import Http404
 from django.shortcuts import get_object_or_404, redirect
 
 from .models import Recipe
@@ -7,3 +10,22 @@ def redirect_to_recipe(request, short_link):
     recipe = get_object_or_404(Recipe, short_link=short_link)
     url = request.build_absolute_uri(f'/recipes/{recipe.id}')
     return redirect(url)
+
+
+def get_recipe_id(short_link):
+    close_old_connections()
+    try:
+        return Recipe.objects.filter(
+            short_link=short_link
+        ).values_list('id', flat=True).first()
+    finally:
+        close_old_connections()
+
+
+async def redirect_to_recipe_async(request, short_link):
+    recipe_id = await sync_to_async(get_recipe_id, thread_sensitive=False)(
+        short_link
+    )
+    if recipe_id is None:
+        raise Http404('Рецепт не найден')
+    return redirect(request.build_absolute_uri(f'/recipes/{recipe_id}'))
@@ -1,9 +1,13 @@
 import tempfile
 import pytest
+from django.conf import settings as django_settings
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.urls import reverse
 from rest_framework.test import APIClient
 
+from api import throttling
+from api.authentication import local_cache
 from recipe.models import Ingredient, Recipe, RecipeIngredient, Tag
 
 User = get_user_model()
@@ -12,6 +16,19 @@ MESSAGE = 'Данные ответа не соответствуют ожида
 PASSWORD = '12wnk1ej21'
 NOT_PASSWORD = 'sdflsd123'
 NEW_PASSWORD = 'm2kl31DA4'
+REPLICAS = list(django_settings.DB_REPLICAS)
+
+
+def get_image_variants_data(image_url):
+    path, _ = image_url.rsplit('.', 1)
+    directory, stem = path.rsplit('/', 1)
+    return {
+        variant: {
+            'webp': f'{directory}/variants/{stem}_{variant}.webp',
+            'jpeg': f'{directory}/variants/{stem}_{variant}.jpg',
+        }
+        for variant in ('thumbnail', 'card', 'full')
+    }
 
 
 @pytest.fixture(autouse=True)
@@ -21,6 +38,30 @@ def override_media_root(settings):
     yield
 
 
+@pytest.fixture(autouse=True)
+def clear_caches():
+    cache.clear()
+    local_cache.clear()
+    throttling.blocked.clear()
+    yield
+
+
+@pytest.fixture(autouse=True)
+def primary_database_only(settings):
+    # Реплики в тестах - зеркала основной базы на отдельном соединении и
+    # не видят данные незавершенной транзакции теста
+    settings.DB_REPLICAS = []
+    yield
+
+
+@pytest.fixture
+def replicas(settings):
+    if not REPLICAS:
+        pytest.skip('Реплики не настроены')
+    settings.DB_REPLICAS = REPLICAS
+    return REPLICAS
+
+
 @pytest.fixture
 def api_client_anon():
     return APIClient()
@@ -105,7 +146,15 @@ def user_data_after_reg(base_user_data):
 
 @pytest.fixture
 def get_user_data(user_data_after_reg):
-    return {**user_data_after_reg, "avatar": None, "is_subscribed": False}
+    return {
+        **user_data_after_reg,
+        "avatar": None,
+        "avatar_variants": None,
+        "is_subscribed": False,
+        "followers_count": 0,
+        "following_count": 0,
+        "recipes_count": 0
+    }
 
 
 @pytest.fixture
@@ -220,7 +269,7 @@ def get_recipe_data(
         "id": 1,
         "is_favorited": False,
         "is_in_shopping_cart": False,
-        "author": get_user_data,
+        "author": {**get_user_data, "recipes_count": 1},
     }
     return load_data
 
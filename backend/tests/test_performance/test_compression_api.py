@@ -0,0 +1,127 @@
+import gzip
+
+import pytest
+from django.urls import reverse
+
+from api import compression, middleware
+from recipe.models import Ingredient, ShoppingListItem, Tag
+
+pytestmark = pytest.mark.django_db
+
+TAGS_COUNT = 60
+SHOPPING_LIST_ROWS = 2000
+DECOMPRESS = {
+    'gzip': gzip.decompress,
+    'br': compression.brotli and compression.brotli.decompress,
+}
+
+
+@pytest.fixture
+def tags():
+    return Tag.objects.bulk_create(
+        Tag(name=f'tag_{number}', slug=f'tag_{number}')
+        for number in range(TAGS_COUNT)
+    )
+
+
+@pytest.mark.parametrize('accept_encoding, expected', (
+    ('gzip, deflate', 'gzip'),
+    ('gzip;q=0, deflate', None),
+    ('*', compression.ENCODINGS[0]),
+    ('identity', None),
+    ('', None),
+))
+def test_choose_encoding(accept_encoding, expected):
+    assert compression.choose_encoding(accept_encoding) == expected
+
+
+def test_compress_response(api_client_anon, tags):
+    url = reverse('tag-list')
+    plain = api_client_anon.get(url)
+    response = api_client_anon.get(url, HTTP_ACCEPT_ENCODING='gzip')
+    assert 'Content-Encoding' not in plain
+    assert response['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response['Vary']
+    assert int(response['Content-Length']) == len(response.content)
+    assert gzip.decompress(response.content) == plain.content
+
+
+@pytest.mark.skipif(compression.brotli is None, reason='Нет пакета brotli')
+def test_compress_response_brotli(api_client_anon, tags):
+    url = reverse('tag-list')
+    plain = api_client_anon.get(url)
+    response = api_client_anon.get(url, HTTP_ACCEPT_ENCODING='gzip, br')
+    assert response['Content-Encoding'] == 'br'
+    assert compression.brotli.decompress(response.content) == plain.content
+
+
+def test_small_response_not_compressed(api_client_anon, tag):
+    response = api_client_anon.get(
+        reverse('tag-list'), HTTP_ACCEPT_ENCODING='gzip'
+    )
+    assert 'Content-Encoding' not in response
+    assert response.json()[0]['slug'] == tag.slug
+
+
+def test_compress_streaming_response(settings, user_auth,
+                                     recipe_is_in_shopping_cart):
+    settings.COMPRESSION_MIN_SIZE = 10 ** 6
+    url = reverse('recipe-download-shopping-cart') + '?format=txt'
+    plain = b''.join(user_auth.get(url).streaming_content)
+    response = user_auth.get(url, HTTP_ACCEPT_ENCODING='gzip')
+    assert response['Content-Encoding'] == 'gzip'
+    assert not response.has_header('Content-Length')
+    assert gzip.decompress(b''.join(response.streaming_content)) == plain
+
+
+@pytest.mark.parametrize('encoding', compression.ENCODINGS)
+def test_compress_long_stream(user_auth, create_user, encoding):
+    ingredients = Ingredient.objects.bulk_create(
+        Ingredient(name=f'ingredient_{number}', measurement_unit='g')
+        for number in range(SHOPPING_LIST_ROWS)
+    )
+    ShoppingListItem.objects.bulk_create(
+        ShoppingListItem(
+            user=create_user, ingredient=ingredient, total_amount=10
+        )
+        for ingredient in Ingredient.objects.all()
+    )
+    url = reverse('recipe-download-shopping-cart') + '?format=txt'
+    plain = b''.join(user_auth.get(url).streaming_content)
+    assert plain.count(b'\n') >= len(ingredients)
+    response = user_auth.get(url, HTTP_ACCEPT_ENCODING=encoding)
+    assert response['Content-Encoding'] == encoding
+    compressed = b''.join(response.streaming_content)
+    # Сброс после каждой строки раздул бы поток в несколько раз
+    assert len(compressed) < len(plain)
+    assert len(compressed) < 1.5 * len(
+        compression.compress(plain, encoding)
+    )
+    assert DECOMPRESS[encoding](compressed) == plain
+
+
+def test_cached_response_is_not_recompressed(
+        api_client_anon, tags, monkeypatch, django_assert_num_queries):
+    url = reverse('tag-list')
+    expected = api_client_anon.get(url, HTTP_ACCEPT_ENCODING='gzip')
+
+    def compress(content, encoding):
+        raise AssertionError('Ответ из кэша сжат повторно')
+    monkeypatch.setattr(middleware, 'compress', compress)
+    with django_assert_num_queries(0):
+        response = api_client_anon.get(url, HTTP_ACCEPT_ENCODING='gzip')
+    assert response['Content-Encoding'] == 'gzip'
+    assert response.content == expected.content
+
+
+def test_response_cache_invalidated(api_client_anon, admin_auth, tags):
+    url = reverse('tag-list')
+    count = len(api_client_anon.get(url).json())
+    admin_auth.patch(
+        reverse('tag-detail', args=[Tag.objects.first().pk]),
+        {'name': 'renamed'}, format='json'
+    )
+    Tag.objects.create(name='new_tag', slug='new_tag')
+    data = api_client_anon.get(url).json()
+    assert len(data) == count + 1
+    assert 'renamed' in {tag['name'] for tag in data}
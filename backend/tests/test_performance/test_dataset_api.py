@@ -0,0 +1,32 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db.models import Count
+
+from recipe.models import FeedEntry, Recipe, ShoppingListItem
+from user.models import Follow
+
+User = get_user_model()
+
+
+@pytest.mark.django_db
+def test_generate_dataset():
+    call_command(
+        'generate_dataset', users=30, recipes=60, follows=5, favorites=5,
+        cart=2, seed=1, batch_size=25
+    )
+    assert User.objects.count() == 30
+    assert Recipe.objects.count() == 60
+    assert not Recipe.objects.annotate(
+        tags_count=Count('tags')
+    ).filter(tags_count=0).exists()
+    for user in User.objects.annotate(
+            recipes_total=Count('recipes', distinct=True),
+            followers_total=Count('followings', distinct=True)):
+        assert user.recipes_count == user.recipes_total
+        assert user.followers_count == user.followers_total
+    assert ShoppingListItem.objects.exists()
+    follow = Follow.objects.filter(following__recipes_count__gt=0).first()
+    assert FeedEntry.objects.filter(
+        user_id=follow.follower_id, recipe__author_id=follow.following_id
+    ).exists()
@@ -0,0 +1,126 @@
+"""Пул и проверки соединений бэкенда foodgram_backend.db.
+
+Тесты ConnectionPool работают с заглушками соединений и проходят на любой
+базе, а тесты DatabaseWrapper запускаются, только если основная база -
+PostgreSQL через этот бэкенд, как в CI.
+"""
+import pytest
+from django.db import OperationalError, connection, connections
+import psycopg2
+from psycopg2 import extensions
+
+from foodgram_backend.db import base
+
+postgres_only = pytest.mark.skipif(
+    connection.settings_dict['ENGINE'] != 'foodgram_backend.db',
+    reason='Нужен PostgreSQL с бэкендом foodgram_backend.db'
+)
+
+
+class FakeConnection:
+
+    def __init__(self):
+        self.closed = 0
+        self.status = extensions.TRANSACTION_STATUS_IDLE
+        self.rolled_back = False
+
+    def get_transaction_status(self):
+        return self.status
+
+    def rollback(self):
+        self.rolled_back = True
+        self.status = extensions.TRANSACTION_STATUS_IDLE
+
+    def close(self):
+        self.closed = 1
+
+
+def get_pool(max_size=1, timeout=0.05, max_lifetime=3600):
+    return base.ConnectionPool('test', max_size, timeout, max_lifetime)
+
+
+def test_pool_checkout_and_return():
+    pool = get_pool()
+    raw = pool.acquire(FakeConnection)
+    raw.status = extensions.TRANSACTION_STATUS_INTRANS
+    pool.release(raw)
+    assert raw.rolled_back, 'Открытая транзакция откатывается'
+    assert pool.acquire(FakeConnection) is raw
+
+
+def test_pool_drops_unusable_connections():
+    pool = get_pool()
+    raw = pool.acquire(FakeConnection)
+    pool.release(raw)
+    other = pool.acquire(FakeConnection, check=lambda raw: False)
+    assert other is not raw
+    assert raw.closed
+    pool.release(other, discard=True)
+    assert other.closed
+    assert pool.acquire(FakeConnection) is not other
+
+
+def test_pool_expires_connections():
+    pool = get_pool(max_lifetime=-1)
+    raw = pool.acquire(FakeConnection)
+    pool.release(raw)
+    assert pool.acquire(FakeConnection) is not raw
+    assert raw.closed
+
+
+def test_pool_exhausted():
+    pool = get_pool()
+    raw = pool.acquire(FakeConnection)
+    with pytest.raises(psycopg2.OperationalError):
+        pool.acquire(FakeConnection)
+    pool.release(raw)
+    assert pool.acquire(FakeConnection) is raw
+
+
+@pytest.fixture
+def create_wrapper(monkeypatch):
+    """Отдельные обертки соединения с основной базой и собственными
+    пулами.
+    """
+    monkeypatch.setattr(base, '_pools', {})
+    wrappers = []
+
+    def create(**options):
+        wrapper = connections.create_connection('default')
+        wrapper.settings_dict.update(options)
+        wrappers.append(wrapper)
+        return wrapper
+    yield create
+    for wrapper in wrappers:
+        wrapper.close()
+
+
+def get_backend_pid(wrapper):
+    with wrapper.cursor() as cursor:
+        cursor.execute('SELECT pg_backend_pid()')
+        return cursor.fetchone()[0]
+
+
+@postgres_only
+@pytest.mark.django_db(transaction=True)
+def test_wrapper_pool_checkout_and_exhaustion(create_wrapper):
+    pool = {'ENABLED': True, 'MAX_SIZE': 1, 'TIMEOUT': 0.1}
+    first = create_wrapper(POOL=pool, CONN_MAX_AGE=0)
+    second = create_wrapper(POOL=pool, CONN_MAX_AGE=0)
+    pid = get_backend_pid(first)
+    with pytest.raises(OperationalError):
+        second.ensure_connection()
+    first.close()
+    assert get_backend_pid(second) == pid, 'Соединение берется из пула'
+
+
+@postgres_only
+@pytest.mark.django_db(transaction=True)
+def test_wrapper_recovers_dead_connection(create_wrapper):
+    wrapper = create_wrapper(CONN_HEALTH_CHECKS=True, CONN_MAX_AGE=60)
+    pid = get_backend_pid(wrapper)
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT pg_terminate_backend(%s)', [pid])
+    # Начало следующего HTTP-запроса
+    wrapper.close_if_unusable_or_obsolete()
+    assert get_backend_pid(wrapper) != pid
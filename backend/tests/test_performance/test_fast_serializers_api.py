@@ -0,0 +1,72 @@
+import pytest
+from django.urls import reverse
+from rest_framework.renderers import JSONRenderer
+
+from api.fast_serializers import FastSerializer
+from api.serializers import (IngredientSerializer, RecipeDetailSerializer,
+                             TagSerializer, UserDetailSerializer)
+from recipe.models import Ingredient, Recipe, Tag
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def dataset(user_auth, create_user, avatar_user_data, recipe_is_favorite,
+            recipe_is_in_shopping_cart, create_recipe, ingredient_two,
+            subscribed_user_auth):
+    user_auth.put(
+        reverse('customuser-avatar'), avatar_user_data, format='json'
+    )
+    return {'recipe': create_recipe.id, 'user': create_user.id}
+
+
+def get_urls(dataset):
+    return [
+        reverse('recipe-list'),
+        reverse('recipe-list') + '?is_favorited=1&limit=1',
+        reverse('recipe-detail', args=[dataset['recipe']]),
+        reverse('recipe-feed'),
+        reverse('tag-list'),
+        reverse('ingredient-list') + '?name=ingredient',
+        reverse('ingredient-list'),
+        reverse('customuser-list'),
+        reverse('customuser-detail', args=[dataset['user']]),
+        reverse('customuser-me'),
+    ]
+
+
+@pytest.mark.parametrize('client_name', (
+    'user_auth', 'subscribed_user_auth', 'api_client_anon'
+))
+def test_fast_serializers_same_response(request, settings, dataset,
+                                        client_name):
+    client = request.getfixturevalue(client_name)
+    # Иначе второй запрос получит ответ медленных сериализаторов из кэша
+    settings.RESPONSE_CACHE_TIMEOUT = 0
+    for url in get_urls(dataset):
+        settings.FAST_SERIALIZERS = False
+        expected = client.get(url)
+        settings.FAST_SERIALIZERS = True
+        response = client.get(url)
+        assert response.status_code == expected.status_code, url
+        assert response.content == expected.content, url
+
+
+@pytest.mark.parametrize('serializer_class, get_queryset', (
+    (RecipeDetailSerializer, lambda: Recipe.objects.all()),
+    (TagSerializer, lambda: Tag.objects.all()),
+    (IngredientSerializer, lambda: Ingredient.objects.order_by('-name')),
+    (UserDetailSerializer, lambda: Recipe.objects.first().author),
+))
+def test_fast_serializer_without_request(dataset, serializer_class,
+                                         get_queryset):
+    renderer = JSONRenderer()
+    instance = get_queryset()
+    many = not hasattr(instance, 'pk')
+    expected = serializer_class(instance, many=many).data
+    data = FastSerializer(serializer_class, instance, many=many).data
+    assert renderer.render(data) == renderer.render(expected)
+    if many:
+        expected = serializer_class(instance.first()).data
+        data = FastSerializer(serializer_class, instance.first()).data
+        assert renderer.render(data) == renderer.render(expected)
@@ -0,0 +1,52 @@
+import datetime
+import decimal
+import io
+import json
+import uuid
+
+import pytest
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from api.parsers import FastJSONParser
+from api.renderers import FastJSONRenderer
+
+PAYLOAD = {
+    'name': 'Борщ\u2028с разделителем',
+    'amount': decimal.Decimal('1.50'),
+    'label': gettext_lazy('Рецепт'),
+    'created_at': datetime.datetime(
+        2024, 1, 2, 3, 4, 5, 6, tzinfo=timezone.utc
+    ),
+    'naive': datetime.datetime(2024, 1, 2, 3, 4, 5),
+    'date': datetime.date(2024, 1, 2),
+    'duration': datetime.timedelta(minutes=90),
+    'uuid': uuid.UUID(int=1),
+    'ids': (1, 2, 3),
+    1: 'число в ключе',
+    'nested': [{'empty': None, 'flag': True}],
+}
+
+
+@pytest.mark.parametrize('accepted_media_type', (
+    'application/json', 'application/json; indent=4'
+))
+def test_fast_json_renderer(accepted_media_type):
+    fast = FastJSONRenderer().render(PAYLOAD, accepted_media_type)
+    default = JSONRenderer().render(PAYLOAD, accepted_media_type)
+    assert json.loads(fast) == json.loads(default)
+    assert b'\\u2028' in fast
+    assert FastJSONRenderer().render(None) == b''
+
+
+def test_fast_json_parser():
+    data = {'name': 'Борщ', 'ingredients': [{'id': 1, 'amount': 10}]}
+    content = json.dumps(data, ensure_ascii=False).encode()
+    parsed = FastJSONParser().parse(io.BytesIO(content))
+    assert parsed == JSONParser().parse(io.BytesIO(content)) == data
+    for invalid in (b'{"name": ', b'{"amount": NaN}'):
+        with pytest.raises(ParseError):
+            FastJSONParser().parse(io.BytesIO(invalid))
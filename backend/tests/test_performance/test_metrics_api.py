@@ -0,0 +1,96 @@
+import pytest
+from django.apps import apps
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.serializers import BaseSerializer
+
+from api import middleware
+from api.fast_serializers import FastSerializer
+from foodgram_backend import metrics
+
+
+@pytest.mark.parametrize(
+    'allowed_ips, status_code', (
+        (['127.0.0.1'], status.HTTP_200_OK),
+        (['10.0.0.1'], status.HTTP_404_NOT_FOUND),
+    )
+)
+def test_metrics(settings, client, allowed_ips, status_code):
+    settings.METRICS_ALLOWED_IPS = allowed_ips
+    metrics.counter('test_events_total', 'Тестовые события').inc(kind='a')
+    metrics.summary('test_duration_seconds', 'Тест').observe(0.5)
+    response = client.get(reverse('metrics'))
+    assert response.status_code == status_code
+    if status_code == status.HTTP_200_OK:
+        body = response.content.decode()
+        assert '# TYPE test_events_total counter' in body
+        assert 'test_events_total{kind="a"}' in body
+        assert 'test_duration_seconds_count 1' in body
+
+
+def test_histogram_render():
+    histogram = metrics.histogram('test_size_bytes', 'Тест', (10, 100))
+    histogram.observe(5)
+    histogram.observe(50)
+    histogram.observe(500)
+    body = histogram.render()
+    assert 'test_size_bytes_bucket{le="10"} 1' in body
+    assert 'test_size_bytes_bucket{le="100"} 2' in body
+    assert 'test_size_bytes_bucket{le="+Inf"} 3' in body
+    assert 'test_size_bytes_sum 555' in body
+
+
+@pytest.mark.django_db
+def test_request_metrics(client, create_recipe):
+    labels = {'view': 'RecipeViewSet', 'action': 'list'}
+    key = middleware.request_queries.get_key(labels)
+    histograms = (
+        middleware.request_queries, middleware.request_sql_time,
+        middleware.request_serializer_time, middleware.response_size,
+    )
+    before = [
+        histogram.values.get(key, (None, 0, 0)) for histogram in histograms
+    ]
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(reverse('recipe-list'))
+    assert response.status_code == status.HTTP_200_OK
+    after = [histogram.values[key] for histogram in histograms]
+    for (_, count_before, _), (_, count_after, _) in zip(before, after):
+        assert count_after == count_before + 1
+    queries, _, serializer_time, size = (
+        total_after - total_before
+        for (_, _, total_before), (_, _, total_after) in zip(before, after)
+    )
+    assert queries == len(context.captured_queries)
+    assert serializer_time > 0
+    assert size == len(response.content)
+
+
+@pytest.mark.parametrize('enabled', (False, True))
+def test_serializers_instrumented_only_with_metrics(settings, monkeypatch,
+                                                    enabled):
+    settings.REQUEST_METRICS_ENABLED = enabled
+    for serializer_class in (BaseSerializer, FastSerializer):
+        get_data = serializer_class.data.fget
+        monkeypatch.setattr(serializer_class, 'data', property(
+            getattr(get_data, '__wrapped__', get_data)
+        ))
+    apps.get_app_config('api').ready()
+    apps.get_app_config('api').ready()
+    for serializer_class in (BaseSerializer, FastSerializer):
+        get_data = serializer_class.data.fget
+        if enabled:
+            get_data = get_data.__wrapped__
+        # Без метрик обертки нет, с метриками она ровно одна
+        assert not hasattr(get_data, '__wrapped__')
+
+
+def test_metric_without_samples():
+
+    class Incomplete(metrics.Metric):
+        type = 'gauge'
+
+    with pytest.raises(TypeError):
+        Incomplete('incomplete', 'Метрика без samples')
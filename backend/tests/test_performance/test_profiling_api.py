@@ -0,0 +1,82 @@
+import marshal
+
+import pytest
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api.models import RequestProfile
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def profiling(settings):
+    settings.PROFILING_ENABLED = True
+    settings.PROFILING_MAX_PER_HOUR = 2
+
+
+@pytest.fixture
+def superuser(django_user_model):
+    return django_user_model.objects.create_superuser(
+        email='profiler@mail.ru', username='profiler', password='12wnk1ej21'
+    )
+
+
+def get_token_client(user):
+    client = APIClient()
+    client.credentials(
+        HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=user).key}'
+    )
+    return client
+
+
+@pytest.mark.parametrize('mode, field', (
+    ('cprofile', 'stats'),
+    ('sample', 'stacks'),
+))
+def test_profile_request(profiling, superuser, client, mode, field):
+    response = get_token_client(superuser).get(
+        reverse('recipe-list'), HTTP_X_PROFILE=mode
+    )
+    assert response.status_code == status.HTTP_200_OK
+    profile = RequestProfile.objects.get(pk=response['X-Profile-Id'])
+    assert profile.mode == mode
+    assert profile.user == superuser
+    assert profile.path == reverse('recipe-list')
+    client.force_login(superuser)
+    response = client.get(reverse('admin:api_requestprofile_changelist'))
+    assert response.status_code == status.HTTP_200_OK
+    if mode == 'cprofile':
+        response = client.get(reverse(
+            'admin:api_requestprofile_download', args=[profile.pk, field]
+        ))
+        assert response.status_code == status.HTTP_200_OK
+        assert 'attachment' in response['Content-Disposition']
+        assert marshal.loads(response.content)
+
+
+def test_profile_not_superuser_or_disabled(
+        settings, profiling, create_user, superuser
+):
+    response = get_token_client(create_user).get(
+        reverse('recipe-list'), {'_profile': 'sample'}
+    )
+    assert 'X-Profile-Id' not in response
+    settings.PROFILING_ENABLED = False
+    response = get_token_client(superuser).get(
+        reverse('recipe-list'), {'_profile': 'sample'}
+    )
+    assert 'X-Profile-Id' not in response
+    assert not RequestProfile.objects.exists()
+
+
+def test_profile_rate_limit(profiling, superuser):
+    client = get_token_client(superuser)
+    for _ in range(2):
+        response = client.get(reverse('tag-list'), HTTP_X_PROFILE='sample')
+        assert 'X-Profile-Id' in response
+    response = client.get(reverse('tag-list'), HTTP_X_PROFILE='sample')
+    assert response['X-Profile'] == 'rate-limited'
+    assert RequestProfile.objects.count() == 2
@@ -0,0 +1,306 @@
+"""Бюджеты SQL-запросов для эндпоинтов API.
+
+Число запросов не должно расти вместе с объемом данных, размером страницы
+и числом тегов и ингредиентов в запросе. Если бюджет нарушен, все
+запросы каждого прогона дописываются в файл QUERY_BUDGET_REPORT.
+
+Асинхронные маршруты (ASYNC_VIEWS) не измеряются: они выполняют те же
+действия RecipeViewSet и IngredientViewSet в потоке пула, а
+CaptureQueriesContext видит только соединение текущего потока. Их
+бюджеты совпадают с бюджетами синхронных маршрутов.
+"""
+import json
+import os
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from recipe.models import (Ingredient, Recipe, RecipeFavorite,
+                           RecipeIngredient, RecipeShoppingCart, Tag)
+from user.models import Follow
+
+User = get_user_model()
+
+REPORT_PATH = os.getenv('QUERY_BUDGET_REPORT', 'query_budget_report.json')
+DATASET_SIZES = (20, 40)
+PAGE_SIZES = (1, 5, 20)
+ITEM_COUNTS = (1, 5, 10)
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(scope='session', autouse=True)
+def clean_report():
+    if os.path.exists(REPORT_PATH):
+        os.remove(REPORT_PATH)
+
+
+@pytest.fixture(autouse=True)
+def disable_response_cache(settings):
+    # Бюджеты относятся к запросам самих представлений, а не к попаданиям
+    # в кэш ответов
+    settings.RESPONSE_CACHE_TIMEOUT = 0
+
+
+@pytest.fixture
+def shared_items():
+    return create_items('shared', 3)
+
+
+def create_items(prefix, count):
+    tags = [
+        Tag.objects.create(name=f'{prefix}_{number}', slug=f'{prefix}_{number}')
+        for number in range(count)
+    ]
+    ingredients = [
+        Ingredient.objects.create(
+            name=f'{prefix}_{number}', measurement_unit='g'
+        )
+        for number in range(count)
+    ]
+    return tags, ingredients
+
+
+def seed(viewer, size, tags, ingredients):
+    """Доводит число рецептов до size: у каждого свой автор, на которого
+    подписан viewer, а рецепт у него в избранном и в корзине.
+    """
+    for number in range(Recipe.objects.count(), size):
+        author = User.objects.create(
+            username=f'author_{number}', email=f'author_{number}@test.ru'
+        )
+        recipe = Recipe.objects.create(
+            author=author, name=f'recipe_{number}', text='text',
+            cooking_time=10, image='recipes/images/test.png'
+        )
+        recipe.tags.set(tags)
+        own_ingredient = Ingredient.objects.create(
+            name=f'ingredient_own_{number}', measurement_unit='g'
+        )
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(recipe=recipe, ingredient=ingredient, amount=10)
+            for ingredient in (*ingredients, own_ingredient)
+        )
+        Follow.objects.create(follower=viewer, following=author)
+        RecipeFavorite.objects.create(user=viewer, recipe=recipe)
+        RecipeShoppingCart.objects.create(user=viewer, recipe=recipe)
+
+
+def measure(client, method, url, data=None, **kwargs):
+    if 'content_type' not in kwargs:
+        kwargs['format'] = 'json'
+    with CaptureQueriesContext(connection) as context:
+        response = getattr(client, method)(url, data, **kwargs)
+        if response.streaming:
+            b''.join(response.streaming_content)
+    assert response.status_code < 400, response.content
+    return response, context.captured_queries
+
+
+def check_budget(name, budget, runs):
+    counts = {label: len(queries) for label, queries in runs.items()}
+    if len(set(counts.values())) == 1 and max(counts.values()) <= budget:
+        return
+    report = {
+        'endpoint': name,
+        'budget': budget,
+        'counts': counts,
+        'queries': {
+            label: [query['sql'] for query in queries]
+            for label, queries in runs.items()
+        },
+    }
+    with open(REPORT_PATH, 'a', encoding='utf-8') as file:
+        file.write(json.dumps(report, ensure_ascii=False, indent=2) + '\n')
+    pytest.fail(
+        f'{name}: число запросов {counts}, бюджет {budget}. '
+        f'Запросы записаны в {REPORT_PATH}'
+    )
+
+
+@pytest.mark.parametrize(
+    'url_name, params, budget', (
+        ('recipe-list', {}, 8),
+        ('recipe-list', {'is_favorited': 1}, 8),
+        ('recipe-list', {'is_in_shopping_cart': 1}, 8),
+        ('recipe-list', {'tags': 'shared_0'}, 9),
+        ('recipe-feed', {}, 8),
+        ('customuser-list', {}, 3),
+        ('subscriptions', {'recipes_limit': 2}, 3),
+        ('tag-list', {}, 1),
+        ('ingredient-list', {'name': 'shared'}, 1),
+        ('recipe-download-shopping-cart', {}, 1),
+        ('recipe-shopping-cart-summary', {}, 1),
+    )
+)
+def test_list_query_budget(
+        user_auth, create_user, shared_items, url_name, params, budget
+):
+    runs = {}
+    for size in DATASET_SIZES:
+        seed(create_user, size, *shared_items)
+        for page_size in PAGE_SIZES:
+            _, queries = measure(
+                user_auth, 'get', reverse(url_name),
+                {**params, 'limit': page_size}
+            )
+            runs[f'{size} рецептов, limit={page_size}'] = queries
+    check_budget(f'{url_name} {params}', budget, runs)
+
+
+@pytest.mark.parametrize(
+    'url_name, budget', (
+        ('recipe-detail', 7),
+        ('recipe-get-link', 4),
+        ('customuser-detail', 2),
+        ('customuser-me', 1),
+    )
+)
+def test_detail_query_budget(
+        user_auth, create_user, shared_items, url_name, budget
+):
+    runs = {}
+    for size in DATASET_SIZES:
+        seed(create_user, size, *shared_items)
+        if url_name == 'customuser-me':
+            url = reverse(url_name)
+        elif url_name == 'customuser-detail':
+            url = reverse(url_name, args=[User.objects.last().id])
+        else:
+            url = reverse(url_name, args=[Recipe.objects.last().id])
+        runs[f'{size} рецептов'] = measure(user_auth, 'get', url)[1]
+    check_budget(url_name, budget, runs)
+
+
+@pytest.mark.parametrize('method, budget', (('post', 21), ('patch', 25)))
+def test_recipe_write_query_budget(
+        user_auth, create_user, shared_items, valid_recipe_data, method,
+        budget
+):
+    seed(create_user, DATASET_SIZES[0], *shared_items)
+    recipe = Recipe.objects.create(
+        author=create_user, name='own', text='text', cooking_time=1,
+        image='recipes/images/test.png'
+    )
+    # Каждое изменение заменяет уже существующие теги и ингредиенты
+    recipe.tags.set(shared_items[0])
+    RecipeIngredient.objects.create(
+        recipe=recipe, ingredient=shared_items[1][0], amount=10
+    )
+    runs = {}
+    for count in ITEM_COUNTS:
+        tags, ingredients = create_items(f'write_{count}', count)
+        data = {
+            **valid_recipe_data,
+            'name': f'write_{count}',
+            'tags': [tag.id for tag in tags],
+            'ingredients': [
+                {'id': ingredient.id, 'amount': 5}
+                for ingredient in ingredients
+            ],
+        }
+        if method == 'post':
+            url = reverse('recipe-list')
+        else:
+            url = reverse('recipe-detail', args=[recipe.id])
+        runs[f'{count} тегов и ингредиентов'] = measure(
+            user_auth, method, url, data
+        )[1]
+    check_budget(f'recipe {method}', budget, runs)
+
+
+@pytest.mark.parametrize(
+    'url_name, method, budget', (
+        # Рецепт без префетчей, проверка по связям пользователя и запись
+        ('recipe-favorite', 'post', 5),
+        ('recipe-favorite', 'delete', 4),
+        # Плюс пересчет сумм списка покупок по ингредиентам рецепта
+        ('recipe-shopping-cart', 'post', 9),
+        ('recipe-shopping-cart', 'delete', 7),
+        # Автор с рецептами для ответа, счетчики и лента подписчика
+        ('subscribe', 'post', 12),
+        ('subscribe', 'delete', 9),
+    )
+)
+def test_relation_query_budget(
+        user_auth, create_user, shared_items, url_name, method, budget
+):
+    author = User.objects.create(username='target', email='target@test.ru')
+    recipe = Recipe.objects.create(
+        author=author, name='target', text='text', cooking_time=1,
+        image='recipes/images/test.png'
+    )
+    RecipeIngredient.objects.bulk_create(
+        RecipeIngredient(recipe=recipe, ingredient=ingredient, amount=10)
+        for ingredient in shared_items[1]
+    )
+    object_id = author.id if url_name == 'subscribe' else recipe.id
+    url = reverse(url_name, args=[object_id])
+    runs = {}
+    for size in DATASET_SIZES:
+        seed(create_user, size, *shared_items)
+        if method == 'delete':
+            user_auth.post(url)
+        runs[f'{size} рецептов'] = measure(user_auth, method, url)[1]
+        if method == 'post':
+            user_auth.delete(url)
+    check_budget(f'{url_name} {method}', budget, runs)
+
+
+@pytest.mark.parametrize(
+    'url_name, method, budget', (
+        ('customuser-avatar', 'put', 1),
+        ('customuser-set-password', 'post', 1),
+    )
+)
+def test_account_query_budget(
+        user_auth, create_user, shared_items, avatar_user_data,
+        valid_set_password_data, url_name, method, budget
+):
+    passwords = valid_set_password_data
+    runs = {}
+    for size in DATASET_SIZES:
+        seed(create_user, size, *shared_items)
+        data = avatar_user_data
+        if url_name == 'customuser-set-password':
+            data = passwords
+            # Следующий прогон возвращает прежний пароль
+            passwords = {
+                'current_password': passwords['new_password'],
+                'new_password': passwords['current_password'],
+            }
+        runs[f'{size} рецептов'] = measure(
+            user_auth, method, reverse(url_name), data
+        )[1]
+    check_budget(f'{url_name} {method}', budget, runs)
+
+
+def test_import_query_budget(admin_auth, create_user, shared_items):
+    tags, ingredients = shared_items
+    # Рецепты раскладываются по ленте подписчика одной пачкой
+    Follow.objects.create(
+        follower=create_user, following=User.objects.get(username='admin')
+    )
+    runs = {}
+    for count in ITEM_COUNTS:
+        lines = [
+            json.dumps({
+                'name': f'import_{count}_{number}', 'text': 'text',
+                'cooking_time': 5, 'tags': [tag.id for tag in tags],
+                'ingredients': [
+                    {'id': ingredient.id, 'amount': 3}
+                    for ingredient in ingredients
+                ],
+            })
+            for number in range(count)
+        ]
+        response, queries = measure(
+            admin_auth, 'post', reverse('recipe-import-recipes'),
+            '\n'.join(lines), content_type='application/x-ndjson'
+        )
+        assert response.data['created'] == count, response.data
+        runs[f'{count} рецептов'] = queries
+    check_budget('recipe import', 15, runs)
@@ -0,0 +1,133 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api import throttling
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def rates(settings):
+    settings.REST_FRAMEWORK = {
+        **settings.REST_FRAMEWORK,
+        'DEFAULT_THROTTLE_RATES': {
+            'shopping_list': '2/min', 'recipe_write': None,
+            'subscriptions': '1/s',
+        },
+    }
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(
+        throttling.TokenBucketThrottle, 'timer', staticmethod(lambda: now[0])
+    )
+    return now
+
+
+THREADS = 10
+
+
+class RecordingCache:
+
+    def __init__(self):
+        self.calls = []
+
+    def __getattr__(self, name):
+        self.calls.append(name)
+        return getattr(cache, name)
+
+
+class SlowCache:
+    """Кэш с задержкой перед каждой операцией, чтобы потоки чередовались."""
+
+    def __getattr__(self, name):
+        method = getattr(cache, name)
+
+        def call(*args, **kwargs):
+            time.sleep(0.001)
+            return method(*args, **kwargs)
+        return call
+
+
+class View:
+    throttle_scope = 'subscriptions'
+
+
+def get_request(ip):
+    request = Request(APIRequestFactory().get('/', REMOTE_ADDR=ip))
+    request.user = AnonymousUser()
+    return request
+
+
+def test_parse_rate():
+    assert throttling.parse_rate('30/min') == (30, 60)
+    assert throttling.parse_rate('5/s') == (5, 1)
+    assert throttling.parse_rate(None) is None
+
+
+def test_throttled_with_retry_after(rates, clock, user_auth, not_author_user,
+                                   monkeypatch):
+    url = reverse('recipe-download-shopping-cart')
+    for _ in range(2):
+        assert user_auth.get(url).status_code == status.HTTP_200_OK
+    response = user_auth.get(url)
+    assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+    assert response['Retry-After'] == '30'
+    assert not_author_user.get(url).status_code == status.HTTP_200_OK
+
+    recording_cache = RecordingCache()
+    monkeypatch.setattr(throttling, 'cache', recording_cache)
+    clock[0] += 29
+    response = user_auth.get(url)
+    assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+    assert response['Retry-After'] == '1'
+    assert not recording_cache.calls, (
+        'Отказ должен браться из памяти процесса'
+    )
+    clock[0] += 1
+    assert user_auth.get(url).status_code == status.HTTP_200_OK
+
+
+def test_anonymous_throttled_by_ip(rates, clock):
+    view = View()
+    assert throttling.TokenBucketThrottle().allow_request(
+        get_request('10.0.0.1'), view
+    )
+    throttle = throttling.TokenBucketThrottle()
+    assert not throttle.allow_request(get_request('10.0.0.1'), view)
+    assert throttle.wait() == pytest.approx(1)
+    assert throttling.TokenBucketThrottle().allow_request(
+        get_request('10.0.0.2'), view
+    )
+
+
+def test_concurrent_requests(rates, clock, monkeypatch):
+    monkeypatch.setattr(throttling, 'cache', SlowCache())
+    view = View()
+    barrier = threading.Barrier(THREADS)
+
+    def allow_request(_):
+        barrier.wait()
+        return throttling.TokenBucketThrottle().allow_request(
+            get_request('10.0.0.3'), view
+        )
+    with ThreadPoolExecutor(THREADS) as executor:
+        results = list(executor.map(allow_request, range(THREADS)))
+    assert results.count(True) == 1
+
+
+def test_unscoped_views_not_throttled(rates, user_auth, create_recipe):
+    url = reverse('recipe-list')
+    for _ in range(5):
+        assert user_auth.get(url).status_code == status.HTTP_200_OK
@@ -0,0 +1,56 @@
+import json
+from urllib.parse import urlencode
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.test import AsyncRequestFactory
+from django.urls import reverse
+from rest_framework import status
+
+from api.async_views import ingredient_list, recipe_detail, recipe_list
+from recipe.views import redirect_to_recipe_async
+
+# Асинхронные представления ходят в базу из других потоков, поэтому
+# данные теста должны быть зафиксированы
+pytestmark = pytest.mark.django_db(transaction=True)
+
+
+def get(view, url, *args, **kwargs):
+    data = kwargs.pop('data', None)
+    if data:
+        url = f'{url}?{urlencode(data)}'
+    request = AsyncRequestFactory().get(url)
+    return async_to_sync(view)(request, *args, **kwargs)
+
+
+def test_async_recipes_match_sync(api_client_anon, create_recipe):
+    for view, url, kwargs in (
+        (recipe_list, reverse('recipe-list'), {}),
+        (recipe_detail, reverse('recipe-detail', args=[create_recipe.id]),
+         {'pk': create_recipe.id}),
+    ):
+        response = get(view, url, **kwargs)
+        assert response.status_code == status.HTTP_200_OK
+        assert json.loads(response.content) == api_client_anon.get(
+            url
+        ).json()
+
+
+def test_async_ingredient_search(api_client_anon, ingredient, ingredient_two):
+    url = reverse('ingredient-list')
+    for name in ('', ingredient.name[:3], 'нет такого'):
+        response = get(ingredient_list, url, data={'name': name})
+        assert response.status_code == status.HTTP_200_OK
+        # Тот же рендерер, что и у синхронного представления
+        assert response.content == api_client_anon.get(
+            url, {'name': name}
+        ).content
+
+
+def test_async_short_link_redirect(create_recipe):
+    response = get(
+        redirect_to_recipe_async, f'/s/{create_recipe.short_link}/',
+        short_link=create_recipe.short_link
+    )
+    assert response.status_code == status.HTTP_302_FOUND
+    assert response.url.endswith(f'/recipes/{create_recipe.id}')
@@ -1,8 +1,12 @@
 import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from pytest_lazyfixture import lazy_fixture
 from rest_framework import status
 
+from api.relations import UserRelations
+from recipe.models import RecipeFavorite
 from tests.conftest import MESSAGE
 
 
@@ -90,3 +94,43 @@ def test_favorite_filters(user_auth, create_recipe, recipe_is_favorite, tag):
             favorite = results[0].get('is_favorited')
             assert favorite
         results_count -= 1
+
+
+@pytest.mark.django_db
+def test_favorite_flags_queries(
+        user_auth, create_recipe, recipe_is_favorite,
+        recipe_is_in_shopping_cart, django_assert_max_num_queries
+):
+    url = reverse('recipe-list')
+    with CaptureQueriesContext(connection) as context:
+        with django_assert_max_num_queries(10):
+            response = user_auth.get(url, {'is_favorited': 'false'})
+    assert any(
+        'EXISTS' in query['sql'] for query in context.captured_queries
+    ), 'Фильтр должен использовать подзапрос, а не список id'
+    results = response.data['results']
+    assert [recipe['id'] for recipe in results] == [create_recipe.id]
+    assert not results[0]['is_favorited']
+    response = user_auth.get(url)
+    flags = {
+        recipe['id']: (recipe['is_favorited'], recipe['is_in_shopping_cart'])
+        for recipe in response.data['results']
+    }
+    assert flags == {
+        create_recipe.id: (False, False),
+        recipe_is_favorite.id: (True, True),
+    }
+
+
+@pytest.mark.django_db
+def test_relations_contains(create_user, create_recipe, recipe_for_filters,
+                            django_assert_num_queries):
+    RecipeFavorite.objects.create(user=create_user, recipe=create_recipe)
+    relations = UserRelations(create_user)
+    with django_assert_num_queries(2):
+        assert relations.contains(RecipeFavorite, create_recipe.pk)
+        assert not relations.contains(RecipeFavorite, recipe_for_filters.pk)
+    assert not relations.ids, 'Одиночная проверка не загружает множество'
+    relations.get_ids(RecipeFavorite)
+    with django_assert_num_queries(0):
+        assert relations.contains(RecipeFavorite, create_recipe.pk)
@@ -0,0 +1,108 @@
+import json
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+
+from recipe.models import FeedEntry, Recipe
+from user.models import Follow
+from tests.conftest import MESSAGE
+
+
+def get_feed_ids(user, **params):
+    response = user.get(reverse('recipe-feed'), params)
+    assert response.status_code == status.HTTP_200_OK
+    return [recipe['id'] for recipe in response.data['results']], response
+
+
+@pytest.mark.django_db
+def test_feed_fan_out(subscribed_user_auth, follower_user, create_recipe):
+    assert FeedEntry.objects.filter(
+        user=follower_user, recipe=create_recipe
+    ).exists(), MESSAGE
+    ids, response = get_feed_ids(subscribed_user_auth)
+    assert ids == [create_recipe.id], MESSAGE
+    assert 'next' in response.data
+
+
+@pytest.mark.django_db
+def test_feed_fan_out_imported_recipes(
+        admin_auth, django_user_model, follower_user, tag, ingredient
+):
+    admin = django_user_model.objects.get(username='admin')
+    Follow.objects.create(follower=follower_user, following=admin)
+    lines = [
+        json.dumps({
+            'name': name, 'text': 'text', 'cooking_time': 5,
+            'tags': [tag.id],
+            'ingredients': [{'id': ingredient.id, 'amount': 3}],
+        })
+        for name in ('import_1', 'import_2')
+    ]
+    admin_auth.post(
+        reverse('recipe-import-recipes'), '\n'.join(lines),
+        content_type='application/x-ndjson'
+    )
+    assert set(FeedEntry.objects.filter(user=follower_user).values_list(
+        'recipe_id', flat=True
+    )) == set(Recipe.objects.values_list('id', flat=True)), MESSAGE
+    assert FeedEntry.objects.count() == 2, MESSAGE
+
+
+@pytest.mark.django_db
+def test_feed_popular_author_merged_on_read(
+        settings, subscribed_user_auth, follower_user, create_recipe,
+        recipe_for_filters
+):
+    settings.FEED_FANOUT_MAX_FOLLOWERS = 0
+    FeedEntry.objects.all().delete()
+    ids, _ = get_feed_ids(subscribed_user_auth)
+    assert ids == [recipe_for_filters.id, create_recipe.id], MESSAGE
+
+
+@pytest.mark.django_db
+def test_feed_cursor_pagination(
+        subscribed_user_auth, create_recipe, recipe_for_filters
+):
+    ids, response = get_feed_ids(subscribed_user_auth, limit=1)
+    assert ids == [recipe_for_filters.id], MESSAGE
+    next_page = subscribed_user_auth.get(response.data['next'])
+    assert [recipe['id'] for recipe in next_page.data['results']] == [
+        create_recipe.id
+    ], MESSAGE
+
+
+@pytest.mark.django_db
+def test_feed_unsubscribe(subscribed_user_auth, create_user, create_recipe):
+    url = reverse('subscribe', args=[create_user.id])
+    response = subscribed_user_auth.delete(url)
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+    ids, _ = get_feed_ids(subscribed_user_auth)
+    assert ids == [], MESSAGE
+
+
+@pytest.fixture
+def feed_max_entries(settings):
+    settings.FEED_MAX_ENTRIES = 1
+
+
+@pytest.mark.django_db
+def test_feed_trim(feed_max_entries, subscribed_user_auth, follower_user,
+                   create_recipe, recipe_for_filters):
+    # Лента обрезается при публикации, а чтение ничего не удаляет
+    assert FeedEntry.objects.filter(user=follower_user).count() == 1
+    with CaptureQueriesContext(connection) as context:
+        ids, _ = get_feed_ids(subscribed_user_auth)
+    assert ids == [recipe_for_filters.id], MESSAGE
+    assert not [
+        query for query in context.captured_queries
+        if not query['sql'].startswith('SELECT')
+    ]
+
+
+@pytest.mark.django_db
+def test_feed_anonymous(api_client_anon):
+    response = api_client_anon.get(reverse('recipe-feed'))
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
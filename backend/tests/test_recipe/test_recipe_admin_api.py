@@ -0,0 +1,173 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from foodgram_backend.db import pagination
+from recipe.models import (Ingredient, Recipe, RecipeFavorite,
+                           RecipeIngredient, RecipeShoppingCart,
+                           ShoppingListItem)
+from user.models import Follow
+
+User = get_user_model()
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def admin_site_client(client, django_user_model):
+    client.force_login(django_user_model.objects.create_superuser(
+        email='site_admin@mail.ru', username='site_admin',
+        password='12wnk1ej21'
+    ))
+    return client
+
+
+def create_recipes(count, favorites):
+    """Рецепты, у i-го из которых i * favorites добавлений в избранное
+    от подписчиков автора, один ингредиент и одно добавление в корзину.
+    """
+    start = Recipe.objects.count()
+    recipes = []
+    for number in range(start, start + count):
+        author = User.objects.create(
+            username=f'admin_author_{number}',
+            email=f'admin_author_{number}@test.ru'
+        )
+        recipe = Recipe.objects.create(
+            author=author, name=f'admin_recipe_{number}', text='text',
+            cooking_time=10, image='recipes/images/test.png'
+        )
+        for user_number in range(number * favorites):
+            user = User.objects.create(
+                username=f'fan_{number}_{user_number}',
+                email=f'fan_{number}_{user_number}@test.ru'
+            )
+            RecipeFavorite.objects.create(user=user, recipe=recipe)
+            Follow.objects.create(follower=user, following=author)
+        RecipeShoppingCart.objects.create(user=author, recipe=recipe)
+        RecipeIngredient.objects.create(
+            recipe=recipe, amount=1, ingredient=Ingredient.objects.create(
+                name=f'admin_ingredient_{number}', measurement_unit='g'
+            )
+        )
+        recipes.append(recipe)
+    return recipes
+
+
+def count_queries(client, url, params=None):
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url, params)
+    assert response.status_code == 200
+    return response, len(context.captured_queries)
+
+
+def test_recipe_changelist_counts(admin_site_client):
+    url = reverse('admin:recipe_recipe_changelist')
+    create_recipes(3, 1)
+    _, queries = count_queries(admin_site_client, url)
+    create_recipes(3, 1)
+    # Сортировка по столбцу "В избранном" по убыванию
+    response, more_queries = count_queries(admin_site_client, url, {'o': -3})
+    assert more_queries == queries
+    recipes = list(response.context['cl'].result_list)
+    assert [recipe.favorites_count for recipe in recipes] == [
+        5, 4, 3, 2, 1, 0
+    ]
+    assert {recipe.shopping_cart_count for recipe in recipes} == {1}
+
+
+def test_recipe_change_page_counts(admin_site_client):
+    recipe, popular = create_recipes(2, 3)
+    url = reverse('admin:recipe_recipe_change', args=[recipe.pk])
+    # Первый запрос заполняет кэш типов содержимого
+    admin_site_client.get(url)
+    _, queries = count_queries(admin_site_client, url)
+    url = reverse('admin:recipe_recipe_change', args=[popular.pk])
+    response, popular_queries = count_queries(admin_site_client, url)
+    assert popular_queries == queries
+    favorites_url = reverse('admin:recipe_recipefavorite_changelist')
+    assert (
+        f'{favorites_url}?recipe__id__exact={popular.pk}">3</a>'
+    ) in response.content.decode()
+    response = admin_site_client.get(
+        favorites_url, {'recipe__id__exact': popular.pk}
+    )
+    assert response.context['cl'].result_count == 3
+
+
+def test_estimated_count_paginator(monkeypatch):
+    create_recipes(2, 0)
+    monkeypatch.setattr(
+        pagination, 'get_estimated_count', lambda queryset: 10 ** 6
+    )
+    paginator_class = pagination.EstimatedCountPaginator
+    assert paginator_class(Recipe.objects.all(), 10).count == 10 ** 6
+    assert paginator_class(
+        Recipe.objects.filter(name__startswith='admin'), 10
+    ).count == 2
+    monkeypatch.setattr(
+        pagination, 'get_estimated_count', lambda queryset: 1000
+    )
+    assert paginator_class(Recipe.objects.all(), 10).count == 2
+
+
+@pytest.mark.parametrize('url_name', (
+    'admin:recipe_recipefavorite_changelist',
+    'admin:recipe_recipeshoppingcart_changelist',
+    'admin:recipe_recipeingredient_changelist',
+    'admin:user_follow_changelist',
+))
+def test_large_table_changelist(admin_site_client, url_name):
+    url = reverse(url_name)
+    create_recipes(2, 1)
+    admin_site_client.get(url)
+    _, queries = count_queries(admin_site_client, url)
+    create_recipes(3, 1)
+    response, more_queries = count_queries(admin_site_client, url)
+    assert more_queries == queries
+    assert response.context['cl'].full_result_count is None
+
+
+def test_large_table_prefix_search(admin_site_client):
+    create_recipes(3, 1)
+    url = reverse('admin:recipe_recipefavorite_changelist')
+    response = admin_site_client.get(url, {'q': 'admin_recipe_2'})
+    assert response.context['cl'].result_count == 2
+    response = admin_site_client.get(url, {'q': 'recipe_2'})
+    assert response.context['cl'].result_count == 0
+
+
+def test_recipe_ingredient_admin_updates_shopping_list(admin_site_client):
+    recipe, other = create_recipes(2, 0)
+    buyer = User.objects.create(username='buyer', email='buyer@test.ru')
+    for cart_recipe in (recipe, other):
+        RecipeShoppingCart.objects.create(user=buyer, recipe=cart_recipe)
+    item = recipe.recipe_ingredients.get()
+    items = ShoppingListItem.objects.filter(
+        user=buyer, ingredient=item.ingredient
+    )
+    assert items.get().total_amount == 1
+
+    response = admin_site_client.post(
+        reverse('admin:recipe_recipeingredient_change', args=[item.pk]),
+        {'recipe': recipe.pk, 'ingredient': item.ingredient_id, 'amount': 7}
+    )
+    assert response.status_code == 302
+    assert items.get().total_amount == 7
+
+    admin_site_client.post(
+        reverse('admin:recipe_recipeingredient_delete', args=[item.pk]),
+        {'post': 'yes'}
+    )
+    assert not items.exists()
+
+    admin_site_client.post(
+        reverse('admin:recipe_recipeingredient_changelist'),
+        {
+            'action': 'delete_selected', 'post': 'yes',
+            '_selected_action': [other.recipe_ingredients.get().pk],
+        }
+    )
+    assert not ShoppingListItem.objects.filter(user=buyer).exists()
@@ -1,11 +1,18 @@
+import json
+from io import BytesIO
+
 import pytest
+from PIL import Image
 from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
 from django.urls import reverse
 from pytest_lazyfixture import lazy_fixture
 from rest_framework import status
 
+from api.images import get_variant_names
 from recipe.models import Recipe, RecipeIngredient
-from tests.conftest import MESSAGE
+from tests.conftest import MESSAGE, get_image_variants_data
 
 User = get_user_model()
 
@@ -18,7 +25,11 @@ def test_recipes_list(api_client_anon, create_recipe, get_recipe_data):
     image = 'http://testserver' + create_recipe.image.url
     get_recipe_data['author']['id'] = User.objects.first().id
     get_recipe_data['id'] = create_recipe.id
-    data = [{**get_recipe_data, 'image': image}]
+    data = [{
+        **get_recipe_data,
+        'image': image,
+        'image_variants': get_image_variants_data(image)
+    }]
     assert response.data['results'] == data, MESSAGE
 
 
@@ -47,7 +58,11 @@ def test_recipe_create(
         image = response.data.get('image')
         get_recipe_data['author']['id'] = User.objects.first().id
         get_recipe_data['id'] = recipe.first().id
-        assert response.data == {**get_recipe_data, 'image': image}, MESSAGE
+        assert response.data == {
+            **get_recipe_data,
+            'image': image,
+            'image_variants': get_image_variants_data(image)
+        }, MESSAGE
 
 
 @pytest.mark.django_db
@@ -58,7 +73,48 @@ def test_recipe_detail(api_client_anon, create_recipe, get_recipe_data):
     get_recipe_data['author']['id'] = User.objects.first().id
     get_recipe_data['id'] = create_recipe.id
     image = 'http://testserver' + create_recipe.image.url
-    assert response.data == {**get_recipe_data, 'image': image}, MESSAGE
+    assert response.data == {
+        **get_recipe_data,
+        'image': image,
+        'image_variants': get_image_variants_data(image)
+    }, MESSAGE
+
+
+def get_image_file(width=2, height=2):
+    buffer = BytesIO()
+    Image.new('RGB', (width, height)).save(buffer, 'PNG')
+    return SimpleUploadedFile(
+        'image.png', buffer.getvalue(), content_type='image/png'
+    )
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    'max_pixels, status_code, next_count', (
+        (100, status.HTTP_201_CREATED, 1),
+        (3, status.HTTP_400_BAD_REQUEST, 0),
+    )
+)
+def test_recipe_create_multipart(
+        settings, user_auth, tag, ingredient, base_recipe_data,
+        max_pixels, status_code, next_count
+):
+    settings.IMAGE_MAX_PIXELS = max_pixels
+    url = reverse('recipe-list')
+    data = {
+        **base_recipe_data,
+        'tags': [tag.id],
+        'ingredients': json.dumps([{'id': ingredient.id, 'amount': 10}]),
+        'image': get_image_file(),
+    }
+    response = user_auth.post(url, data, format='multipart')
+    assert response.status_code == status_code
+    assert Recipe.objects.count() == next_count
+    if status_code == status.HTTP_201_CREATED:
+        recipe = Recipe.objects.get()
+        assert recipe.image
+        assert list(recipe.tags.values_list('id', flat=True)) == [tag.id]
+        assert recipe.recipe_ingredients.get().amount == 10
 
 
 def get_recipe_ingredient(idx, amount, status_code):
@@ -97,7 +153,11 @@ def test_recipe_update(
         get_recipe_data['id'] = idx
         image = response.data.get('image')
         get_recipe_data['ingredients'][0]['amount'] = amount
-        assert response.data == {**get_recipe_data, 'image': image}, MESSAGE
+        assert response.data == {
+            **get_recipe_data,
+            'image': image,
+            'image_variants': get_image_variants_data(image)
+        }, MESSAGE
 
 
 @pytest.mark.django_db
@@ -121,3 +181,18 @@ def test_recipe_delete(
     response = user.delete(url, format='json')
     assert response.status_code == status_code
     assert recipe.count() == next_count
+
+
+@pytest.mark.django_db
+def test_recipe_image_variants(
+        settings, user_auth, valid_recipe_data,
+        django_capture_on_commit_callbacks
+):
+    settings.IMAGE_PROCESSING_ASYNC = False
+    url = reverse('recipe-list')
+    with django_capture_on_commit_callbacks(execute=True):
+        response = user_auth.post(url, valid_recipe_data, format='json')
+    assert response.status_code == status.HTTP_201_CREATED
+    recipe = Recipe.objects.get(id=response.data['id'])
+    for name in get_variant_names(recipe.image.name):
+        assert default_storage.exists(name), MESSAGE
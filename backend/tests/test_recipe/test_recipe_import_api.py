@@ -0,0 +1,86 @@
+import json
+
+import pytest
+from django.core.files.storage import default_storage
+from django.urls import reverse
+from pytest_lazyfixture import lazy_fixture
+from rest_framework import status
+
+from api.images import get_variant_names
+from recipe.models import Recipe
+from tests.conftest import MESSAGE
+
+
+def get_ndjson(tag, ingredient):
+    lines = [
+        json.dumps({
+            'name': 'import_1', 'text': 'text', 'cooking_time': 5,
+            'tags': [tag.id],
+            'ingredients': [{'id': ingredient.id, 'amount': 3}],
+        }),
+        json.dumps({
+            'name': 'import_2', 'text': 'text', 'cooking_time': 5,
+            'tags': [tag.slug],
+            'ingredients': [{'name': ingredient.name, 'amount': 4}],
+        }),
+        '{not json',
+        json.dumps({
+            'name': 'import_3', 'text': 'text', 'cooking_time': 5,
+            'tags': ['unknown'],
+            'ingredients': [{'id': ingredient.id, 'amount': 3}],
+        }),
+        json.dumps({
+            'name': 'import_1', 'text': 'text', 'cooking_time': 5,
+            'tags': [tag.id],
+            'ingredients': [{'id': ingredient.id, 'amount': 3}],
+        }),
+    ]
+    return '\n'.join(lines)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    'user, status_code, next_count', (
+        (lazy_fixture('admin_auth'), status.HTTP_200_OK, 2),
+        (lazy_fixture('user_auth'), status.HTTP_403_FORBIDDEN, 0),
+        (lazy_fixture('api_client_anon'), status.HTTP_401_UNAUTHORIZED, 0),
+    )
+)
+def test_recipe_import(user, status_code, next_count, tag, ingredient):
+    url = reverse('recipe-import-recipes')
+    response = user.post(
+        url, get_ndjson(tag, ingredient),
+        content_type='application/x-ndjson'
+    )
+    assert response.status_code == status_code
+    assert Recipe.objects.count() == next_count
+    if status_code == status.HTTP_200_OK:
+        assert response.data['created'] == 2, MESSAGE
+        error_lines = [error['line'] for error in response.data['errors']]
+        assert error_lines == [3, 4, 5], MESSAGE
+        recipe = Recipe.objects.get(name='import_2')
+        assert recipe.short_link
+        assert list(recipe.tags.all()) == [tag]
+        assert recipe.recipe_ingredients.get().amount == 4
+
+
+@pytest.mark.django_db
+def test_recipe_import_image_variants(
+        settings, admin_auth, tag, ingredient, valid_recipe_data,
+        django_capture_on_commit_callbacks
+):
+    settings.IMAGE_PROCESSING_ASYNC = False
+    line = json.dumps({
+        'name': 'import_image', 'text': 'text', 'cooking_time': 5,
+        'image': valid_recipe_data['image'], 'tags': [tag.id],
+        'ingredients': [{'id': ingredient.id, 'amount': 3}],
+    })
+    with django_capture_on_commit_callbacks(execute=True):
+        response = admin_auth.post(
+            reverse('recipe-import-recipes'), line,
+            content_type='application/x-ndjson'
+        )
+    assert response.data['created'] == 1, MESSAGE
+    recipe = Recipe.objects.get(name='import_image')
+    for name in get_variant_names(recipe.image.name):
+        assert default_storage.exists(name), MESSAGE
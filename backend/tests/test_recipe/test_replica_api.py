@@ -0,0 +1,48 @@
+import pytest
+from django.core.cache import cache
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+
+
+def get_queries(url, client, replica):
+    with CaptureQueriesContext(connections['default']) as primary_queries:
+        with CaptureQueriesContext(connections[replica]) as replica_queries:
+            response = client.get(url)
+    assert response.status_code == status.HTTP_200_OK
+    return response, len(primary_queries), len(replica_queries)
+
+
+@pytest.mark.django_db(transaction=True, databases='__all__')
+@pytest.mark.parametrize('url_name', ('recipe-list', 'customuser-list'))
+def test_safe_requests_read_from_replica(
+        replicas, api_client_anon, create_recipe, url_name
+):
+    response, primary, replica = get_queries(
+        reverse(url_name), api_client_anon, replicas[0]
+    )
+    assert response.data['count'] == 1
+    assert primary == 0
+    assert replica > 0
+
+
+@pytest.mark.django_db(transaction=True, databases='__all__')
+def test_user_pinned_to_primary_after_write(
+        replicas, user_auth, create_recipe
+):
+    url = reverse('recipe-list')
+    _, primary, replica = get_queries(url, user_auth, replicas[0])
+    assert replica == 0
+    # Окно после создания рецепта истекло
+    cache.clear()
+    _, primary, replica = get_queries(url, user_auth, replicas[0])
+    assert primary == 0
+    response = user_auth.post(
+        reverse('recipe-favorite', args=[create_recipe.id])
+    )
+    assert response.status_code == status.HTTP_201_CREATED
+    response, primary, replica = get_queries(url, user_auth, replicas[0])
+    assert response.data['results'][0]['is_favorited']
+    assert replica == 0
+    assert primary > 0
@@ -1,8 +1,12 @@
+import csv
+import json
+
 import pytest
 from django.urls import reverse
 from pytest_lazyfixture import lazy_fixture
 
-from recipe.models import RecipeShoppingCart
+from api.renderers import ShoppingListRenderer
+from recipe.models import RecipeShoppingCart, ShoppingListItem
 from rest_framework import status
 from tests.conftest import MESSAGE
 
@@ -46,6 +50,87 @@ def test_download_shopping_cart(
 ):
     url = reverse('recipe-download-shopping-cart')
     response = user_auth.get(url)
-    content = response.content.decode('utf-8')
+    content = b''.join(response.streaming_content).decode('utf-8')
     assert response.status_code == status.HTTP_200_OK
     assert content == get_downloaded_shopping_cart, MESSAGE
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    'file_format, content_type', (
+        ('txt', 'text/plain'),
+        ('csv', 'text/csv'),
+        ('json', 'application/json'),
+        ('pdf', 'application/pdf'),
+    )
+)
+def test_download_shopping_cart_formats(
+        user_auth, recipe_is_in_shopping_cart, ingredient, file_format,
+        content_type
+):
+    url = reverse('recipe-download-shopping-cart')
+    response = user_auth.get(url, {'format': file_format})
+    assert response.status_code == status.HTTP_200_OK
+    assert response['Content-Type'].startswith(content_type)
+    assert response['Content-Disposition'] == (
+        f'attachment; filename="shopping_list.{file_format}"'
+    )
+    content = b''.join(response.streaming_content)
+    if file_format == 'csv':
+        rows = list(csv.reader(content.decode('utf-8').splitlines()))
+        assert rows[1] == ['ingredient_test', '10', 'unit_test'], MESSAGE
+    elif file_format == 'json':
+        assert json.loads(content) == [{
+            'id': ingredient.id,
+            'name': 'ingredient_test',
+            'measurement_unit': 'unit_test',
+            'amount': 10
+        }], MESSAGE
+    elif file_format == 'pdf':
+        assert content.startswith(b'%PDF'), MESSAGE
+
+
+def test_shopping_list_renderer_is_abstract():
+    with pytest.raises(TypeError):
+        ShoppingListRenderer()
+
+
+@pytest.mark.django_db
+def test_download_shopping_cart_anonymous(api_client_anon):
+    url = reverse('recipe-download-shopping-cart')
+    response = api_client_anon.get(url)
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+def get_summary(user):
+    response = user.get(reverse('recipe-shopping-cart-summary'))
+    assert response.status_code == status.HTTP_200_OK
+    return [(item['name'], item['amount']) for item in response.data]
+
+
+@pytest.mark.django_db
+def test_shopping_cart_summary(
+        user_auth, recipe_is_in_shopping_cart, valid_recipe_data
+):
+    assert get_summary(user_auth) == [('ingredient_test', 10)], MESSAGE
+    recipe_url = reverse('recipe-detail', args=[recipe_is_in_shopping_cart.id])
+    valid_recipe_data['ingredients'][0]['amount'] = 25
+    response = user_auth.patch(recipe_url, valid_recipe_data, format='json')
+    assert response.status_code == status.HTTP_200_OK
+    assert get_summary(user_auth) == [('ingredient_test', 25)], MESSAGE
+    assert ShoppingListItem.objects.rebuild() == 1
+    assert get_summary(user_auth) == [('ingredient_test', 25)], MESSAGE
+    url = reverse('recipe-shopping-cart', args=[recipe_is_in_shopping_cart.id])
+    response = user_auth.delete(url)
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+    assert get_summary(user_auth) == [], MESSAGE
+
+
+@pytest.mark.django_db
+def test_shopping_cart_summary_after_recipe_delete(
+        user_auth, recipe_is_in_shopping_cart
+):
+    url = reverse('recipe-detail', args=[recipe_is_in_shopping_cart.id])
+    response = user_auth.delete(url)
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+    assert not ShoppingListItem.objects.exists(), MESSAGE
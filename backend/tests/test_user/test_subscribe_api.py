@@ -1,10 +1,16 @@
 import pytest
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from pytest_lazyfixture import lazy_fixture
 from rest_framework import status
 
+from recipe.models import Recipe
 from user.models import Follow
 
+User = get_user_model()
+
 
 def check_follow(follower_user, create_user):
     followed_user = Follow.objects.filter(
@@ -77,3 +83,113 @@ def test_delete_subscribe(
     response = user.delete(url, format='json')
     assert response.status_code == status_code
     assert not check_follow(follower_user, create_user)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('recipes_limit, expected_count', ((1, 1), (5, 2)))
+def test_subscribe_list_recipes_limit(
+        subscribed_user_auth, create_recipe, recipe_for_filters,
+        recipes_limit, expected_count
+):
+    url = reverse('subscriptions')
+    response = subscribed_user_auth.get(
+        url, {'recipes_limit': recipes_limit}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    author = response.data['results'][0]
+    assert author['recipes_count'] == 2
+    assert len(author['recipes']) == expected_count
+    assert author['recipes'][0]['id'] == recipe_for_filters.id
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('recipes_limit, expected_count', ((0, 0), (-1, 1)))
+def test_subscribe_list_non_positive_recipes_limit(
+        subscribed_user_auth, create_recipe, recipe_for_filters,
+        recipes_limit, expected_count
+):
+    response = subscribed_user_auth.get(
+        reverse('subscriptions'), {'recipes_limit': recipes_limit}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert len(response.data['results'][0]['recipes']) == expected_count
+
+
+@pytest.mark.django_db
+def test_subscribe_list_ranks_page_authors(
+        subscribed_user_auth, follower_user, create_recipe,
+        recipe_for_filters
+):
+    other = User.objects.create(username='other', email='other@test.ru')
+    Recipe.objects.create(
+        author=other, name='other_recipe', text='text', cooking_time=1,
+        image='recipes/images/test.png'
+    )
+    Follow.objects.create(follower=follower_user, following=other)
+    with CaptureQueriesContext(connection) as context:
+        response = subscribed_user_auth.get(
+            reverse('subscriptions'), {'limit': 1, 'recipes_limit': 1}
+        )
+    assert response.data['count'] == 2
+    [author] = response.data['results']
+    ranked = [
+        query['sql'] for query in context.captured_queries
+        if 'ROW_NUMBER' in query['sql']
+    ]
+    # Окно считается только по рецептам автора со страницы
+    assert len(ranked) == 1
+    assert f'"author_id" IN ({author["id"]})) ranked' in ranked[0]
+
+
+def get_counters(user):
+    user.refresh_from_db()
+    return user.followers_count, user.following_count, user.recipes_count
+
+
+@pytest.mark.django_db
+def test_subscribe_counters(
+        unsubscribed_user_auth, follower_user, create_user, create_recipe
+):
+    assert get_counters(create_user) == (0, 0, 1)
+    url = reverse('subscribe', args=[create_user.id])
+    response = unsubscribed_user_auth.post(url, format='json')
+    assert response.status_code == status.HTTP_201_CREATED
+    assert response.data['recipes_count'] == 1
+    assert get_counters(create_user) == (1, 0, 1)
+    assert get_counters(follower_user) == (0, 1, 0)
+    response = unsubscribed_user_auth.get(
+        reverse('customuser-detail', args=[create_user.id])
+    )
+    assert response.data['is_subscribed']
+    assert response.data['followers_count'] == 1
+    unsubscribed_user_auth.delete(url, format='json')
+    create_recipe.delete()
+    assert get_counters(create_user) == (0, 0, 0)
+    assert get_counters(follower_user) == (0, 0, 0)
+    User.objects.filter(pk=create_user.pk).update(followers_count=5)
+    User.objects.recount()
+    assert get_counters(create_user) == (0, 0, 0)
+
+
+@pytest.mark.django_db
+def test_user_save_keeps_counters(
+        subscribed_user_auth, user_auth, create_user, avatar_user_data
+):
+    def get_followers_count():
+        return User.objects.values_list(
+            'followers_count', flat=True
+        ).get(pk=create_user.pk)
+
+    # Объект create_user загружен до подписки, счетчик в памяти устарел
+    assert create_user.followers_count == 0
+    assert get_followers_count() == 1
+    response = user_auth.put(
+        reverse('customuser-avatar'), avatar_user_data, format='json'
+    )
+    assert response.status_code == status.HTTP_200_OK
+    create_user.first_name = 'changed'
+    create_user.save()
+    assert get_followers_count() == 1
+    create_user.refresh_from_db()
+    assert create_user.first_name == 'changed'
+    assert create_user.avatar
@@ -1,12 +1,23 @@
 import base64
+import importlib
+from io import BytesIO
 
 import pytest
+from PIL import Image
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.urls import reverse
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.urls import clear_url_caches, reverse
 from pytest_lazyfixture import lazy_fixture
 from rest_framework import status
 from rest_framework.authtoken.models import Token
 
+import api.urls
+from api.authentication import (CACHED_USER_FIELDS, get_user_cache_key,
+                                local_cache)
+
 User = get_user_model()
 
 
@@ -97,6 +108,21 @@ def test_user_avatar(user, data, status_code, create_user):
     assert not create_user.avatar
 
 
+@pytest.mark.django_db
+def test_user_avatar_multipart(user_auth, create_user):
+    url = reverse('customuser-avatar')
+    buffer = BytesIO()
+    Image.new('RGB', (3, 3)).save(buffer, 'PNG')
+    avatar = SimpleUploadedFile(
+        'avatar.png', buffer.getvalue(), content_type='image/png'
+    )
+    response = user_auth.put(url, {'avatar': avatar}, format='multipart')
+    assert response.status_code == status.HTTP_200_OK
+    create_user.refresh_from_db()
+    with open(create_user.avatar.path, 'rb') as avatar_file:
+        assert avatar_file.read() == buffer.getvalue()
+
+
 @pytest.mark.parametrize(
     'user, password_data, status_code', (
         (lazy_fixture('api_client_anon'),
@@ -149,3 +175,172 @@ def test_user_token(user, create_user, token_data, status_code):
             response = user.post(logout_url)
             assert response.status_code == status_code
         assert token_auth not in Token.objects.all()
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('change', ('password', 'deactivate', 'delete'))
+def test_cached_token_invalidation(
+        api_client, create_user, valid_set_password_data, change,
+        django_assert_num_queries
+):
+    token = Token.objects.create(user=create_user)
+    api_client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+    url = reverse('customuser-me')
+    with django_assert_num_queries(2):
+        assert api_client.get(url).status_code == status.HTTP_200_OK
+    # Остается только запрос подписок для is_subscribed
+    with django_assert_num_queries(1):
+        assert api_client.get(url).status_code == status.HTTP_200_OK
+    if change == 'password':
+        response = api_client.post(
+            reverse('customuser-set-password'), valid_set_password_data,
+            format='json'
+        )
+        assert response.status_code == status.HTTP_204_NO_CONTENT
+        with django_assert_num_queries(2):
+            assert api_client.get(url).status_code == status.HTTP_200_OK
+        return
+    if change == 'deactivate':
+        create_user.is_active = False
+        create_user.save()
+    else:
+        create_user.delete()
+    assert api_client.get(url).status_code == status.HTTP_401_UNAUTHORIZED
+
+
+@pytest.mark.django_db
+def test_cached_token_shared_cache_fields(api_client, create_user,
+                                          get_user_data):
+    token = Token.objects.create(user=create_user)
+    api_client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+    url = reverse('customuser-me')
+    assert api_client.get(url).status_code == status.HTTP_200_OK
+    values = cache.get(get_user_cache_key(create_user.pk))
+    assert set(values) == set(CACHED_USER_FIELDS)
+    assert 'password' not in values
+    # Другой процесс собирает пользователя из общего кэша и догружает
+    # остальные поля из базы
+    local_cache.clear()
+    response = api_client.get(url)
+    assert response.data == {**get_user_data, 'id': create_user.id}
+
+
+@pytest.mark.django_db
+def test_cached_token_counters(api_client, create_user, not_author_user):
+    token = Token.objects.create(user=create_user)
+    api_client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+    url = reverse('customuser-me')
+    assert api_client.get(url).json()['followers_count'] == 0
+    not_author_user.post(
+        reverse('subscribe', args=[create_user.id])
+    )
+    assert api_client.get(url).json()['followers_count'] == 1
+
+
+def reload_urls():
+    importlib.reload(api.urls)
+    importlib.reload(importlib.import_module(settings.ROOT_URLCONF))
+    clear_url_caches()
+
+
+@pytest.fixture
+def jwt_enabled(settings):
+    """Включает JWT-режим только на время теста.
+
+    Маршруты JWT подключаются при импорте api.urls, поэтому модули
+    маршрутов перезагружаются до и после теста.
+    """
+    enabled = settings.JWT_AUTH_ENABLED
+    settings.JWT_AUTH_ENABLED = True
+    reload_urls()
+    yield
+    settings.JWT_AUTH_ENABLED = enabled
+    reload_urls()
+
+
+def get_jwt(client, token_data):
+    response = client.post(reverse('jwt-create'), token_data, format='json')
+    assert response.status_code == status.HTTP_200_OK
+    return response.data
+
+
+@pytest.mark.django_db
+def test_jwt_authentication(
+        jwt_enabled, api_client_anon, create_user, valid_token_data,
+        get_user_data, valid_recipe_data, django_assert_num_queries
+):
+    client = api_client_anon
+    tokens = get_jwt(client, valid_token_data)
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {tokens["access"]}')
+    url = reverse('customuser-list')
+    # Один запрос на страницу пользователей, один на количество и один на
+    # подписки текущего пользователя: аутентификация базу не читает
+    with django_assert_num_queries(3):
+        response = client.get(url)
+    assert response.status_code == status.HTTP_200_OK
+    response = client.get(reverse('customuser-me'))
+    assert response.data == {**get_user_data, 'id': create_user.id}
+    response = client.post(
+        reverse('recipe-list'), valid_recipe_data, format='json'
+    )
+    assert response.status_code == status.HTTP_201_CREATED
+    assert response.data['author']['recipes_count'] == 1
+
+
+@pytest.mark.django_db
+def test_jwt_refresh(
+        jwt_enabled, api_client, create_user, valid_token_data,
+        valid_set_password_data
+):
+    tokens = get_jwt(api_client, valid_token_data)
+    url = reverse('jwt-refresh')
+    response = api_client.post(
+        url, {'refresh': tokens['refresh']}, format='json'
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data['refresh'] != tokens['refresh']
+    response = api_client.post(
+        url, {'refresh': tokens['refresh']}, format='json'
+    )
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+    tokens = get_jwt(api_client, valid_token_data)
+    create_user.set_password(valid_set_password_data['new_password'])
+    create_user.save()
+    response = api_client.post(
+        url, {'refresh': tokens['refresh']}, format='json'
+    )
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+@pytest.mark.django_db
+def test_password_hash_upgrade_on_login(
+        api_client_anon, create_user, valid_token_data
+):
+    assert create_user.password.startswith('argon2$')
+    create_user.password = make_password(
+        valid_token_data['password'], hasher='pbkdf2_sha256'
+    )
+    create_user.save()
+    create_user.refresh_from_db()
+    assert create_user.password.startswith('pbkdf2_sha256$')
+    response = api_client_anon.post(
+        reverse('login'), valid_token_data, format='json'
+    )
+    assert response.status_code == status.HTTP_200_OK
+    create_user.refresh_from_db()
+    assert create_user.password.startswith('argon2$')
+    assert create_user.check_password(valid_token_data['password'])
+
+
+@pytest.mark.django_db
+def test_save_keeps_hash_of_removed_hasher(settings, create_user):
+    password = 'removed_hasher_password'
+    encoded = make_password(password, hasher='pbkdf2_sha1')
+    settings.PASSWORD_HASHERS = ['user.hashers.TunedArgon2PasswordHasher']
+    create_user.password = encoded
+    create_user.save()
+    create_user.refresh_from_db()
+    assert create_user.password == encoded
+    create_user.password = 'plain_password'
+    create_user.save()
+    assert create_user.password.startswith('argon2$')
@@ -1,12 +1,14 @@
 from django.contrib import admin
 
 from .models import CustomUser, Follow
+from foodgram_backend.db.pagination import EstimatedCountPaginator
 
 
 class FollowTagInline(admin.TabularInline):
     model = Follow
     extra = 1
     fk_name = 'follower'
+    raw_id_fields = ('following',)
 
 
 @admin.register(CustomUser)
@@ -30,4 +32,10 @@ class UserAdmin(admin.ModelAdmin):
 @admin.register(Follow)
 class FollowAdmin(admin.ModelAdmin):
     list_display = ('follower', 'following')
-    search_fields = ('follower__username', 'following__username')
+    list_select_related = ('follower', 'following')
+    search_fields = (
+        'follower__username__startswith', 'following__username__startswith'
+    )
+    raw_id_fields = ('follower', 'following')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
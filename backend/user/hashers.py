@@ -0,0 +1,51 @@
+from django.conf import settings
+from django.contrib.auth.hashers import (UNUSABLE_PASSWORD_PREFIX,
+                                         Argon2PasswordHasher,
+                                         BasePasswordHasher, get_hashers)
+
+
+def get_subclasses(cls):
+    for subclass in cls.__subclasses__():
+        yield subclass
+        yield from get_subclasses(subclass)
+
+
+def is_password_hash(value):
+    """Похоже ли значение на хеш пароля.
+
+    Алгоритм ищется среди всех известных классов хешеров, а не только в
+    PASSWORD_HASHERS: хеш алгоритма, убранного из настроек, остается
+    хешем, и повторное хеширование сделало бы вход невозможным.
+    """
+    if value.startswith(UNUSABLE_PASSWORD_PREFIX):
+        return True
+    algorithm, separator, _ = value.partition('$')
+    if not separator:
+        return False
+    algorithms = {hasher.algorithm for hasher in get_hashers()}
+    algorithms.update(
+        hasher_class.algorithm
+        for hasher_class in get_subclasses(BasePasswordHasher)
+    )
+    return algorithm in algorithms
+
+
+class TunedArgon2PasswordHasher(Argon2PasswordHasher):
+    """Argon2 с параметрами из настроек.
+
+    Параметры Django по умолчанию рассчитаны на 100 МБ памяти и 8 потоков
+    на одну проверку пароля, что слишком дорого для воркеров gunicorn.
+    Хеши с другими параметрами пересчитываются при следующем входе.
+    """
+
+    @property
+    def time_cost(self):
+        return settings.ARGON2_TIME_COST
+
+    @property
+    def memory_cost(self):
+        return settings.ARGON2_MEMORY_COST
+
+    @property
+    def parallelism(self):
+        return settings.ARGON2_PARALLELISM
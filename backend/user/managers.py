@@ -1,19 +1,40 @@
-from django.db.models import manager, Count, Prefetch
+from django.contrib.auth.models import UserManager
+from django.db.models import (manager, Count, F, OuterRef, Prefetch,
+                              Subquery, prefetch_related_objects)
+from django.db.models.functions import Coalesce, Greatest
+
+from recipe.utils import get_ranked_ids
+
+
+def get_recipes_prefetch(model, author_ids, recipes_limit=None):
+    """Рецепты авторов, не больше recipes_limit последних на автора.
+
+    Окно ROW_NUMBER() считается только по рецептам author_ids, поэтому
+    для списка подписок передаются авторы уже выбранной страницы.
+    Неположительный recipes_limit обрезается в сериализаторе, как раньше.
+    """
+    recipes = model.objects.only(
+        'id', 'name', 'image', 'cooking_time', 'author_id'
+    )
+    if recipes_limit is not None and recipes_limit > 0:
+        recipes = recipes.filter(pk__in=get_ranked_ids(
+            model.objects.filter(author__in=author_ids),
+            partition_by='author_id',
+            order_by=[F('created_at').desc(), F('id').desc()],
+            limit=recipes_limit
+        ))
+    return Prefetch(
+        'recipes', queryset=recipes, to_attr='prefetched_recipes'
+    )
 
 
 class FollowQuerySet(manager.QuerySet):
     def get_follower(self, follower):
         return self.filter(followings__follower=follower)
 
-    def get_recipes(self, model):
-        return self.annotate(
-            recipes_count=Count('recipes', distinct=True)
-        ).prefetch_related(
-            Prefetch(
-                'recipes',
-                queryset=model.objects.all(),
-                to_attr='prefetched_recipes'
-            )
+    def get_recipes(self, model, recipes_limit=None):
+        return self.prefetch_related(
+            get_recipes_prefetch(model, self.values('pk'), recipes_limit)
         )
 
 
@@ -24,5 +45,40 @@ class UserFollowManager(manager.Manager):
     def get_follower(self, follower):
         return self.get_queryset().get_follower(follower)
 
-    def get_recipes(self, model):
-        return self.get_queryset().get_recipes(model)
+    def get_recipes(self, model, recipes_limit=None):
+        return self.get_queryset().get_recipes(model, recipes_limit)
+
+    @staticmethod
+    def prefetch_recipes(users, model, recipes_limit=None):
+        """Загружает рецепты для уже выбранной страницы пользователей."""
+        prefetch_related_objects(users, get_recipes_prefetch(
+            model, [user.pk for user in users], recipes_limit
+        ))
+        return users
+
+
+class CustomUserManager(UserManager):
+
+    @staticmethod
+    def get_count(queryset, field):
+        return Coalesce(Subquery(
+            queryset.filter(**{field: OuterRef('pk')}).order_by().values(
+                field
+            ).annotate(total=Count('pk')).values('total')
+        ), 0)
+
+    def recount(self):
+        """Пересчитывает счетчики подписок и рецептов пользователей."""
+        from recipe.models import Recipe
+        from .models import Follow
+
+        return self.update(
+            followers_count=self.get_count(Follow.objects, 'following'),
+            following_count=self.get_count(Follow.objects, 'follower'),
+            recipes_count=self.get_count(Recipe.objects, 'author'),
+        )
+
+    def change_counter(self, user_id, field, delta):
+        self.filter(pk=user_id).update(
+            **{field: Greatest(F(field) + delta, 0)}
+        )
@@ -1,8 +1,15 @@
 from django.db import models
 from django.contrib.auth.hashers import make_password
-from django.contrib.auth.models import AbstractUser, UserManager
+from django.contrib.auth.models import AbstractUser
 
-from .managers import UserFollowManager
+from .hashers import is_password_hash
+from .managers import CustomUserManager, UserFollowManager
+
+# Счетчики меняются только через update() в сигналах и recount(), обычное
+# сохранение пользователя их не записывает
+COUNTER_FIELDS = frozenset(
+    ('followers_count', 'following_count', 'recipes_count')
+)
 
 
 class CustomUser(AbstractUser):
@@ -17,7 +24,16 @@ class CustomUser(AbstractUser):
     avatar = models.ImageField(
         upload_to='img/avatar/', null=True, blank=True, verbose_name='Аватар'
     )
-    objects = UserManager()
+    followers_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name='Количество подписчиков'
+    )
+    following_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name='Количество подписок'
+    )
+    recipes_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name='Количество рецептов'
+    )
+    objects = CustomUserManager()
     follows = UserFollowManager()
 
     USERNAME_FIELD = 'email'
@@ -35,10 +51,32 @@ class CustomUser(AbstractUser):
         validate_email_field(self.email)
         super().clean()
 
-    def save(self, *args, **kwargs):
-        if self.password and not self.password.startswith('pbkdf2_sha256$'):
+    def refresh_from_db(self, using=None, fields=None):
+        # Пользователь из JWT создается только с полями из токена, поэтому
+        # при обращении к любому отложенному полю догружаются сразу все
+        deferred_fields = self.get_deferred_fields()
+        if fields is not None and deferred_fields.issuperset(fields):
+            fields = deferred_fields
+        super().refresh_from_db(using, fields)
+
+    def save(self, force_insert=False, force_update=False, using=None,
+             update_fields=None):
+        if self.password and not is_password_hash(self.password):
             self.password = make_password(self.password)
-        super(CustomUser, self).save(*args, **kwargs)
+        if (update_fields is None and not force_insert
+                and not self._state.adding):
+            # Значения счетчиков в памяти могут быть устаревшими и затерли
+            # бы изменения, сделанные после загрузки объекта
+            deferred_fields = self.get_deferred_fields()
+            update_fields = [
+                field.attname for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.attname not in deferred_fields
+                and field.name not in COUNTER_FIELDS
+            ]
+        super(CustomUser, self).save(
+            force_insert, force_update, using, update_fields
+        )
 
     def __str__(self):
         return self.username